@@ -1,24 +1,101 @@
 # app/core/db.py
-# Async SQLAlchemy + session factory + инициализация схемы
+# Async SQLAlchemy + session factory + миграции схемы + метрики пула
 
 from __future__ import annotations
 
+import logging
+import time
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import event, exc as sa_exc
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from app.core.config import settings
+from sqlalchemy.orm import Session as SyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import Settings, settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    wait_total: float = 0.0   # сек; включает открытие нового соединения, если пул его создавал
+    wait_max: float = 0.0
+    timeouts: int = 0
+
+pool_stats = PoolStats()
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который считает, сколько сессии ждали соединение."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            pool_stats.checkouts += 1
+            pool_stats.wait_total += dt
+            pool_stats.wait_max = max(pool_stats.wait_max, dt)
+
+
+def _engine_kwargs(cfg: Settings) -> dict:
+    if cfg.database_url.startswith("sqlite"):
+        # размеры пула под SQLite не настраиваем; для :memory: нужен StaticPool по умолчанию
+        return {} if ":memory:" in cfg.database_url else {"poolclass": MeteredPool}
+    kw: dict = dict(
+        poolclass=MeteredPool,
+        pool_size=cfg.db_pool_size,
+        max_overflow=cfg.db_max_overflow,
+        pool_timeout=cfg.db_pool_timeout,
+        pool_recycle=cfg.db_pool_recycle,
+        pool_pre_ping=cfg.db_pool_pre_ping,
+    )
+    if "+asyncpg" in cfg.database_url:
+        # кэш подготовленных выражений: адаптер SQLAlchemy + сам asyncpg
+        kw["connect_args"] = {
+            "prepared_statement_cache_size": cfg.db_statement_cache_size,
+            "statement_cache_size": cfg.db_statement_cache_size,
+        }
+    return kw
 
 # Один движок на приложение
 engine = create_async_engine(
     settings.database_url,
     echo=False,
-    pool_pre_ping=True,
     future=True,
+    **_engine_kwargs(settings),
 )
 
+
+def pool_metrics() -> dict[str, float | int]:
+    """Снимок пула: занятые/свободные/overflow-соединения и ожидание checkout."""
+    pool = engine.pool
+    n = pool_stats.checkouts
+    out: dict[str, float | int] = {
+        "checkouts": n,
+        "wait_avg_ms": round(pool_stats.wait_total / n * 1000, 2) if n else 0.0,
+        "wait_max_ms": round(pool_stats.wait_max * 1000, 2),
+        "timeouts": pool_stats.timeouts,
+    }
+    if isinstance(pool, QueuePool):
+        out.update(
+            size=pool.size(),
+            in_use=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return out
+
 # Фабрика сессий
 Session: async_sessionmaker[AsyncSession] = async_sessionmaker(
     bind=engine,
@@ -43,11 +120,31 @@ async def session_scope() -> AsyncSession:
     finally:
         await session.close()
 
+_AFTER_COMMIT_KEY = "after_commit"
+
+def after_commit(session: AsyncSession, fn: Callable[[], None]) -> None:
+    """
+    Выполнить fn после успешного commit этой сессии; при rollback — забыть.
+    Для in-process кэшей: в них должно попадать только то, что реально записано в БД.
+    """
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(fn)
+
+@event.listens_for(SyncSession, "after_commit")
+def _run_after_commit(sync_session) -> None:
+    for fn in sync_session.info.pop(_AFTER_COMMIT_KEY, ()):
+        try:
+            fn()
+        except Exception:
+            log.exception("after_commit callback failed")
+
+@event.listens_for(SyncSession, "after_rollback")
+def _drop_after_commit(sync_session) -> None:
+    sync_session.info.pop(_AFTER_COMMIT_KEY, None)
+
 async def init_db() -> None:
     """
-    Создание таблиц для старта без Alembic.
-    Все модели используют общий Base из app.models.user.
+    Приведение схемы к актуальной версии через app.core.migrations
+    (таблицы + онлайновое добавление индексов на существующую БД).
     """
-    from app.models.user import Base  # единый Base для User, Operation, Reminder, RecurringOp
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    from app.core.migrations import migrate
+    await migrate(engine)
@@ -0,0 +1,247 @@
+# app/core/migrations.py
+# Лёгкие миграции схемы без Alembic.
+#
+# Каждая миграция — (version, up, online). Применённые версии пишем в schema_migrations.
+# online=True — шаг выполняется вне транзакции (AUTOCOMMIT), чтобы в Postgres
+# строить индексы через CREATE INDEX CONCURRENTLY и не блокировать запись в большую таблицу.
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+log = logging.getLogger(__name__)
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# произвольная константа для pg_advisory_lock: не даём двум процессам мигрировать разом
+_PG_LOCK_KEY = 7_311_202_501
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    up: Callable[[AsyncConnection], Awaitable[None]]
+    online: bool = False
+
+
+def _load_models() -> None:
+    # регистрируем все модели в общем Base до create_all
+    import app.models.user  # noqa: F401
+    import app.models.operation  # noqa: F401
+    import app.models.reminder  # noqa: F401
+    import app.models.recurring  # noqa: F401
+    import app.models.term  # noqa: F401
+    import app.models.balance  # noqa: F401
+    import app.models.rollup  # noqa: F401
+
+
+async def create_index_online(conn: AsyncConnection, table: str, name: str) -> None:
+    """
+    Создаёт индекс, описанный в модели, не блокируя запись.
+    Postgres: CREATE INDEX CONCURRENTLY (+ пересоздание, если прошлый билд оставил INVALID).
+    SQLite: обычный CREATE INDEX IF NOT EXISTS — конкурентной сборки там нет.
+    """
+    from app.models.user import Base
+
+    tbl = Base.metadata.tables[table]
+    ix = next(i for i in tbl.indexes if i.name == name)
+    cols = ", ".join(c.name for c in ix.columns)
+    await _create_index(conn, name, table, f"({cols})", unique=ix.unique)
+
+
+async def _create_index(conn: AsyncConnection, name: str, table: str, body: str, *, unique: bool = False) -> None:
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if conn.dialect.name == "postgresql":
+        res = await conn.execute(text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+        ), {"name": name})
+        valid = res.scalar_one_or_none()
+        if valid is False:
+            log.warning('index_invalid name="%s", rebuilding', name)
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        await conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} {body}"))
+    else:
+        await conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} {body}"))
+
+
+# ===== Шаги =====
+
+async def _m0001_baseline(conn: AsyncConnection) -> None:
+    # создаём недостающие таблицы (на пустой БД — сразу со всеми индексами)
+    from app.models.user import Base
+    await conn.run_sync(Base.metadata.create_all)
+
+async def _m0002_operations_indexes(conn: AsyncConnection) -> None:
+    await create_index_online(conn, "operations", "ix_operations_user_created")
+    await create_index_online(conn, "operations", "ix_operations_user_cat_created")
+
+async def _m0003_user_balances(conn: AsyncConnection) -> None:
+    # таблица итогов + первичное заполнение из истории
+    from app.models.balance import UserBalance
+    from app.repo.balances import rebuild_balances
+
+    await conn.run_sync(lambda c: UserBalance.__table__.create(c, checkfirst=True))
+    await rebuild_balances(conn)
+
+async def _m0004_daily_rollups(conn: AsyncConnection) -> None:
+    from app.models.rollup import DailyRollup
+    from app.repo.rollups import rebuild_rollups
+
+    await conn.run_sync(lambda c: DailyRollup.__table__.create(c, checkfirst=True))
+    await rebuild_rollups(conn)
+
+# FTS5 c триграммным токенайзером: поиск подстрок без учёта регистра, как pg_trgm
+_SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS operations_fts USING fts5("
+    "description, category, content='operations', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS operations_fts_ai AFTER INSERT ON operations BEGIN "
+    "INSERT INTO operations_fts(rowid, description, category) "
+    "VALUES (new.id, new.description, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS operations_fts_ad AFTER DELETE ON operations BEGIN "
+    "INSERT INTO operations_fts(operations_fts, rowid, description, category) "
+    "VALUES ('delete', old.id, old.description, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS operations_fts_au AFTER UPDATE ON operations BEGIN "
+    "INSERT INTO operations_fts(operations_fts, rowid, description, category) "
+    "VALUES ('delete', old.id, old.description, old.category); "
+    "INSERT INTO operations_fts(rowid, description, category) "
+    "VALUES (new.id, new.description, new.category); END",
+    "INSERT INTO operations_fts(operations_fts) VALUES ('rebuild')",
+]
+
+async def _m0005_search_indexes(conn: AsyncConnection) -> None:
+    # Postgres — GIN-индексы pg_trgm, SQLite — внешняя FTS5-таблица на триггерах
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await _create_index(conn, "ix_operations_desc_trgm", "operations",
+                            "USING gin (lower(description) gin_trgm_ops)")
+        await _create_index(conn, "ix_operations_cat_trgm", "operations",
+                            "USING gin (lower(category) gin_trgm_ops)")
+    else:
+        for stmt in _SQLITE_FTS:
+            await conn.execute(text(stmt))
+
+# старое JSON-хранилище обученных терминов (services/learning до переезда в user_terms)
+_LEARNING_JSON = Path(__file__).resolve().parents[1] / "data" / "categories.json"
+_LEARNING_JOURNAL = _LEARNING_JSON.parent / "categories.journal.jsonl"
+
+def _learning_json_rows(version: int) -> list[dict]:
+    from app.models.term import GLOBAL_TG_ID
+
+    store: dict = {"global": {}, "users": {}}
+    try:
+        store.update(json.loads(_LEARNING_JSON.read_text(encoding="utf-8") or "{}"))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        log.warning('learning_json_broken path="%s", skipping', _LEARNING_JSON)
+    if _LEARNING_JOURNAL.exists():
+        for line in _LEARNING_JOURNAL.read_text(encoding="utf-8").splitlines():
+            try:
+                e = json.loads(line)
+            except Exception:
+                continue
+            if e.get("u") is None:
+                store.setdefault("global", {})[e["t"]] = e["c"]
+            else:
+                store.setdefault("users", {}).setdefault(e["u"], {})[e["t"]] = e["c"]
+
+    owners = [(GLOBAL_TG_ID, store.get("global") or {})]
+    owners += [(int(uid), terms or {}) for uid, terms in (store.get("users") or {}).items() if str(uid).isdigit()]
+    return [
+        {"user_tg_id": uid, "term": term[:255], "category": cat[:100], "version": version}
+        for uid, terms in owners
+        for term, cat in terms.items()
+        if term and cat
+    ]
+
+async def _m0006_user_terms_version(conn: AsyncConnection) -> None:
+    # user_terms.version + индекс для дочитывания, затем импорт JSON-хранилища
+    from app.models.term import UserTerm
+    from app.repo.upsert import insert_for
+
+    def _upgrade(sync_conn) -> None:
+        cols = {c["name"] for c in inspect(sync_conn).get_columns("user_terms")}
+        if "version" not in cols:
+            sync_conn.execute(text("ALTER TABLE user_terms ADD COLUMN version BIGINT NOT NULL DEFAULT 0"))
+        for ix in UserTerm.__table__.indexes:
+            ix.create(sync_conn, checkfirst=True)
+
+    await conn.run_sync(_upgrade)
+    rows = _learning_json_rows(version=time.time_ns() // 1000)
+    if rows:
+        ins = insert_for(conn, UserTerm.__table__)
+        await conn.execute(ins.on_conflict_do_nothing(index_elements=["user_tg_id", "term"]), rows)
+    log.info("user_terms_imported rows=%s", len(rows))
+
+
+MIGRATIONS: list[Migration] = [
+    Migration("0001_baseline", _m0001_baseline),
+    Migration("0002_operations_indexes", _m0002_operations_indexes, online=True),
+    Migration("0003_user_balances", _m0003_user_balances),
+    Migration("0004_daily_rollups", _m0004_daily_rollups),
+    Migration("0005_search_indexes", _m0005_search_indexes, online=True),
+    Migration("0006_user_terms_version", _m0006_user_terms_version),
+]
+
+
+@asynccontextmanager
+async def _migration_lock(engine: AsyncEngine) -> AsyncIterator[None]:
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_KEY})
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+
+
+async def migrate(engine: AsyncEngine) -> list[str]:
+    """Применяет недостающие миграции по порядку. Возвращает список применённых версий."""
+    _load_models()
+    done: list[str] = []
+    async with _migration_lock(engine):
+        async with engine.begin() as conn:
+            await conn.run_sync(_meta.create_all)
+            res = await conn.execute(select(schema_migrations.c.version))
+            applied = {row[0] for row in res}
+
+        for m in MIGRATIONS:
+            if m.version in applied:
+                continue
+            log.info('migration_start version="%s" online=%s', m.version, m.online)
+            if m.online:
+                async with engine.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    await m.up(conn)
+                    await conn.execute(schema_migrations.insert().values(
+                        version=m.version, applied_at=datetime.utcnow()
+                    ))
+            else:
+                async with engine.begin() as conn:
+                    await m.up(conn)
+                    await conn.execute(schema_migrations.insert().values(
+                        version=m.version, applied_at=datetime.utcnow()
+                    ))
+            log.info('migration_done version="%s"', m.version)
+            done.append(m.version)
+    return done
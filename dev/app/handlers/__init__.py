@@ -10,11 +10,12 @@ LOADED_HANDLERS: list[str] = []
 FAILED_HANDLERS: dict[str, str] = {}
 
 def _module_names() -> Iterable[str]:
-    # ПОРЯДОК ВАЖЕН: reports раньше records, чтобы NL-"отчёт..." не съедал фри-инпут
+    # текстовые хендлеры разведены по IntentIs(...), порядок важен только для команд
     return (
         "start",
-        "reports",   # <-- раньше
-        "records",   # <-- позже
+        "reports",
+        "records",
+        "records_bulk",
         "balance",
         "search",
         "reminders",
@@ -25,6 +26,8 @@ def _module_names() -> Iterable[str]:
     )
 
 def setup(dp: Dispatcher) -> None:
+    from app.handlers.intent import IntentMiddleware
+    dp.message.outer_middleware(IntentMiddleware())
     for name in _module_names():
         try:
             mod = __import__(f"app.handlers.{name}", fromlist=["router"])
@@ -7,8 +7,9 @@ from aiogram.types import Message
 import html
 
 from app.core.config import settings
-from app.core.db import session_scope
-from app.repo.users import total_users, total_operations
+from app.core.db import session_scope, pool_metrics
+from app.repo.users import total_users, total_operations, find_user_id
+from app.repo.balances import rebuild_balances
 from app.handlers import LOADED_HANDLERS, FAILED_HANDLERS
 
 router = Router(name=__name__)
@@ -25,6 +26,35 @@ async def cmd_admin_stats(m: Message) -> None:
         o = await total_operations(s)
     await m.answer(f"📊 users: {u}\n🧾 operations: {o}")
 
+@router.message(Command("admin_pool"))
+async def cmd_admin_pool(m: Message) -> None:
+    """/admin_pool — состояние пула соединений и время ожидания checkout."""
+    if not _is_owner(m.from_user.id):
+        return
+    lines = ["<b>DB pool</b>"] + [f"{k}: {v}" for k, v in pool_metrics().items()]
+    await m.answer("\n".join(lines), parse_mode="HTML")
+
+@router.message(Command("admin_caches"))
+async def cmd_admin_caches(m: Message) -> None:
+    """/admin_caches — размер и hit/miss in-process кэшей (для подбора размеров)."""
+    if not _is_owner(m.from_user.id):
+        return
+    from app.repo.users import user_cache
+    from app.handlers.reports import view_cache
+    from app.services.learning import cache_stats
+    from app.services.parser.resolver import parse_cache_info
+    from app.services.periods import period_cache_info
+
+    stats = {"users": user_cache.stats(), "report_views": view_cache.stats(), **cache_stats()}
+    for name, ci in (("parse", parse_cache_info()), ("periods", period_cache_info())):
+        stats[name] = {"size": ci.currsize, "hits": ci.hits, "misses": ci.misses}
+    lines = ["<b>Caches</b>"]
+    for name, st in stats.items():
+        total = st["hits"] + st["misses"]
+        rate = f"{st['hits'] / total:.0%}" if total else "—"
+        lines.append(f"{name}: size={st['size']} hits={st['hits']} misses={st['misses']} hit_rate={rate}")
+    await m.answer("\n".join(lines), parse_mode="HTML")
+
 @router.message(Command("admin_broadcast"))
 async def cmd_admin_broadcast(m: Message) -> None:
     if not _is_owner(m.from_user.id):
@@ -35,6 +65,25 @@ async def cmd_admin_broadcast(m: Message) -> None:
         return
     await m.answer("Броадкаст (демо): отправка только инициатору.\n\n" + text)
 
+@router.message(Command("admin_repair_balance"))
+async def cmd_admin_repair_balance(m: Message) -> None:
+    """/admin_repair_balance [tg_id] — пересчитать сохранённые балансы по operations."""
+    if not _is_owner(m.from_user.id):
+        return
+    arg = (m.text or "").partition(" ")[2].strip()
+    if arg and not arg.isdigit():
+        await m.answer("Формат: /admin_repair_balance [tg_id]")
+        return
+    async with session_scope() as s:
+        user_id = None
+        if arg:
+            user_id = await find_user_id(s, int(arg))
+            if user_id is None:
+                await m.answer(f"Пользователь {arg} не найден.")
+                return
+        n = await rebuild_balances(s, user_id)
+    await m.answer(f"♻️ Балансы пересчитаны: {n}")
+
 @router.message(Command("admin_handlers"))
 async def cmd_admin_handlers(m: Message) -> None:
     if not _is_owner(m.from_user.id):
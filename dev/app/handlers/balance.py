@@ -6,7 +6,7 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
+from app.repo.users import resolve_user
 from app.repo.records import balance as repo_balance
 
 router = Router(name=__name__)
@@ -14,7 +14,7 @@ router = Router(name=__name__)
 @router.message(Command("balance"))
 async def cmd_balance(m: Message) -> None:
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         bal = await repo_balance(s, user.id)
     sign = "" if bal == 0 else ("+" if bal > 0 else "-")
     await m.answer(f"💼 Баланс: <b>{sign}{abs(bal):.2f} BYN</b>", parse_mode="HTML")
@@ -0,0 +1,46 @@
+# app/handlers/intent.py
+# Намерение сообщения считаем один раз до роутинга; хендлеры фильтруют по IntentIs(...)
+# и получают готовый разбор аргументом intent.
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.filters import BaseFilter
+from aiogram.types import Message, TelegramObject
+
+from app.services.parser.intent import Intent, classify
+
+
+def _dialog_state(uid: int) -> tuple[bool, bool]:
+    # состояние диалогов живёт в модулях хендлеров; импорт здесь, а не сверху — они сами импортируют IntentIs
+    from app.handlers.records import awaiting_category
+    from app.handlers.records_bulk import in_bulk_mode
+    return in_bulk_mode(uid), awaiting_category(uid)
+
+
+class IntentMiddleware(BaseMiddleware):
+    """Outer-middleware на dp.message: кладёт data["intent"] (None — не текст)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        intent = None
+        if isinstance(event, Message) and event.text and event.from_user:
+            bulk, awaiting = _dialog_state(event.from_user.id)
+            intent = classify(event.text, bulk_mode=bulk, awaiting_category=awaiting)
+        data["intent"] = intent
+        return await handler(event, data)
+
+
+class IntentIs(BaseFilter):
+    """@router.message(IntentIs(REPORT)) — вместо своего скана текста в каждом роутере."""
+
+    def __init__(self, *kinds: str) -> None:
+        self.kinds = frozenset(kinds)
+
+    async def __call__(self, message: Message, intent: Optional[Intent] = None) -> bool:
+        return intent is not None and intent.kind in self.kinds
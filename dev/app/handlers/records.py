@@ -11,24 +11,31 @@ from aiogram.types import Message, CallbackQuery
 
 from app.core.config import settings
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
-from app.repo.records import add_operation, get_operations_range, delete_operation
-from app.services.parser import parse_message
-from app.services.periods import parse_free_period   # не перехватываем отчёты
-from app.services.learning import get_learned_category, save_user_term
-from app.ui.ui import kb_pick_category, clean_name, extract_term
+from app.repo.users import resolve_user
+from app.repo.records import add_operation, add_operations_bulk
+from app.repo.spend import spent_today
+from app.services.parser.batch import parse_many
+from app.services.learning import save_user_term
+from app.services.parser.intent import Intent, RECORD
+from app.handlers.intent import IntentIs
+from app.ui.ui import kb_pick_category
 
 log = logging.getLogger(__name__)
 router = Router(name=__name__)
 
 # Очередь обучения терминов:
 # PENDING[user_id] = {
-#   "queue": [ {"amount": float, "type": "income|expense", "term": str, "raw": str}, ... ],
+#   "queue": [ {"amount": float, "type": "income|expense", "term": str, "raw": str,
+#               "created_at": datetime | None}, ... ],   # created_at — у «вчера такси 12»
 #   "msg_id": int | None,     # id сообщения с инлайн-клавиатурой
 #   "await_new": False        # ждём ввод кастомной категории
 # }
 PENDING: dict[int, dict] = {}
 
+def awaiting_category(uid: int) -> bool:
+    pend = PENDING.get(uid)
+    return bool(pend and pend.get("await_new"))
+
 CONFIRM_SAVE_VARIANTS = [
     "✅ Записал: «{term}» ({cat}) — {sign}{amt:.2f} BYN",
     "✅ Готово: «{term}» ({cat}) — {sign}{amt:.2f} BYN",
@@ -36,6 +43,13 @@ CONFIRM_SAVE_VARIANTS = [
 ]
 def pick(arr): return random.choice(arr)
 
+def _limit_warning(limit: float | None, before: float, added: float) -> str | None:
+    # предупреждаем один раз — на записи, которая перешла лимит
+    if not limit or not added or before > limit or before + added <= limit:
+        return None
+    return (f"⚠️ Дневной лимит {limit:.2f} BYN превышен: сегодня потрачено "
+            f"{before + added:.2f} BYN (+{before + added - limit:.2f}).")
+
 def _today_dates():
     tz = ZoneInfo(settings.tz)
     now = datetime.now(tz)
@@ -44,103 +58,62 @@ def _today_dates():
 
 @router.message(Command("records"))
 async def cmd_records(m: Message) -> None:
+    # та же постраничная выдача, что и «Детально»: кнопки удаления и листание ведут в reports.cb_delete/cb_details
+    from app.handlers.reports import details_view
+
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         start, end = _today_dates()
-        ops = await get_operations_range(s, user.id, start, end)
+        text, kb = await details_view(s, user.id, start, end, "r")
 
-    if not ops:
+    if kb is None:
         await m.answer("🧾 За сегодня записей нет.", parse_mode="HTML")
         return
-
-    lines = ["🧾 <b>Записи за сегодня:</b>", ""]
-    btn_labels: list[tuple[str, int]] = []
-    total_exp = total_inc = 0.0
-    for o in ops:
-        sign = "-" if o.type == "expense" else "+"
-        if o.type == "expense":
-            total_exp += float(abs(o.amount))
-        else:
-            total_inc += float(abs(o.amount))
-        lines.append(f"{clean_name(o.description or o.category)} — {sign}{abs(float(o.amount)):.2f} BYN")
-        btn_labels.append((f"🗑 {clean_name(o.description or o.category)}", o.id))
-
-    if total_exp > 0 or total_inc > 0:
-        lines.append("")
-    if total_exp > 0:
-        lines.append(f"💵 <b>Итого расходов:</b> -{total_exp:.2f} BYN")
-    if total_inc > 0:
-        lines.append(f"💵 <b>Итого доходов:</b> +{total_inc:.2f} BYN")
-
-    from app.ui.keyboards import deletion_keyboard
-    await m.answer("\n".join(lines), parse_mode="HTML",
-                   reply_markup=deletion_keyboard(btn_labels) if btn_labels else None)
+    await m.answer(text, parse_mode="HTML", reply_markup=kb)
 
 # === Сохранение по свободному тексту (включая многострочник) ===
 
-@router.message(F.text.func(lambda t: bool(t)))
-async def free_text(m: Message) -> None:
+@router.message(IntentIs(RECORD))
+async def free_text(m: Message, intent: Intent) -> None:
     uid = m.from_user.id
 
-    # 0) Если это фраза про отчёты — НЕ трогаем, пусть обработает handlers.reports
-    if parse_free_period(m.text or ""):
-        return
-
     # 1) Этап ввода новой категории в процессе обучения
-    pend = PENDING.get(uid)
-    if pend and pend.get("await_new"):
-        custom = (m.text or "").strip()
-        if not custom:
-            await m.answer("Пусто. Введи название категории или нажми «Отмена».")
-            return
-        await _finalize_current_and_continue(m, chosen_category=custom, learned_now=True)
+    if awaiting_category(uid):
+        await _finalize_current_and_continue(m, chosen_category=intent.text, learned_now=True)
         return
 
-    text = (m.text or "").strip()
-    if not text:
-        return
-
-    lines = [s for s in (t.strip() for t in text.splitlines()) if s]
+    lines = intent.lines
 
     to_learn_queue: list[dict] = []
     saved: list[str] = []
+    batch: list[dict] = []
 
     async with session_scope() as s:
-        user = await get_or_create_user(s, uid, m.from_user.username)
-
-        for line in lines:
-            parsed = parse_message(line, user_tg_id=uid)
-            if not parsed:
-                continue
-
-            term = extract_term(parsed["raw"]) or (parsed["product"] or "").capitalize() or "Позиция"
-
-            # выученная категория — приоритетнее «Прочее»
-            learned = get_learned_category(uid, term)
-            if learned and (not parsed["category"] or parsed["category"] in ("Прочее", "Прочие платежи")):
-                parsed["category"] = learned
+        user = await resolve_user(s, uid, m.from_user.username)
 
+        # одна нормализация на строку, выученные категории — одним обращением на всю пачку
+        for p in await parse_many(s, lines, uid):
             # неизвестные копим в очередь
-            if (not parsed["category"]) or (parsed["category"] in ("Прочее", "Прочие платежи")):
+            if not p.known:
                 to_learn_queue.append({
-                    "amount": parsed["amount"],
-                    "type": parsed["type"],
-                    "term": term,
-                    "raw": parsed["raw"],
+                    "amount": p.amount,
+                    "type": p.type,
+                    "term": p.term,
+                    "raw": p.raw,
+                    "created_at": p.created_at,
                 })
                 continue
 
-            # известные — сохраняем сразу
-            await add_operation(
-                session=s,
-                user_id=user.id,
-                amount=parsed["amount"],
-                category=parsed["category"],
-                description=parsed["raw"],  # только текущая строка
-                op_type=parsed["type"],
-            )
-            sign = "+" if parsed["type"] == "income" else "-"
-            saved.append(f"«{term}» ({parsed['category']}) — {sign}{parsed['amount']:.2f} BYN")
+            # известные — копим в пачку и сохраняем одним INSERT
+            batch.append(p.as_row())  # description — только текущая строка
+            sign = "+" if p.type == "income" else "-"
+            saved.append(f"«{p.term}» ({p.category}) — {sign}{p.amount:.2f} BYN")
+
+        # в дневной лимит идут только сегодняшние траты, не «вчера такси 12»
+        added = sum(float(abs(r["amount"])) for r in batch if r["type"] == "expense" and "created_at" not in r)
+        # «потрачено сегодня» — до вставки: счётчик в памяти, в БД только на промахе
+        before = await spent_today(s, user.id) if user.daily_limit and added else 0.0
+        await add_operations_bulk(s, user.id, batch)
 
     # 2) Сначала сообщаем про сохранённые записи (UX — сверху)
     if saved:
@@ -149,6 +122,10 @@ async def free_text(m: Message) -> None:
             msg.append("• " + sline)
         if len(saved) > 10:
             msg.append(f"… и ещё {len(saved) - 10}")
+        warning = _limit_warning(user.daily_limit, before, added)
+        if warning:
+            msg.append("")
+            msg.append(warning)
         await m.answer("\n".join(msg), parse_mode="HTML")
 
     # 3) Если есть что обучать — запускаем мастер
@@ -208,7 +185,9 @@ async def _finalize_current_and_continue(obj: Message | CallbackQuery, *, chosen
     amount, op_type, term, raw = current["amount"], current["type"], current["term"], current["raw"]
 
     async with session_scope() as s:
-        user = await get_or_create_user(s, uid, getattr(obj.from_user, "username", None))
+        user = await resolve_user(s, uid, getattr(obj.from_user, "username", None))
+        added = float(abs(amount)) if op_type == "expense" and not current.get("created_at") else 0.0
+        before = await spent_today(s, user.id) if user.daily_limit and added else 0.0
         await add_operation(
             session=s,
             user_id=user.id,
@@ -216,12 +195,16 @@ async def _finalize_current_and_continue(obj: Message | CallbackQuery, *, chosen
             category=chosen_category,
             description=raw,
             op_type=op_type,
+            created_at=current.get("created_at"),
         )
         if learned_now:
-            save_user_term(uid, term, chosen_category)
+            await save_user_term(s, uid, term, chosen_category)
 
     sign = "+" if op_type == "income" else "-"
     text = pick(CONFIRM_SAVE_VARIANTS).format(term=term, cat=chosen_category, sign=sign, amt=amount)
+    warning = _limit_warning(user.daily_limit, before, added)
+    if warning:
+        text += "\n\n" + warning
 
     if isinstance(obj, CallbackQuery):
         try:
@@ -277,20 +260,3 @@ async def cb_pick_category(c: CallbackQuery):
         return
 
     await _finalize_current_and_continue(c, chosen_category=chosen, learned_now=True)
-
-# Удаление записи (кнопки из /records)
-@router.callback_query(F.data.startswith("del:"))
-async def cb_delete(c: CallbackQuery):
-    try:
-        rec_id = int((c.data or "")[4:])
-    except Exception:
-        await _safe_answer(c, "Ошибка id")
-        return
-
-    async with session_scope() as s:
-        await delete_operation(s, rec_id)
-
-    try:
-        await c.message.edit_text("Удалено.", reply_markup=None)
-    finally:
-        await _safe_answer(c, "OK")
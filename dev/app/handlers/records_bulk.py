@@ -1,20 +1,25 @@
 # app/handlers/records_bulk.py
 from __future__ import annotations
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
-from app.repo.records import add_operation
-from app.services.parser import parse_message
+from app.repo.users import resolve_user
+from app.repo.records import add_operations_bulk
+from app.services.parser.batch import parse_many
 from app.services.learning import save_user_term
+from app.services.parser.intent import Intent, TEACH, BULK
+from app.handlers.intent import IntentIs
 
 router = Router(name=__name__)
 
 _BULK_STATE: dict[int, list[str]] = {}  # tg_id -> lines
 
+def in_bulk_mode(uid: int) -> bool:
+    return uid in _BULK_STATE
+
 @router.message(Command("bulk_start"))
 async def cmd_bulk_start(m: Message) -> None:
     _BULK_STATE[m.from_user.id] = []
@@ -29,23 +34,13 @@ async def cmd_bulk_end(m: Message) -> None:
         await m.answer("Нет данных. Используй /bulk_start.")
         return
 
-    added = 0
-    unknown: list[tuple[str, str]] = []  # (raw/product, suggested_cat)
-
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
-        for raw in lines:
-            parsed = parse_message(raw, user_tg_id=m.from_user.id)
-            if not parsed:
-                continue
-            await add_operation(
-                session=s, user_id=user.id,
-                amount=parsed["amount"], category=parsed["category"],
-                description=parsed["product"], op_type=parsed["type"],
-            )
-            added += 1
-            if parsed["category"] == "Прочее":
-                unknown.append((parsed["product"] or parsed["raw"], "Еда"))
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
+        parsed = await parse_many(s, lines, m.from_user.id)
+        # в bulk описанием остаётся продукт, а не вся строка
+        batch = [{**p.as_row(), "description": p.product} for p in parsed]
+        added = len(await add_operations_bulk(s, user.id, batch))
+    unknown = [(p.product or p.raw, "Еда") for p in parsed if not p.known]  # (raw/product, suggested_cat)
 
     msg = [f"Готово. Добавлено записей: <b>{added}</b>."]
     if unknown:
@@ -58,7 +53,7 @@ async def cmd_bulk_end(m: Message) -> None:
 
     await m.answer("\n".join(msg), parse_mode="HTML")
 
-@router.message(F.text.func(lambda t: t and t.lower().startswith("обучи:")))
+@router.message(IntentIs(TEACH))
 async def bulk_teach_line(m: Message) -> None:
     # формат: обучи: термин = Категория
     tail = (m.text or "")[6:].strip(": ").strip()
@@ -69,19 +64,13 @@ async def bulk_teach_line(m: Message) -> None:
     if not term or not cat:
         await m.answer("Формат: <code>обучи: термин = Категория</code>", parse_mode="HTML")
         return
-    save_user_term(m.from_user.id, term, cat, global_scope=False)
+    async with session_scope() as s:
+        await save_user_term(s, m.from_user.id, term, cat, global_scope=False)
     await m.answer(f"Выучил: «{term}» → {cat}")
 
-@router.message(F.text & ~F.text.startswith("/"))
-async def bulk_collect(m: Message) -> None:
-    if m.from_user.id not in _BULK_STATE:
-        return  # не в bulk-режиме, пусть другие хендлеры отработают
-    chunk = (m.text or "").strip()
-    if not chunk:
-        return
-    # поддержка вставки блока
-    for line in chunk.splitlines():
-        line = line.strip()
-        if line:
-            _BULK_STATE[m.from_user.id].append(line)
-    await m.answer(f"Принял. Строк в буфере: {len(_BULK_STATE[m.from_user.id])}. Заверши /bulk_end.")
+@router.message(IntentIs(BULK))
+async def bulk_collect(m: Message, intent: Intent) -> None:
+    # поддержка вставки блока: строки уже разобраны в intent
+    buf = _BULK_STATE[m.from_user.id]
+    buf.extend(intent.lines)
+    await m.answer(f"Принял. Строк в буфере: {len(buf)}. Заверши /bulk_end.")
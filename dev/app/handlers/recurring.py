@@ -11,7 +11,7 @@ from aiogram.types import Message
 
 from app.core.config import settings
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
+from app.repo.users import resolve_user
 from app.repo.recurring_ops import create_recurring, list_all_for_user, delete_recurring
 from app.services.recurring import _next_after  # используем расчёт next_run
 
@@ -102,7 +102,7 @@ async def cmd_recurring_add(m: Message) -> None:
     next_run = _next_after(period, local_now, hour, minute, dow, dom)
 
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         r = await create_recurring(
             s, user.id, amount, category, desc, op_type,
             period, hour, minute, dow, dom, next_run
@@ -116,7 +116,7 @@ async def cmd_recurring_add(m: Message) -> None:
 async def cmd_recurring_list(m: Message) -> None:
     tz = ZoneInfo(settings.tz)
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         recs = await list_all_for_user(s, user.id)
 
     if not recs:
@@ -144,6 +144,6 @@ async def cmd_recurring_del(m: Message) -> None:
         return
     rec_id = int(parts[1])
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         ok = await delete_recurring(s, rec_id, user.id)
     await m.answer("Удалено." if ok else "Не нашёл правило.")
@@ -10,7 +10,7 @@ from aiogram.types import Message
 
 from app.core.config import settings
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
+from app.repo.users import resolve_user
 from app.repo.reminders import create_reminder, list_upcoming_for_day
 from app.services.reminders import parse_remind_args
 
@@ -31,7 +31,7 @@ async def cmd_remind(m: Message) -> None:
         return
 
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         r = await create_reminder(s, user.id, text, when_utc)
 
     # отвечаем в локальной TZ
@@ -44,7 +44,7 @@ async def cmd_reminders_list(m: Message) -> None:
     today = datetime.now(tz).date()
 
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         items = await list_upcoming_for_day(s, user.id, today)
 
     if not items:
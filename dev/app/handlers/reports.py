@@ -2,19 +2,34 @@
 from __future__ import annotations
 from collections import defaultdict
 from datetime import datetime, date
-from typing import Iterable
+from typing import NamedTuple
 
 from aiogram import Router, F, types
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.filters import Command
 
-from app.core.db import session_scope
-from app.repo.users import get_or_create_user
-from app.repo.records import get_operations_range, delete_operation
-from app.services.periods import fmt_date, period_preset, parse_free_period, label_for_period
-from app.ui.ui import kb_summary, kb_details, clean_name
+from app.core.db import session_scope, after_commit
+from app.repo.users import resolve_user
+from app.repo.records import get_records_page, delete_operation, category_totals, data_version, previous_version
+from app.models.record import OpRecord
+from app.services.analytics import is_long_range, range_buckets
+from app.services.periods import fmt_date, period_preset, label_for_period, parse_period, previous_period
+from app.services.parser.intent import Intent, REPORT, COMPARE
+from app.services.reports import compare_periods
+from app.handlers.intent import IntentIs
+from app.ui.ui import kb_summary, kb_details, clean_name, pack_cursor, unpack_cursor
+from app.utils.cache import TTLCache
 
 router = Router(name=__name__)
 
+VIEW_CACHE_TTL = 600      # сек; версия данных и так отсекает устаревшее, TTL — против записей из других процессов
+VIEW_CACHE_SIZE = 2_000
+MONTHS_SHOWN = 12         # длинная сводка: помесячные итоги за последние N месяцев
+
+# (вид, user_id, d1, d2, ..., версия данных) -> (текст, клавиатура) сводки | DetailsPage
+# «Детали» ⇄ «Закрыть» по одному периоду без новых записей не ходят в БД
+view_cache: TTLCache[tuple, tuple] = TTLCache(VIEW_CACHE_SIZE, VIEW_CACHE_TTL)
+
 CATEGORY_TITLE = {
     "еда": "Еда и напитки",
     "еда и напитки": "Еда и напитки",
@@ -37,31 +52,28 @@ def _normalize_cat(cat: str | None) -> str:
     key = (cat or "Прочие платежи").strip().lower()
     return CATEGORY_TITLE.get(key, cat or "Прочие платежи")
 
-def _aggregate(ops) -> tuple[dict[str,float], dict[str,float]]:
-    from collections import defaultdict
+def _aggregate(totals) -> tuple[dict[str,float], dict[str,float]]:
     expenses: dict[str, float] = defaultdict(float)
     income: dict[str, float] = defaultdict(float)
-    for o in ops:
-        cat = _normalize_cat(o.category)
-        val = abs(float(o.amount))
-        if o.type == "income":
-            income[cat] += val
+    for t in totals:
+        cat = _normalize_cat(t.category)
+        if t.type == "income":
+            income[cat] += t.total
         else:
-            expenses[cat] += val
+            expenses[cat] += t.total
     expenses = dict(sorted(expenses.items(), key=lambda x: -x[1]))
     income = dict(sorted(income.items(), key=lambda x: -x[1]))
     return expenses, income
 
-async def _send_summary(target: types.Message, user_id: int, username: str | None,
-                        d1: date, d2: date, label_override: str | None, edit: bool):
-    df, dt = fmt_date(d1), fmt_date(d2)
-    label = label_for_period(d1, d2, label_override)
-
-    async with session_scope() as s:
-        user = await get_or_create_user(s, user_id, username)
-        ops = await get_operations_range(s, user.id, d1, d2)
+async def summary_view(s, user_db_id: int, d1: date, d2: date, label: str) -> tuple[str, InlineKeyboardMarkup]:
+    key = ("summary", user_db_id, d1, d2, label, data_version(user_db_id))
+    cached = view_cache.get(key)
+    if cached is not None:
+        return cached
 
-    exp, inc = _aggregate(ops)
+    totals = await category_totals(s, user_db_id, d1, d2)
+    months = await range_buckets(s, user_db_id, d1, d2, "month") if is_long_range(d1, d2) else []
+    exp, inc = _aggregate(totals)
     has_exp, has_inc = bool(exp), bool(inc)
     has_any = has_exp or has_inc
 
@@ -81,11 +93,31 @@ async def _send_summary(target: types.Message, user_id: int, username: str | Non
     else:
         lines.append("💰 Доходов нет")
 
-    kb = kb_summary(df, dt, has_any)
+    if months:
+        lines.append("")
+        lines.append("📅 <b>По месяцам:</b>")
+        if len(months) > MONTHS_SHOWN:
+            lines.append(f"… ещё {len(months) - MONTHS_SHOWN} мес. раньше")
+        for b in months[-MONTHS_SHOWN:]:
+            inc_part = f" / +{b.income:.2f}" if b.income else ""
+            lines.append(f"• {b.start:%m.%Y} — -{b.expense:.2f}{inc_part} BYN")
+
+    kb = kb_summary(fmt_date(d1), fmt_date(d2), has_any)
     if has_any:
         lines.append("\nПоказать детальный список позиций?")
 
-    text = "\n".join(lines)
+    view = "\n".join(lines), kb
+    view_cache.set(key, view)
+    return view
+
+async def _send_summary(target: types.Message, user_id: int, username: str | None,
+                        d1: date, d2: date, label_override: str | None, edit: bool):
+    label = label_for_period(d1, d2, label_override)
+
+    async with session_scope() as s:
+        user = await resolve_user(s, user_id, username)
+        text, kb = await summary_view(s, user.id, d1, d2, label)
+
     if edit:
         try:
             await target.edit_text(text, parse_mode="HTML", reply_markup=kb)
@@ -99,60 +131,208 @@ async def cmd_report(m: types.Message):
     d1, d2 = period_preset("day")
     await _send_summary(m, m.from_user.id, m.from_user.username, d1, d2, None, edit=False)
 
-# NL-триггеры "отчёт за X" (исправленная скобочная конструкция)
-@router.message(F.text.func(lambda t: bool(t) and not t.startswith("/") and any(
-    k in t.lower() for k in ("покажи","дай","отчет","отчёт","статист","сводк","сколько потратил","за последние","с "," по ")
-)))
-async def nl_report(m: types.Message):
-    parsed = parse_free_period(m.text or "")
-    if not parsed:
-        return
-    d1, d2, label = parsed
-    await _send_summary(m, m.from_user.id, m.from_user.username, d1, d2, label, edit=False)
+# NL-триггеры «отчёт за X», «сколько на еду сегодня», «за август» — период уже разобран в intent
+@router.message(IntentIs(REPORT))
+async def nl_report(m: types.Message, intent: Intent):
+    p = intent.period
+    await _send_summary(m, m.from_user.id, m.from_user.username, p.start, p.end, p.label, edit=False)
 
-@router.callback_query(F.data.startswith("details:"))
-async def cb_details(c: types.CallbackQuery):
-    _, df, dt = (c.data or "").split(":", 2)
-    d1 = datetime.strptime(df, "%Y-%m-%d").date()
-    d2 = datetime.strptime(dt, "%Y-%m-%d").date()
-    label = label_for_period(d1, d2, None)
+def _span(d1: date, d2: date) -> str:
+    return d1.strftime("%d.%m.%Y") if d1 == d2 else f"{d1:%d.%m}–{d2:%d.%m.%Y}"
+
+def _delta_line(name: str, cur: float, prev: float, pct: float | None) -> str:
+    delta = cur - prev
+    arrow = "▲" if delta > 0 else ("▼" if delta < 0 else "=")
+    change = f"{arrow} {delta:+.2f}"
+    if pct is not None:
+        change += f" ({pct:+.0f}%)"
+    elif cur:
+        change += " (новое)"
+    return f"• {name} — {cur:.2f} (было {prev:.2f}) {change}"
+
+async def compare_view(s, user_db_id: int, d1: date, d2: date) -> str:
+    """Текущий период против предыдущего (previous_period) по категориям: разница и процент."""
+    p1, p2 = previous_period(d1, d2)
+    key = ("compare", user_db_id, d1, d2, data_version(user_db_id))
+    cached = view_cache.get(key)
+    if cached is not None:
+        return cached[0]
 
+    deltas = await compare_periods(s, user_db_id, (d1, d2), (p1, p2), normalize=_normalize_cat)
+    lines = [f"📊 <b>Сравнение: {_span(d1, d2)} и {_span(p1, p2)}</b>", ""]
+    for op_type, title in (("expense", "💸 <b>Расходы:</b>"), ("income", "💰 <b>Доходы:</b>")):
+        rows = [d for d in deltas if d.type == op_type]
+        if not rows:
+            continue
+        lines.append(title)
+        lines.extend(_delta_line(d.category, d.current, d.previous, d.pct) for d in rows)
+        cur, prev = sum(d.current for d in rows), sum(d.previous for d in rows)
+        lines.append(_delta_line("<b>Итого</b>", cur, prev, (cur - prev) / prev * 100 if prev else None))
+        lines.append("")
+    if not deltas:
+        lines.append("Записей нет ни в одном из периодов.")
+
+    text = "\n".join(lines).strip()
+    view_cache.set(key, (text,))
+    return text
+
+async def _send_compare(m: types.Message, d1: date, d2: date) -> None:
     async with session_scope() as s:
-        user = await get_or_create_user(s, c.from_user.id, None)
-        ops = await get_operations_range(s, user.id, d1, d2)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
+        text = await compare_view(s, user.id, d1, d2)
+    await m.answer(text, parse_mode="HTML")
+
+@router.message(Command("compare"))
+async def cmd_compare(m: types.Message):
+    # /compare — этот месяц против тех же чисел прошлого; /compare август — август против июля
+    arg = (m.text or "").partition(" ")[2]
+    p = parse_period(arg) if arg.strip() else None
+    d1, d2 = (p.start, p.end) if p else period_preset("month")
+    await _send_compare(m, d1, d2)
+
+@router.message(IntentIs(COMPARE))
+async def nl_compare(m: types.Message, intent: Intent):
+    p = intent.period
+    d1, d2 = (p.start, p.end) if p else period_preset("month")
+    await _send_compare(m, d1, d2)
+
+def _parse_range(df: str, dt: str) -> tuple[date, date]:
+    return datetime.strptime(df, "%Y-%m-%d").date(), datetime.strptime(dt, "%Y-%m-%d").date()
+
+class DetailsPage(NamedTuple):
+    """Модель страницы «Детально»: из неё рисуется текст и кнопки, её же правит удаление."""
+    rows: tuple[OpRecord, ...]
+    has_prev: bool
+    has_next: bool
+    total_exp: float   # итоги за весь период, не за страницу
+    total_inc: float
 
-    body, btns, total_exp, total_inc = _build_details(ops)
-    lines = [f"📝 <b>Детальный отчёт</b> за {label}", ""]
+def _details_key(user_db_id: int, d1: date, d2: date, cursor, direction: str, version: int) -> tuple:
+    return ("details", user_db_id, d1, d2, cursor, direction, version)
+
+def _remember_details(user_db_id: int, d1: date, d2: date, key: tuple, page: DetailsPage) -> None:
+    view_cache.set(key, page)
+    if page.rows:
+        # кнопки удаления несут курсор первой строки, cb_delete ищет страницу как «from» от него
+        first = page.rows[0]
+        view_cache.set(_details_key(user_db_id, d1, d2, (first.created_at, first.id), "from", key[-1]), page)
+
+async def _details_page(s, user_db_id: int, d1: date, d2: date, cursor, direction: str) -> DetailsPage:
+    key = _details_key(user_db_id, d1, d2, cursor, direction, data_version(user_db_id))
+    cached = view_cache.get(key)
+    if cached is not None:
+        return cached
+
+    page = await get_records_page(s, user_db_id, d1, d2, cursor=cursor, direction=direction)
+    totals = await category_totals(s, user_db_id, d1, d2)
+    details = DetailsPage(
+        tuple(page.rows), page.has_prev, page.has_next,
+        sum(t.total for t in totals if t.type != "income"),
+        sum(t.total for t in totals if t.type == "income"),
+    )
+    _remember_details(user_db_id, d1, d2, key, details)
+    return details
+
+# код вида в callback_data -> заголовок списка; "" — «Детально» из сводки, "r" — /records
+_DETAILS_TITLES = {
+    "": "📝 <b>Детальный отчёт</b> за {label}",
+    "r": "🧾 <b>Записи за сегодня:</b>",
+}
+
+def _details_title(view: str, d1: date, d2: date) -> str:
+    return _DETAILS_TITLES.get(view, _DETAILS_TITLES[""]).format(label=label_for_period(d1, d2, None))
+
+def _render_details(page: DetailsPage, d1: date, d2: date, view: str) -> tuple[str, InlineKeyboardMarkup | None]:
+    body, btns = _build_details(page.rows)
+    lines = [_details_title(view, d1, d2), ""]
     if body:
         lines.append(body)
         lines.append("")
-    lines.append(f"💵 <b>Итого расходов:</b> -{total_exp:.2f} BYN")
-    if total_inc > 0:
-        lines.append(f"💵 <b>Итого доходов:</b> +{total_inc:.2f} BYN")
-
-    await c.message.edit_text(
-        "\n".join(lines).strip(),
-        parse_mode="HTML",
-        reply_markup=kb_details(btns, df, dt) if btns else None
-    )
+    lines.append(f"💵 <b>Итого расходов:</b> -{page.total_exp:.2f} BYN")
+    if page.total_inc > 0:
+        lines.append(f"💵 <b>Итого доходов:</b> +{page.total_inc:.2f} BYN")
+
+    kb = None
+    if btns:
+        first, last = page.rows[0], page.rows[-1]
+        first_key = pack_cursor(first.created_at, first.id)
+        df, dt = fmt_date(d1), fmt_date(d2)
+        kb = kb_details(
+            btns, df, dt,
+            page_key=first_key,
+            prev_key=first_key if page.has_prev else None,
+            next_key=pack_cursor(last.created_at, last.id) if page.has_next else None,
+            view=view,
+        )
+    return "\n".join(lines).strip(), kb
+
+def _without(page: DetailsPage, op_id: int) -> DetailsPage | None:
+    """Страница без удалённой строки; None — строки на ней нет или страница опустеет (тогда нужен запрос)."""
+    row = next((r for r in page.rows if r.id == op_id), None)
+    if row is None or len(page.rows) == 1:
+        return None
+    val = abs(float(row.amount))
+    rows = tuple(r for r in page.rows if r.id != op_id)
+    if row.type == "income":
+        return page._replace(rows=rows, total_inc=max(0.0, page.total_inc - val))
+    return page._replace(rows=rows, total_exp=max(0.0, page.total_exp - val))
+
+async def details_view(
+    s,
+    user_db_id: int,
+    d1: date,
+    d2: date,
+    view: str = "",
+    *,
+    cursor: tuple[datetime, int] | None = None,
+    direction: str = "next",
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    """
+    Одна страница детального списка (PAGE_SIZE строк) + итоги за весь период из агрегатов.
+    Если страница по курсору опустела (удалили последнее), показываем предыдущую.
+    Модель страницы кэшируется до следующей записи пользователя (view_cache).
+    view — заголовок (см. _DETAILS_TITLES); кнопки страницы несут его дальше.
+    """
+    page = await _details_page(s, user_db_id, d1, d2, cursor, direction)
+    if not page.rows and cursor is not None and direction != "prev":
+        page = await _details_page(s, user_db_id, d1, d2, cursor, "prev")
+    return _render_details(page, d1, d2, view)
+
+@router.callback_query(F.data.startswith("details:"))
+async def cb_details(c: types.CallbackQuery):
+    # details:<df>:<dt>[:n|p:<ts36>:<id36>[:<view>]]
+    parts = (c.data or "").split(":")
+    try:
+        d1, d2 = _parse_range(parts[1], parts[2])
+        cursor, direction = None, "next"
+        if len(parts) >= 6:
+            direction = "prev" if parts[3] == "p" else "next"
+            cursor = unpack_cursor(parts[4], parts[5])
+        view = parts[6] if len(parts) == 7 else ""
+    except Exception:
+        await c.answer("Некорректные данные")
+        return
+
+    async with session_scope() as s:
+        user = await resolve_user(s, c.from_user.id, None)
+        text, kb = await details_view(s, user.id, d1, d2, view, cursor=cursor, direction=direction)
+
+    await c.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
     await c.answer()
 
-def _build_details(ops) -> tuple[str, list[tuple[str,int]], float, float]:
+def _build_details(ops) -> tuple[str, list[tuple[str,int]]]:
     exp_groups, inc_groups = defaultdict(list), defaultdict(list)
-    display_name = {}
     for o in ops:
         key = _normalize_cat(o.category)
-        display_name[key] = key
         (inc_groups if o.type == "income" else exp_groups)[key].append(o)
 
     lines = []
-    total_exp = total_inc = 0.0
     btn_labels: list[tuple[str,int]] = []
 
     for key in sorted(exp_groups.keys()):
         lines.append(f"<b>{key}:</b>")
         for i, o in enumerate(exp_groups[key], 1):
-            val = abs(float(o.amount)); total_exp += val
+            val = abs(float(o.amount))
             nm = clean_name(o.description or "", key)
             lines.append(f"{i}. {nm} — -{val:.2f} BYN")
             btn_labels.append((f"{nm} -{val:.2f}", o.id))
@@ -161,52 +341,57 @@ def _build_details(ops) -> tuple[str, list[tuple[str,int]], float, float]:
     for key in sorted(inc_groups.keys()):
         lines.append(f"<b>{key}:</b>")
         for i, o in enumerate(inc_groups[key], 1):
-            val = abs(float(o.amount)); total_inc += val
+            val = abs(float(o.amount))
             nm = clean_name(o.description or "", key)
             lines.append(f"{i}. {nm} — +{val:.2f} BYN")
             btn_labels.append((f"{nm} +{val:.2f}", o.id))
         lines.append("")
 
-    return ("\n".join(lines).strip(), btn_labels, total_exp, total_inc)
+    return "\n".join(lines).strip(), btn_labels
 
 @router.callback_query(F.data.startswith("del:"))
 async def cb_delete(c: types.CallbackQuery):
+    # del:<op_id>:<df>:<dt>[:<ts36>:<id36>][:<view>] — курсор первой строки страницы и заголовок списка
+    parts = (c.data or "").split(":")
     try:
-        _, sid, df, dt = (c.data or "").split(":", 3)
-        op_id = int(sid)
+        op_id = int(parts[1])
+        d1, d2 = _parse_range(parts[2], parts[3])
+        cursor = unpack_cursor(parts[4], parts[5]) if len(parts) >= 6 else None
+        view = parts[-1] if len(parts) in (5, 7) else ""
     except Exception:
         await c.answer("Некорректные данные")
         return
 
-    d1 = datetime.strptime(df, "%Y-%m-%d").date()
-    d2 = datetime.strptime(dt, "%Y-%m-%d").date()
-    label = label_for_period(d1, d2, None)
-
     async with session_scope() as s:
-        user = await get_or_create_user(s, c.from_user.id, None)
+        user = await resolve_user(s, c.from_user.id, None)
+        version = data_version(user.id)
+        cached = view_cache.get(_details_key(user.id, d1, d2, cursor, "from", version)) if cursor else None
         ok = await delete_operation(s, user.id, op_id)
-        ops = await get_operations_range(s, user.id, d1, d2)
+        written = data_version(user.id)   # подъём версии этой записью; второй будет на commit
+        page = _without(cached, op_id) if ok and cached is not None else None
+        if page is None:
+            # промах кэша (или страница опустела) — полная перерисовка из БД
+            text, kb = await details_view(s, user.id, d1, d2, view, cursor=cursor, direction="from")
+        else:
+            text, kb = _render_details(page, d1, d2, view)
+            uid = user.id
 
-    body, btns, total_exp, total_inc = _build_details(ops)
-    lines = [f"📝 <b>Детальный отчёт</b> за {label}", ""]
-    if body:
-        lines.append(body)
-        lines.append("")
-    lines.append(f"💵 <b>Итого расходов:</b> -{total_exp:.2f} BYN")
-    if total_inc > 0:
-        lines.append(f"💵 <b>Итого доходов:</b> +{total_inc:.2f} BYN")
-
-    await c.message.edit_text(
-        "\n".join(lines).strip(),
-        parse_mode="HTML",
-        reply_markup=kb_details(btns, df, dt) if btns else None
-    )
+            def _keep_patched() -> None:
+                # версия только что поднялась на этом commit; если перед ним её поднимал не наш
+                # delete, а другая запись этого пользователя — правленая страница уже не точна
+                if previous_version(uid) == written:
+                    key = _details_key(uid, d1, d2, (page.rows[0].created_at, page.rows[0].id), "from",
+                                       data_version(uid))
+                    _remember_details(uid, d1, d2, key, page)
+
+            after_commit(s, _keep_patched)
+
+    await c.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
     await c.answer("Удалено" if ok else "Не нашёл запись")
 
 @router.callback_query(F.data.startswith("close:"))
 async def cb_close(c: types.CallbackQuery):
     _, df, dt = (c.data or "").split(":", 2)
-    d1 = datetime.strptime(df, "%Y-%m-%d").date()
-    d2 = datetime.strptime(dt, "%Y-%m-%d").date()
+    d1, d2 = _parse_range(df, dt)
     await _send_summary(c.message, c.from_user.id, c.from_user.username, d1, d2, None, edit=True)
     await c.answer()
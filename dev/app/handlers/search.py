@@ -3,44 +3,47 @@
 
 from __future__ import annotations
 
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message
 
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user
-from app.services.date_period import period_from_text
-from app.services.search import search_operations
+from app.repo.users import resolve_user
+from app.services.date_period import period_label
+from app.services.periods import strip_period
+from app.services.parser.intent import Intent, SEARCH
+from app.handlers.intent import IntentIs
+from app.services.search import search_operations, SearchResult
 
 router = Router(name=__name__)
 
 
-def _fmt_ops(ops: list, title: str) -> str:
-    if not ops:
+def _fmt_ops(res: SearchResult, title: str) -> str:
+    if not res.rows:
         return f"🔎 <b>{title}</b>\nНичего не нашёл."
     lines = [f"🔎 <b>{title}</b>", ""]
-    total_exp = total_inc = 0.0
-    for i, o in enumerate(ops, 1):
+    for i, o in enumerate(res.rows, 1):
         sign = "-" if o.type == "expense" else "+"
         val = abs(float(o.amount))
         name = (o.description or o.category or "запись").strip()
         lines.append(f"{i}. {name} — {sign}{val:.2f} BYN")
-        if o.type == "expense": total_exp += val
-        else: total_inc += val
     lines.append("")
-    if total_exp: lines.append(f"💵 Итого расходов: -{total_exp:.2f} BYN")
-    if total_inc: lines.append(f"💵 Итого доходов: +{total_inc:.2f} BYN")
+    # итоги посчитаны по всем совпадениям, даже если показана только часть
+    if res.total_exp: lines.append(f"💵 Итого расходов: -{res.total_exp:.2f} BYN")
+    if res.total_inc: lines.append(f"💵 Итого доходов: +{res.total_inc:.2f} BYN")
+    if res.found > len(res.rows):
+        lines.append(f"Найдено {res.found}, показаны {len(res.rows)} самых подходящих — уточни запрос.")
     return "\n".join(lines)
 
 
-@router.message(F.text.func(lambda t: t and not t.startswith("/") and any(k in t.lower() for k in ("вчера","недел","месяц","январ","феврал","март","апрел","май","июн","июл","август","сентябр","октябр","ноябр","декабр"))))
-async def text_search_period(m: Message) -> None:
-    text = m.text or ""
-    start, end, label = period_from_text(text)
+@router.message(IntentIs(SEARCH))
+async def text_search_period(m: Message, intent: Intent) -> None:
+    p = intent.period
+    start, end, label = p.start, p.end, period_label(p)
 
-    # ключевая фраза = всё сообщение (мы не вырезаем период отдельно — достаточно)
-    query = text
+    # ключевая фраза — сообщение без слов периода («июль», «вчера» — не термины поиска)
+    query = strip_period(intent.text, p)
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
-        ops = await search_operations(s, user.id, query, start, end)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
+        res = await search_operations(s, user.id, query, start, end)
 
-    await m.answer(_fmt_ops(ops, f"Поиск {label}"), parse_mode="HTML")
+    await m.answer(_fmt_ops(res, f"Поиск {label}"), parse_mode="HTML")
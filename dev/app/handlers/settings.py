@@ -6,7 +6,7 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from app.core.db import session_scope
-from app.repo.users import get_or_create_user, set_language, set_currency, set_daily_limit
+from app.repo.users import resolve_user, set_language, set_currency, set_daily_limit
 
 router = Router(name=__name__)
 
@@ -21,7 +21,7 @@ async def cmd_language(m: Message) -> None:
         await m.answer("Поддерживаем: ru, en")
         return
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         await set_language(s, user.id, lang)
     await m.answer(f"Ок, язык: {lang}")
 
@@ -33,7 +33,7 @@ async def cmd_currency(m: Message) -> None:
         return
     cur = parts[1].strip().upper()[:10]
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         await set_currency(s, user.id, cur)
     await m.answer(f"Ок, валюта: {cur}")
 
@@ -52,6 +52,6 @@ async def cmd_limit(m: Message) -> None:
             await m.answer("Число или 'off'")
             return
     async with session_scope() as s:
-        user = await get_or_create_user(s, m.from_user.id, m.from_user.username)
+        user = await resolve_user(s, m.from_user.id, m.from_user.username)
         await set_daily_limit(s, user.id, value)
     await m.answer(f"Лимит установлен: {value if value is not None else 'выключен'}")
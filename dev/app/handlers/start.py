@@ -21,6 +21,7 @@ async def cmd_start(m: Message) -> None:
         "<b>Команды:</b>\n"
         "/records — показать операции за сегодня (с удалением)\n"
         "/report — отчёт за период\n"
+        "/compare — этот месяц против прошлого по категориям\n"
         "/balance — текущий баланс\n"
         "/cancel — отменить диалог\n"
         "/help — справка"
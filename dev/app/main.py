@@ -22,6 +22,7 @@ async def _set_bot_commands(bot: Bot) -> None:
         BotCommand(command="help", description="Что я умею"),
         BotCommand(command="records", description="Траты/доходы за сегодня"),
         BotCommand(command="report", description="Отчёт за период"),
+        BotCommand(command="compare", description="Сравнить с прошлым месяцем"),
         BotCommand(command="balance", description="Баланс"),
         BotCommand(command="remind", description="Создать напоминание"),
         BotCommand(command="reminders", description="Список напоминаний на сегодня"),
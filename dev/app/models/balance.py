@@ -0,0 +1,18 @@
+# app/models/balance.py
+# Накопленные итоги пользователя: обновляются вместе с каждой записью в operations.
+
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+
+from app.models.user import Base
+
+
+class UserBalance(Base):
+    __tablename__ = "user_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    income = Column(Float, nullable=False, default=0.0)    # сумма доходов (положительная)
+    expense = Column(Float, nullable=False, default=0.0)   # сумма расходов (положительная)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
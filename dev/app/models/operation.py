@@ -4,7 +4,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.models.user import Base
@@ -23,3 +23,10 @@ class Operation(Base):
 
     # связи
     user = relationship("User", back_populates="operations")
+
+    # Горячие запросы фильтруют по user_id + диапазону created_at.
+    # На существующей БД индексы докатывает миграция (app/core/migrations.py).
+    __table_args__ = (
+        Index("ix_operations_user_created", "user_id", "created_at"),
+        Index("ix_operations_user_cat_created", "user_id", "category", "created_at"),
+    )
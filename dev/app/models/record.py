@@ -0,0 +1,16 @@
+# app/models/record.py
+# Read-модель операции для отчётов, поиска и экспорта: кортеж без identity map и трекинга.
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class OpRecord(NamedTuple):
+    id: int
+    created_at: datetime
+    type: str                    # 'income' | 'expense'
+    amount: float
+    category: str
+    description: Optional[str]
@@ -0,0 +1,20 @@
+# app/models/rollup.py
+# Дневные агрегаты: пользователь × день × категория × тип.
+# Ведутся инкрементально на каждой записи в operations, отчёты читают отсюда.
+
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+
+from app.models.user import Base
+
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)                 # дата created_at операции
+    category = Column(String(100), primary_key=True)
+    type = Column(String(10), primary_key=True)          # 'income' | 'expense'
+    total = Column(Float, nullable=False, default=0.0)   # сумма abs(amount)
+    cnt = Column(Integer, nullable=False, default=0)     # число операций
@@ -13,7 +13,13 @@ class UserTerm(Base):
     term = Column(String(255), nullable=False)
     category = Column(String(100), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # метка записи (мкс с эпохи): процессы дочитывают из БД только термины новее своего кэша
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     __table_args__ = (
         Index("ix_user_terms_user_term", "user_tg_id", "term", unique=True),
+        Index("ix_user_terms_user_version", "user_tg_id", "version"),
     )
+
+# user_tg_id для общих (глобальных) терминов
+GLOBAL_TG_ID = 0
@@ -0,0 +1,85 @@
+# app/repo/balances.py
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import select, update, func, case
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.balance import UserBalance
+from app.models.operation import Operation
+from app.repo.upsert import insert_for
+
+
+async def apply_balance_delta(session: AsyncSession, user_id: int, op_type: str, delta: float) -> None:
+    """
+    Атомарно прибавляет delta к доходам/расходам пользователя (delta < 0 — откат при удалении).
+    Один INSERT ... ON CONFLICT DO UPDATE, без чтения строки.
+    """
+    inc = delta if op_type == "income" else 0.0
+    exp = 0.0 if op_type == "income" else delta
+    stmt = insert_for(session, UserBalance).values(
+        user_id=user_id, income=inc, expense=exp, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserBalance.user_id],
+        set_={
+            "income": UserBalance.income + stmt.excluded.income,
+            "expense": UserBalance.expense + stmt.excluded.expense,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def get_totals(session: AsyncSession, user_id: int) -> tuple[float, float]:
+    """(доходы, расходы) одной строкой по первичному ключу."""
+    q = await session.execute(
+        select(UserBalance.income, UserBalance.expense).where(UserBalance.user_id == user_id)
+    )
+    row = q.one_or_none()
+    if not row:
+        return 0.0, 0.0
+    return float(row[0] or 0.0), float(row[1] or 0.0)
+
+
+def totals_by_user_select():
+    """SELECT user_id, доходы, расходы из operations (GROUP BY user_id)."""
+    val = func.abs(Operation.amount)
+    return select(
+        Operation.user_id,
+        func.coalesce(func.sum(case((Operation.type == "income", val), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((Operation.type == "income", 0.0), else_=val)), 0.0),
+    ).where(Operation.user_id.is_not(None)).group_by(Operation.user_id)
+
+
+async def rebuild_balances(session: AsyncSession | AsyncConnection, user_id: int | None = None) -> int:
+    """
+    Пересчитывает итоги с нуля по operations (ремонт после ручных правок в БД).
+    user_id=None — для всех пользователей. Возвращает число обновлённых строк.
+    """
+    sel = totals_by_user_select()
+    if user_id is not None:
+        sel = sel.where(Operation.user_id == user_id)
+    rows = (await session.execute(sel)).all()
+
+    now = datetime.utcnow()
+    if rows:
+        stmt = insert_for(session, UserBalance)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserBalance.user_id],
+            set_={"income": stmt.excluded.income, "expense": stmt.excluded.expense,
+                  "updated_at": stmt.excluded.updated_at},
+        )
+        await session.execute(stmt, [
+            {"user_id": uid, "income": float(inc), "expense": float(exp), "updated_at": now}
+            for uid, inc, exp in rows
+        ])
+
+    # у кого операций не осталось — обнуляем
+    has_ops = select(Operation.id).where(Operation.user_id == UserBalance.user_id).exists()
+    stale = update(UserBalance).where(~has_ops).values(income=0.0, expense=0.0, updated_at=now)
+    if user_id is not None:
+        stale = stale.where(UserBalance.user_id == user_id)
+    await session.execute(stale)
+    return len(rows)
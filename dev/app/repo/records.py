@@ -1,17 +1,76 @@
 # app/repo/records.py
 from __future__ import annotations
 from datetime import datetime, date, timedelta
-from collections import defaultdict
-from typing import Iterable, List, Optional
+from collections import OrderedDict, defaultdict
+from itertools import count
+from typing import Iterable, List, NamedTuple, Optional
 
-from sqlalchemy import select, and_, asc
+from sqlalchemy import select, insert, update, and_, asc, desc, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import after_commit
 from app.models.operation import Operation
+from app.models.record import OpRecord
+from app.repo.balances import apply_balance_delta, get_totals
+from app.repo.rollups import apply_rollup_delta, rollup_totals
+from app.repo.spend import apply_spend_delta
 
-def _normalize_amount(op: Operation) -> float:
-    # доходы положительные, расходы отрицательные
-    sign = 1.0 if (op.type == "income") else -1.0
-    return float(abs(op.amount)) * sign
+# user_id -> (версия данных, предыдущая версия); версия растёт на каждой записи, по ней ключуются
+# кэши отрисованных отчётов. Версии берутся из одного счётчика, так что порядок в LRU — это и порядок
+# версий. Вытесненный пользователь получает _version_floor (версию последнего вытесненного): она не
+# меньше его прежней, значит закэшированное под старой версией заведомо не совпадёт, а память ограничена.
+# Номера версий между пользователями не сравнимы: чужие записи тоже двигают счётчик.
+DATA_VERSIONS_SIZE = 10_000
+_data_versions: OrderedDict[int, tuple[int, int]] = OrderedDict()
+_version_seq = count(1)
+_version_floor = 0
+
+def data_version(user_id: int) -> int:
+    entry = _data_versions.get(user_id)
+    return entry[0] if entry else _version_floor
+
+def previous_version(user_id: int) -> int:
+    """Версия пользователя до последнего подъёма — проверить, что между двумя своими никто не писал."""
+    entry = _data_versions.get(user_id)
+    return entry[1] if entry else _version_floor
+
+def _bump_version(user_id: int) -> None:
+    global _version_floor
+    _data_versions[user_id] = (next(_version_seq), data_version(user_id))
+    _data_versions.move_to_end(user_id)
+    while len(_data_versions) > DATA_VERSIONS_SIZE:
+        _, (_version_floor, _) = _data_versions.popitem(last=False)
+
+def _mark_changed(session: AsyncSession, user_id: int) -> None:
+    # сразу — чтобы чтение в этой же сессии не легло в кэш под старой версией;
+    # после commit — чтобы выбросить то, что другие сессии успели закэшировать до него
+    _bump_version(user_id)
+    after_commit(session, lambda: _bump_version(user_id))
+
+def _row(op: Operation) -> dict:
+    return {"type": op.type, "amount": op.amount, "category": op.category, "created_at": op.created_at}
+
+async def _on_write(session: AsyncSession, user_id: int, rows: Iterable[dict], sign: int) -> None:
+    """
+    Инкрементальные агрегаты, которые живут рядом с operations.
+    rows — словари с type/amount/category/created_at одного пользователя.
+    sign=+1 — операции добавлены, -1 — удалены. Выполняется в той же транзакции.
+    Дельты сначала сворачиваем, чтобы пачка строк давала по одному апсерту на группу.
+    """
+    rows = list(rows)
+    _mark_changed(session, user_id)
+    after_commit(session, lambda: apply_spend_delta(user_id, rows, sign))
+    by_type: dict[str, float] = defaultdict(float)
+    by_day: dict[tuple[date, str, str], list] = {}
+    for r in rows:
+        val = float(abs(r["amount"]))
+        by_type[r["type"]] += val
+        acc = by_day.setdefault((r["created_at"].date(), r["category"], r["type"]), [0.0, 0])
+        acc[0] += val
+        acc[1] += 1
+    for op_type, val in by_type.items():
+        await apply_balance_delta(session, user_id, op_type, sign * val)
+    for (day, category, op_type), (val, n) in by_day.items():
+        await apply_rollup_delta(session, user_id, day, category, op_type, sign * val, sign * n)
 
 async def add_operation(
     session: AsyncSession,
@@ -32,8 +91,41 @@ async def add_operation(
     )
     session.add(op)
     await session.flush()
+    await _on_write(session, user_id, [_row(op)], +1)
     return op
 
+async def add_operations_bulk(
+    session: AsyncSession,
+    user_id: int,
+    items: Iterable[dict],
+) -> list[int]:
+    """
+    Вставка пачки операций одним многострочным INSERT ... RETURNING id.
+    items: словари с ключами amount, category, description, type и необязательным created_at.
+    Возвращает id в порядке items.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "amount": it["amount"],
+            "category": it["category"],
+            "description": it.get("description"),
+            "type": it["type"],
+            "created_at": it.get("created_at") or now,
+        }
+        for it in items
+    ]
+    if not rows:
+        return []
+    res = await session.execute(
+        insert(Operation).returning(Operation.id, sort_by_parameter_order=True),
+        rows,
+    )
+    ids = list(res.scalars().all())
+    await _on_write(session, user_id, rows, +1)
+    return ids
+
 async def delete_operation(session: AsyncSession, user_id: int, op_id: int) -> bool:
     q = await session.execute(select(Operation).where(
         and_(Operation.id == op_id, Operation.user_id == user_id)
@@ -42,35 +134,161 @@ async def delete_operation(session: AsyncSession, user_id: int, op_id: int) -> b
     if not op:
         return False
     await session.delete(op)
+    await _on_write(session, user_id, [_row(op)], -1)
     return True
 
-async def get_operations_range(
+async def recategorize_operations(
+    session: AsyncSession,
+    user_id: int,
+    changes: Iterable[tuple[OpRecord, str]],
+) -> int:
+    """
+    Переносит операции пользователя в новые категории: пачечный UPDATE по id
+    и перенос сумм между строками daily_rollups. Балансы не трогаем — тип и сумма прежние.
+    changes: (операция с текущей категорией, новая категория). Возвращает число изменённых.
+    """
+    changes = [(r, cat) for r, cat in changes if cat != r.category]
+    if not changes:
+        return 0
+    await session.execute(update(Operation), [{"id": r.id, "category": cat} for r, cat in changes])
+    _mark_changed(session, user_id)
+
+    moves: dict[tuple[date, str, str], list] = {}
+    for r, cat in changes:
+        val = float(abs(r.amount))
+        day = r.created_at.date()
+        for key, sign in (((day, r.category, r.type), -1), ((day, cat, r.type), +1)):
+            acc = moves.setdefault(key, [0.0, 0])
+            acc[0] += sign * val
+            acc[1] += sign
+    for (day, category, op_type), (val, n) in moves.items():
+        if n or val:
+            await apply_rollup_delta(session, user_id, day, category, op_type, val, n)
+    return len(changes)
+
+# колонки read-модели в порядке полей OpRecord
+RECORD_COLUMNS = (
+    Operation.id,
+    Operation.created_at,
+    Operation.type,
+    Operation.amount,
+    Operation.category,
+    Operation.description,
+)
+
+async def get_records_range(
     session: AsyncSession,
     user_id: int,
     start: date,
     end: date,
-) -> list[Operation]:
+) -> list[OpRecord]:
+    """
+    Операции за период для чтения: Core-select нужных колонок,
+    строки — лёгкие OpRecord без ORM-сущностей.
+    """
     start_dt = datetime.combine(start, datetime.min.time())
     end_dt = datetime.combine(end, datetime.max.time())
-    q = await session.execute(select(Operation)
+    q = await session.execute(select(*RECORD_COLUMNS)
                               .where(and_(
                                   Operation.user_id == user_id,
                                   Operation.created_at >= start_dt,
                                   Operation.created_at <= end_dt
                               ))
                               .order_by(asc(Operation.created_at)))
-    return list(q.scalars().all())
+    return [OpRecord._make(r) for r in q.all()]
+
+PAGE_SIZE = 20
+
+class RecordsPage(NamedTuple):
+    rows: list[OpRecord]
+    has_prev: bool
+    has_next: bool
+
+async def get_records_page(
+    session: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    *,
+    cursor: tuple[datetime, int] | None = None,
+    direction: str = "next",
+    limit: int = PAGE_SIZE,
+) -> RecordsPage:
+    """
+    Одна страница операций за период по ключу (created_at, id), без OFFSET.
+    direction: "next" — строго после cursor, "prev" — строго до cursor,
+    "from" — начиная с cursor включительно (перерисовка той же страницы).
+    Без cursor — первая страница.
+    """
+    start_dt = datetime.combine(start, datetime.min.time())
+    end_dt = datetime.combine(end, datetime.max.time())
+    in_range = and_(
+        Operation.user_id == user_id,
+        Operation.created_at >= start_dt,
+        Operation.created_at <= end_dt,
+    )
+    key = tuple_(Operation.created_at, Operation.id)
+
+    stmt = select(*RECORD_COLUMNS).where(in_range)
+    backwards = direction == "prev" and cursor is not None
+    if backwards:
+        stmt = stmt.where(key < tuple_(*cursor)).order_by(desc(Operation.created_at), desc(Operation.id))
+    else:
+        if cursor is not None:
+            stmt = stmt.where(key >= tuple_(*cursor) if direction == "from" else key > tuple_(*cursor))
+        stmt = stmt.order_by(asc(Operation.created_at), asc(Operation.id))
+
+    q = await session.execute(stmt.limit(limit + 1))
+    rows = [OpRecord._make(r) for r in q.all()]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    async def _exists(cond) -> bool:
+        found = await session.execute(select(Operation.id).where(in_range, cond).limit(1))
+        return found.first() is not None
+
+    if not rows:
+        return RecordsPage(rows, False, False)
+    first, last = (rows[0].created_at, rows[0].id), (rows[-1].created_at, rows[-1].id)
+    if backwards:
+        return RecordsPage(rows, more, await _exists(key > tuple_(*last)))
+    has_prev = cursor is not None and await _exists(key < tuple_(*first))
+    return RecordsPage(rows, has_prev, more)
+
+class CategoryTotal(NamedTuple):
+    category: str
+    type: str      # "income" | "expense"
+    total: float   # всегда положительная сумма
+    count: int
+
+async def category_totals(
+    session: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    op_type: str | None = None,
+) -> list[CategoryTotal]:
+    """
+    Суммы и количество операций по (категория × тип) за период.
+    Читает дневные агрегаты (daily_rollups): не больше строки на день и категорию.
+    """
+    rows = await rollup_totals(session, user_id, start, end, op_type)
+    return [
+        CategoryTotal(cat or "Прочее", typ, float(total or 0.0), int(cnt or 0))
+        for cat, typ, total, cnt in rows
+    ]
 
-async def aggregate_by_category(ops: Iterable[Operation]) -> dict[str, float]:
+def signed_by_category(totals: Iterable[CategoryTotal]) -> dict[str, float]:
+    """{категория: сумма со знаком}: доходы > 0, расходы < 0."""
     agg: dict[str, float] = defaultdict(float)
-    for o in ops:
-        agg[o.category or "Прочее"] += _normalize_amount(o)
-    # округление до 2 знаков
+    for t in totals:
+        sign = 1.0 if t.type == "income" else -1.0
+        agg[t.category or "Прочее"] += sign * t.total
     return {k: round(v, 2) for k, v in agg.items()}
 
 async def balance(session: AsyncSession, user_id: int) -> float:
-    q = await session.execute(select(Operation).where(Operation.user_id == user_id))
-    ops = list(q.scalars().all())
-    inc = sum(_normalize_amount(o) for o in ops if o.type == "income")
-    exp = sum(_normalize_amount(o) for o in ops if o.type == "expense")
-    return round(inc + exp, 2)
+    """Текущий баланс из user_balances — одна строка вместо суммирования всей истории."""
+    inc, exp = await get_totals(session, user_id)
+    return round(inc - exp, 2)
@@ -0,0 +1,159 @@
+# app/repo/rollups.py
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Date, and_, case, cast, delete, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.operation import Operation
+from app.models.rollup import DailyRollup
+from app.repo.upsert import dialect_name, insert_for
+
+
+async def apply_rollup_delta(
+    session: AsyncSession,
+    user_id: int,
+    day: date,
+    category: str,
+    op_type: str,
+    delta: float,
+    dcount: int,
+) -> None:
+    """Прибавляет delta/dcount к дневной строке (создаёт её при первой операции дня)."""
+    stmt = insert_for(session, DailyRollup).values(
+        user_id=user_id, day=day, category=category, type=op_type, total=delta, cnt=dcount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.category, DailyRollup.type],
+        set_={
+            "total": DailyRollup.total + stmt.excluded.total,
+            "cnt": DailyRollup.cnt + stmt.excluded.cnt,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def rollup_totals(
+    session: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    op_type: str | None = None,
+) -> list[tuple[str, str, float, int]]:
+    """(категория, тип, сумма, количество) за период — не больше строки на день и категорию."""
+    conds = [DailyRollup.user_id == user_id, DailyRollup.day >= start, DailyRollup.day <= end]
+    if op_type:
+        conds.append(DailyRollup.type == op_type)
+    q = await session.execute(
+        select(DailyRollup.category, DailyRollup.type, func.sum(DailyRollup.total), func.sum(DailyRollup.cnt))
+        .where(and_(*conds))
+        .group_by(DailyRollup.category, DailyRollup.type)
+        .having(func.sum(DailyRollup.cnt) > 0)
+    )
+    return [tuple(r) for r in q.all()]
+
+
+async def rollup_compare(
+    session: AsyncSession,
+    user_id: int,
+    cur: tuple[date, date],
+    prev: tuple[date, date],
+) -> list[tuple[str, str, float, float]]:
+    """
+    (категория, тип, сумма за cur, сумма за prev) — оба периода одним GROUP BY:
+    читаем дни от начала раннего до конца позднего, суммы раскладываем через CASE.
+    """
+    in_cur = DailyRollup.day.between(*cur)
+    in_prev = DailyRollup.day.between(*prev)
+    q = await session.execute(
+        select(
+            DailyRollup.category,
+            DailyRollup.type,
+            func.sum(case((in_cur, DailyRollup.total), else_=0.0)),
+            func.sum(case((in_prev, DailyRollup.total), else_=0.0)),
+        )
+        .where(and_(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day >= min(cur[0], prev[0]),
+            DailyRollup.day <= max(cur[1], prev[1]),
+            DailyRollup.cnt > 0,
+        ))
+        .group_by(DailyRollup.category, DailyRollup.type)
+    )
+    return [(cat, typ, float(a or 0.0), float(b or 0.0)) for cat, typ, a, b in q.all()]
+
+
+def _bucket_expr(dialect: str, unit: str):
+    # первый день недели (понедельник) или месяца, которому принадлежит день
+    if unit == "day":
+        return DailyRollup.day
+    if dialect == "sqlite":
+        if unit == "week":
+            # 'weekday 0' — ближайшее воскресенье не раньше дня; минус 6 дней — понедельник
+            return type_coerce(func.date(DailyRollup.day, "weekday 0", "-6 days"), Date)
+        return type_coerce(func.strftime("%Y-%m-01", DailyRollup.day), Date)
+    return cast(func.date_trunc(unit, DailyRollup.day), Date)
+
+
+async def rollup_buckets(
+    session: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    unit: str = "month",
+) -> list[tuple[date, str, float]]:
+    """(начало дня/недели/месяца, тип, сумма) за период по возрастанию — один GROUP BY по daily_rollups."""
+    bucket = _bucket_expr(dialect_name(session), unit)
+    q = await session.execute(
+        select(bucket, DailyRollup.type, func.sum(DailyRollup.total))
+        .where(and_(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day >= start,
+            DailyRollup.day <= end,
+            DailyRollup.cnt > 0,
+        ))
+        .group_by(bucket, DailyRollup.type)
+        .order_by(bucket)
+    )
+    return [(d, typ, float(total)) for d, typ, total in q.all()]
+
+
+def _day_expr(dialect: str):
+    # SQLite хранит Date строкой 'YYYY-MM-DD' — date() даёт ровно её; в Postgres — обычный CAST
+    if dialect == "sqlite":
+        return func.date(Operation.created_at)
+    return cast(Operation.created_at, Date)
+
+
+async def rebuild_rollups(bind: AsyncSession | AsyncConnection, user_id: int | None = None) -> int:
+    """
+    Пересобирает дневные агрегаты из operations (бэкфилл/ремонт).
+    user_id=None — для всех. Возвращает число строк в daily_rollups после пересборки.
+    """
+    day = _day_expr(dialect_name(bind))
+    sel = (
+        select(
+            Operation.user_id,
+            day,
+            Operation.category,
+            Operation.type,
+            func.sum(func.abs(Operation.amount)),
+            func.count(Operation.id),
+        )
+        .where(Operation.user_id.is_not(None))
+        .group_by(Operation.user_id, day, Operation.category, Operation.type)
+    )
+    wipe = delete(DailyRollup)
+    if user_id is not None:
+        sel = sel.where(Operation.user_id == user_id)
+        wipe = wipe.where(DailyRollup.user_id == user_id)
+
+    await bind.execute(wipe)
+    await bind.execute(DailyRollup.__table__.insert().from_select(
+        ["user_id", "day", "category", "type", "total", "cnt"], sel
+    ))
+    cnt = select(func.count()).select_from(DailyRollup)
+    if user_id is not None:
+        cnt = cnt.where(DailyRollup.user_id == user_id)
+    return int((await bind.execute(cnt)).scalar_one())
@@ -0,0 +1,86 @@
+# app/repo/spend.py
+# «Потрачено сегодня» по локальным суткам (settings.tz) для проверки daily_limit.
+# Счётчик в памяти ведёт records._on_write после commit; на промахе — одна сумма по operations за сутки.
+# daily_rollups тут не годятся: их день — дата created_at в UTC, а лимит — на местные сутки.
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.operation import Operation
+from app.utils.cache import TTLCache
+
+SPENT_CACHE_SIZE = 10_000
+SPENT_CACHE_TTL = 24 * 3600   # сек; запись за прошлые сутки всё равно не используется
+
+# user_id -> (местная дата, сумма расходов за неё); вытесненный — просто промах и SUM по БД
+_spent: TTLCache[int, tuple[date, float]] = TTLCache(SPENT_CACHE_SIZE, SPENT_CACHE_TTL)
+
+
+def local_today() -> date:
+    return datetime.now(ZoneInfo(settings.tz)).date()
+
+
+def _local_day(created_at: datetime) -> date:
+    # created_at — naive UTC (datetime.utcnow())
+    return created_at.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(settings.tz)).date()
+
+
+def _utc_bounds(day: date) -> tuple[datetime, datetime]:
+    tz = ZoneInfo(settings.tz)
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return (start.astimezone(timezone.utc).replace(tzinfo=None),
+            end.astimezone(timezone.utc).replace(tzinfo=None))
+
+
+def apply_spend_delta(user_id: int, rows: Iterable[dict], sign: int) -> None:
+    """
+    Вызывается после commit записи (rows — как в _on_write). Правит только уже загруженный
+    счётчик за сегодня; нет счётчика — следующий spent_today прочитает закоммиченное из БД.
+    """
+    entry = _spent.get(user_id)
+    if entry is None:
+        return
+    day, total = entry
+    if day != local_today():
+        _spent.pop(user_id)
+        return
+    for r in rows:
+        if r["type"] == "expense" and _local_day(r["created_at"]) == day:
+            total += sign * float(abs(r["amount"]))
+    _spent.set(user_id, (day, max(0.0, total)))
+
+
+async def spent_today(session: AsyncSession, user_id: int) -> float:
+    """
+    Сумма расходов за местные сегодня: из памяти за O(1), на промахе — один SUM по индексу (user_id, created_at).
+    Считает закоммиченное: вызывать до записи в этой же сессии, иначе своя запись учтётся дважды.
+    """
+    from app.repo.records import data_version   # records импортирует этот модуль
+
+    day = local_today()
+    entry = _spent.get(user_id)
+    if entry is not None and entry[0] == day:
+        return entry[1]
+
+    version = data_version(user_id)
+    start, end = _utc_bounds(day)
+    q = await session.execute(
+        select(func.coalesce(func.sum(func.abs(Operation.amount)), 0.0)).where(and_(
+            Operation.user_id == user_id,
+            Operation.type == "expense",
+            Operation.created_at >= start,
+            Operation.created_at < end,
+        ))
+    )
+    total = float(q.scalar_one())
+    # если пока читали, кто-то записал или закоммитил — результат мог его пропустить: не кэшируем
+    if data_version(user_id) == version:
+        _spent.set(user_id, (day, total))
+    return total
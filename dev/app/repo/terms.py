@@ -1,23 +1,44 @@
 # app/repo/terms.py
 from __future__ import annotations
-from sqlalchemy import select
+from typing import NamedTuple
+from sqlalchemy import select, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.term import UserTerm
+from app.repo.upsert import insert_for
+
+
+class TermRow(NamedTuple):
+    user_tg_id: int
+    term: str
+    category: str
+    version: int
+
 
 async def get_user_term(session: AsyncSession, user_tg_id: int, term: str) -> str | None:
     q = await session.execute(
-        select(UserTerm).where(UserTerm.user_tg_id == user_tg_id, UserTerm.term == term)
+        select(UserTerm.category).where(UserTerm.user_tg_id == user_tg_id, UserTerm.term == term)
+    )
+    return q.scalar_one_or_none()
+
+async def save_user_term_db(session: AsyncSession, user_tg_id: int, term: str, category: str, version: int) -> None:
+    # настоящий upsert: без SELECT и без гонки двух процессов на уникальном (user_tg_id, term)
+    ins = insert_for(session, UserTerm.__table__).values(
+        user_tg_id=user_tg_id, term=term, category=category, version=version,
     )
-    row = q.scalar_one_or_none()
-    return row.category if row else None
+    await session.execute(ins.on_conflict_do_update(
+        index_elements=[UserTerm.user_tg_id, UserTerm.term],
+        set_={"category": ins.excluded.category, "version": ins.excluded.version},
+    ))
 
-async def save_user_term_db(session: AsyncSession, user_tg_id: int, term: str, category: str) -> None:
-    # upsert-поведение: если есть — обновим
+async def load_terms(session: AsyncSession, since: dict[int, int]) -> list[TermRow]:
+    """
+    Термины нескольких владельцев одним запросом: {user_tg_id: version} -> строки с version > since.
+    since = -1 — загрузить всё. Идёт по индексу (user_tg_id, version).
+    """
+    if not since:
+        return []
+    cond = or_(*[and_(UserTerm.user_tg_id == uid, UserTerm.version > v) for uid, v in since.items()])
     q = await session.execute(
-        select(UserTerm).where(UserTerm.user_tg_id == user_tg_id, UserTerm.term == term)
+        select(UserTerm.user_tg_id, UserTerm.term, UserTerm.category, UserTerm.version).where(cond)
     )
-    row = q.scalar_one_or_none()
-    if row:
-        row.category = category
-        return
-    session.add(UserTerm(user_tg_id=user_tg_id, term=term, category=category))
+    return [TermRow._make(r) for r in q.all()]
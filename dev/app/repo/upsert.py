@@ -0,0 +1,23 @@
+# app/repo/upsert.py
+# INSERT ... ON CONFLICT под текущий диалект (Postgres в проде, SQLite локально).
+
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+
+def dialect_name(bind: AsyncSession | AsyncConnection) -> str:
+    if isinstance(bind, AsyncSession):
+        return bind.get_bind().dialect.name
+    return bind.dialect.name
+
+
+def insert_for(bind: AsyncSession | AsyncConnection, table):
+    """insert() с поддержкой on_conflict_do_update/do_nothing для диалекта bind."""
+    name = dialect_name(bind)
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"upsert не поддержан для диалекта {name}")
@@ -1,10 +1,55 @@
 # app/repo/users.py
 from __future__ import annotations
 
-from sqlalchemy import select, func
+from typing import NamedTuple
+
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import after_commit
 from app.models.user import User
 from app.models.operation import Operation
+from app.repo.upsert import insert_for
+from app.utils.cache import TTLCache
+
+USER_CACHE_TTL = 300      # сек; заодно ограничивает, насколько устареет username
+USER_CACHE_SIZE = 10_000
+
+
+class UserIdentity(NamedTuple):
+    id: int
+    language: str | None
+    currency: str | None
+    daily_limit: float | None
+
+
+# telegram_id -> UserIdentity
+user_cache: TTLCache[int, UserIdentity] = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+async def resolve_user(session: AsyncSession, tg_id: int, username: str | None = None) -> UserIdentity:
+    """
+    telegram_id -> (id, language, currency, daily_limit).
+    Из кэша без запроса в БД; на промахе — один upsert с RETURNING вместо SELECT + INSERT.
+    """
+    ident = user_cache.get(tg_id)
+    if ident is not None:
+        return ident
+
+    ins = insert_for(session, User.__table__).values(telegram_id=tg_id, username=username)
+    stmt = ins.on_conflict_do_update(
+        index_elements=[User.__table__.c.telegram_id],
+        set_={"username": func.coalesce(ins.excluded.username, User.__table__.c.username)},
+    ).returning(User.id, User.language, User.currency, User.daily_limit)
+    row = (await session.execute(stmt)).one()
+    ident = UserIdentity._make(row)
+    # в кэш — только после commit: иначе откат оставит id несуществующей строки
+    after_commit(session, lambda: user_cache.set(tg_id, ident))
+    return ident
+
+async def find_user_id(session: AsyncSession, tg_id: int) -> int | None:
+    """telegram_id -> users.id без создания строки (для админских команд по чужому id)."""
+    q = await session.execute(select(User.id).where(User.telegram_id == tg_id))
+    return q.scalar_one_or_none()
 
 async def get_or_create_user(session: AsyncSession, tg_id: int, username: str | None = None) -> User:
     q = await session.execute(select(User).where(User.telegram_id == tg_id))
@@ -18,26 +63,23 @@ async def get_or_create_user(session: AsyncSession, tg_id: int, username: str |
     await session.flush()
     return user
 
+async def _update_settings(session: AsyncSession, user_db_id: int, **values) -> None:
+    res = await session.execute(
+        update(User).where(User.id == user_db_id).values(**values).returning(User.telegram_id)
+    )
+    tg_id = res.scalar_one_or_none()
+    if tg_id is not None:
+        user_cache.pop(tg_id)
+        after_commit(session, lambda: user_cache.pop(tg_id))
+
 async def set_language(session: AsyncSession, user_db_id: int, lang: str) -> None:
-    q = await session.execute(select(User).where(User.id == user_db_id))
-    u = q.scalar_one_or_none()
-    if u:
-        u.language = lang[:10].lower()
-        await session.flush()
+    await _update_settings(session, user_db_id, language=lang[:10].lower())
 
 async def set_currency(session: AsyncSession, user_db_id: int, currency: str) -> None:
-    q = await session.execute(select(User).where(User.id == user_db_id))
-    u = q.scalar_one_or_none()
-    if u:
-        u.currency = currency[:10].upper()
-        await session.flush()
+    await _update_settings(session, user_db_id, currency=currency[:10].upper())
 
 async def set_daily_limit(session: AsyncSession, user_db_id: int, amount: float | None) -> None:
-    q = await session.execute(select(User).where(User.id == user_db_id))
-    u = q.scalar_one_or_none()
-    if u:
-        u.daily_limit = amount
-        await session.flush()
+    await _update_settings(session, user_db_id, daily_limit=amount)
 
 # Админская статистика
 async def total_users(session: AsyncSession) -> int:
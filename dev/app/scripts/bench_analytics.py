@@ -0,0 +1,139 @@
+# app/scripts/bench_analytics.py
+# Бенчмарк разбивки длинного периода по месяцам: GROUP BY в SQL (range_buckets, так считает бот)
+# против выборки дневных строк daily_rollups и группировки в Python — циклом и, если есть numpy, столбцами.
+#
+# Запуск (из dev/; БД — временная SQLite, схема через migrate):
+#   python -m app.scripts.bench_analytics
+#   python -m app.scripts.bench_analytics --days 3650 --cats 15
+#
+# Каждый путь меряется целиком, с запросом к БД: так и работает отчёт.
+# Заодно сверяет результаты: все пути обязаны совпадать (с точностью до копеек).
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from importlib.util import find_spec
+from pathlib import Path
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate
+from app.models.rollup import DailyRollup
+from app.services.analytics import Bucket, range_buckets
+
+_CATS = ["Еда", "Транспорт", "Подписки", "Развлечения", "Здоровье", "Одежда", "Алкоголь",
+         "Связь и интернет", "Коммунальные платежи", "Домашние расходы", "Прочее", "Доход"]
+USER_ID = 1
+
+
+def _rows(days: int, cats: int, end: date, rnd: random.Random) -> list[dict]:
+    # как в daily_rollups: не больше строки на день × категорию × тип
+    names = (_CATS * (cats // len(_CATS) + 1))[:cats]
+    names = [n if i < len(_CATS) else f"{n} {i}" for i, n in enumerate(names)]
+    start = end - timedelta(days=days - 1)
+    out = []
+    for k in range(days):
+        day = start + timedelta(days=k)
+        for cat in names:
+            if rnd.random() < 0.6:
+                n = rnd.randint(1, 4)
+                out.append(dict(user_id=USER_ID, day=day, category=cat, type="income" if cat == "Доход" else "expense",
+                                total=round(rnd.uniform(1, 80) * n, 2), cnt=n))
+    return out
+
+
+async def _sql(s: AsyncSession, start: date, end: date) -> list[Bucket]:
+    return await range_buckets(s, USER_ID, start, end, "month")
+
+
+async def _day_rows(s: AsyncSession, start: date, end: date) -> list[tuple[date, str, float]]:
+    q = await s.execute(
+        select(DailyRollup.day, DailyRollup.type, func.sum(DailyRollup.total))
+        .where(and_(DailyRollup.user_id == USER_ID, DailyRollup.day >= start, DailyRollup.day <= end,
+                    DailyRollup.cnt > 0))
+        .group_by(DailyRollup.day, DailyRollup.type)
+        .order_by(DailyRollup.day)
+    )
+    return q.all()
+
+
+async def _days_loop(s: AsyncSession, start: date, end: date) -> list[Bucket]:
+    acc: dict[date, list[float]] = {}
+    for d, typ, total in await _day_rows(s, start, end):
+        acc.setdefault(d.replace(day=1), [0.0, 0.0])[typ == "income"] += total
+    return [Bucket(d, e, i) for d, (e, i) in acc.items()]
+
+
+async def _days_numpy(s: AsyncSession, start: date, end: date) -> list[Bucket]:
+    import numpy as np
+    days, types, totals = zip(*await _day_rows(s, start, end))
+    month = np.array(days, dtype="datetime64[D]").astype("datetime64[M]")
+    income = np.array(types, dtype=object) == "income"
+    amount = np.array(totals, dtype=np.float64)
+    # строки отсортированы по дню: начало месяца — где ключ сменился
+    starts = np.flatnonzero(np.concatenate(([True], month[1:] != month[:-1])))
+    exp = np.add.reduceat(np.where(income, 0.0, amount), starts)
+    inc = np.add.reduceat(np.where(income, amount, 0.0), starts)
+    return [Bucket(m, e, i) for m, e, i in
+            zip(month[starts].astype("datetime64[D]").tolist(), exp.tolist(), inc.tolist())]
+
+
+def _same(a: list[Bucket], b: list[Bucket]) -> bool:
+    return len(a) == len(b) and all(
+        x.start == y.start
+        and math.isclose(x.expense, y.expense, abs_tol=0.005)
+        and math.isclose(x.income, y.income, abs_tol=0.005)
+        for x, y in zip(a, b)
+    )
+
+
+async def run(days: int, cats: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        try:
+            await migrate(engine)
+            end = date.today()
+            start = end - timedelta(days=days - 1)
+            rows = _rows(days, cats, end, random.Random(42))
+            async with engine.begin() as conn:
+                await conn.execute(insert(DailyRollup), rows)
+
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            cases = [("sql group by", _sql), ("days + loop", _days_loop)]
+            if find_spec("numpy") is not None:
+                cases.append(("days + numpy", _days_numpy))
+            async with Session() as s:
+                ref = await _sql(s, start, end)
+                for name, fn in cases[1:]:
+                    if not _same(ref, await fn(s, start, end)):
+                        raise SystemExit(f"mismatch: {name}")
+
+                print(f"{days} дн. × {cats} кат. = {len(rows)} строк rollup, {len(ref)} мес.")
+                print(f"{'path':<14} {'ms':>8}")
+                for name, fn in cases:
+                    t0 = time.perf_counter()
+                    for _ in range(rounds):
+                        await fn(s, start, end)
+                    print(f"{name:<14} {(time.perf_counter() - t0) / rounds * 1000:>8.2f}")
+        finally:
+            await engine.dispose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк помесячной разбивки длинных периодов")
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--cats", type=int, default=12)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+    asyncio.run(run(args.days, args.cats, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# app/scripts/bench_bulk.py
+# Бенчмарк вставки многострочных сообщений: построчный add_operation против add_operations_bulk.
+#
+# Запуск (из dev/):
+#   python -m app.scripts.bench_bulk                         # SQLite во временном файле
+#   python -m app.scripts.bench_bulk --url postgresql+asyncpg://... --sizes 10 100 1000
+#
+# На Postgres используйте отдельную пустую БД: скрипт создаёт и удаляет таблицы.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate, schema_migrations
+from app.models.user import Base, User
+from app.repo.records import add_operation, add_operations_bulk
+
+_CATS = ["Еда", "Транспорт", "Подписки", "Развлечения", "Здоровье"]
+
+
+def _paste(n: int, rnd: random.Random) -> list[dict]:
+    return [
+        {
+            "amount": round(rnd.uniform(1, 100), 2),
+            "category": rnd.choice(_CATS),
+            "description": f"строка {i}",
+            "type": "expense",
+        }
+        for i in range(n)
+    ]
+
+
+async def _per_line(Session, items: list[dict]) -> None:
+    async with Session() as s:
+        for it in items:
+            await add_operation(s, 1, it["amount"], it["category"], it["description"], it["type"])
+        await s.commit()
+
+
+async def _bulk(Session, items: list[dict]) -> None:
+    async with Session() as s:
+        await add_operations_bulk(s, 1, items)
+        await s.commit()
+
+
+async def run(url: str, sizes: list[int], rounds: int) -> None:
+    engine: AsyncEngine = create_async_engine(url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(schema_migrations.metadata.drop_all)
+        await migrate(engine)
+        async with engine.begin() as conn:
+            await conn.execute(insert(User).values(telegram_id=1))
+
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        rnd = random.Random(42)
+        print(f"{'lines':>6} {'per-line, ms':>14} {'bulk, ms':>10} {'speedup':>8}   ({engine.dialect.name})")
+        for n in sizes:
+            items = _paste(n, rnd)
+            res = {}
+            for name, fn in (("line", _per_line), ("bulk", _bulk)):
+                t0 = time.perf_counter()
+                for _ in range(rounds):
+                    await fn(Session, items)
+                res[name] = (time.perf_counter() - t0) / rounds * 1000
+            print(f"{n:>6} {res['line']:>14.2f} {res['bulk']:>10.2f} {res['line'] / res['bulk']:>7.1f}x")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк bulk-вставки операций")
+    ap.add_argument("--url", default=None, help="DATABASE_URL (по умолчанию — временный SQLite)")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    url = args.url
+    if not url:
+        path = os.path.join(tempfile.gettempdir(), "fin_bench_bulk.db")
+        if os.path.exists(path):
+            os.remove(path)
+        url = f"sqlite+aiosqlite:///{path}"
+    asyncio.run(run(url, args.sizes, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
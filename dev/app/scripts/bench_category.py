@@ -0,0 +1,83 @@
+# app/scripts/bench_category.py
+# Микробенчмарк detect_category: прежний цикл по всем ключам против скомпилированного регэкспа.
+#
+# Запуск (из dev/):
+#   python -m app.scripts.bench_category
+#   python -m app.scripts.bench_category --lines 200000
+#
+# Заодно сверяет ответы: новая версия обязана совпадать со старой на всём корпусе.
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from app.services.parser.category import KEYWORDS, detect_category
+
+_FILLER = ["лидский", "большой", "вчера", "с друзьями", "для дома", "зюзя", "опять", "маме", "шт", "утром"]
+
+
+def _detect_loop(text: str, op_type: str | None = None) -> str:
+    # прежняя реализация: первая категория по порядку словаря, где есть любой ключ
+    if not text:
+        return "Прочее"
+    if op_type == "income":
+        return "Доход"
+    s = re.sub(r"[^\w\s\-]+", " ", text.lower(), flags=re.U)
+    phrase = " ".join(re.sub(r"\s+", " ", s).strip().split())
+    for cat, stems in KEYWORDS.items():
+        for stem in stems:
+            if stem in phrase:
+                return cat
+    return "Прочее"
+
+
+def _corpus(n: int, rnd: random.Random) -> list[str]:
+    stems = [st for v in KEYWORDS.values() for st in v]
+    out = []
+    for _ in range(n):
+        words = rnd.sample(_FILLER, rnd.randint(0, 3))
+        if rnd.random() < 0.8:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(stems) + rnd.choice(["", "а", "ы", "ов"]))
+        if rnd.random() < 0.2:
+            words.append(rnd.choice(stems))
+        words.append(f"{rnd.uniform(1, 100):.2f}")
+        out.append(" ".join(words).capitalize() + rnd.choice(["", "!", ","]))
+    return out
+
+
+def run(lines: int, rounds: int) -> None:
+    corpus = _corpus(lines, random.Random(42))
+    old = [_detect_loop(t) for t in corpus]
+    new = [detect_category(t) for t in corpus]
+    if old != new:
+        bad = [(t, a, b) for t, a, b in zip(corpus, old, new) if a != b]
+        raise SystemExit(f"mismatch on {len(bad)} lines, e.g. {bad[:3]}")
+
+    # строки без ключей («Прочее») — худший случай для цикла: он проверяет все ключи
+    misses = [t for t, cat in zip(corpus, old) if cat == "Прочее"]
+    print(f"{'corpus':<10} {'lines':>7} {'loop, lines/s':>14} {'compiled, lines/s':>18} {'speedup':>8}")
+    for label, part in (("all", corpus), ("no match", misses)):
+        res = {}
+        for name, fn in (("loop", _detect_loop), ("compiled", detect_category)):
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                for t in part:
+                    fn(t)
+            res[name] = len(part) * rounds / (time.perf_counter() - t0)
+        print(f"{label:<10} {len(part):>7} {res['loop']:>14,.0f} {res['compiled']:>18,.0f} "
+              f"{res['compiled'] / res['loop']:>7.1f}x")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк detect_category")
+    ap.add_argument("--lines", type=int, default=50_000)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+    run(args.lines, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
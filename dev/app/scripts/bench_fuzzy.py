@@ -0,0 +1,72 @@
+# app/scripts/bench_fuzzy.py
+# Бенчмарк нечёткого поиска термина: difflib.get_close_matches против FuzzyIndex.
+#
+# Запуск (из dev/):
+#   python -m app.scripts.bench_fuzzy                         # 10k и 100k терминов
+#   python -m app.scripts.bench_fuzzy --sizes 1000 10000 --queries 500 --cutoff 0.88
+#
+# Заодно сверяет ответы: индекс обязан возвращать то же, что difflib.
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import random
+import time
+
+from app.utils.fuzzy import FuzzyIndex
+
+_ALPHA = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+
+
+def _word(rnd: random.Random) -> str:
+    return "".join(rnd.choice(_ALPHA) for _ in range(rnd.randint(4, 14)))
+
+
+def _typo(rnd: random.Random, w: str) -> str:
+    i = rnd.randrange(len(w))
+    op = rnd.random()
+    if op < 0.4:
+        return w[:i] + rnd.choice(_ALPHA) + w[i + 1:]   # замена
+    if op < 0.7:
+        return w[:i] + w[i + 1:]                          # пропуск
+    return w[:i] + rnd.choice(_ALPHA) + w[i:]             # вставка
+
+
+def run(sizes: list[int], queries: int, cutoff: float) -> None:
+    rnd = random.Random(42)
+    print(f"{'terms':>7} {'difflib, ms':>12} {'index, ms':>10} {'build, ms':>10} {'speedup':>8} {'hits':>5}")
+    for n in sizes:
+        terms = list({_word(rnd) for _ in range(n)})
+        qs = [_typo(rnd, rnd.choice(terms)) if rnd.random() < 0.7 else _word(rnd) for _ in range(queries)]
+
+        t0 = time.perf_counter()
+        ix = FuzzyIndex(terms)
+        build = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        expected = [(difflib.get_close_matches(q, terms, n=1, cutoff=cutoff) or [None])[0] for q in qs]
+        t_diff = (time.perf_counter() - t0) / queries * 1000
+
+        t0 = time.perf_counter()
+        got = [ix.best_match(q, cutoff) for q in qs]
+        t_ix = (time.perf_counter() - t0) / queries * 1000
+
+        if got != expected:
+            bad = sum(a != b for a, b in zip(got, expected))
+            raise SystemExit(f"mismatch with difflib on {bad} queries (terms={n})")
+        hits = sum(g is not None for g in got)
+        print(f"{len(terms):>7} {t_diff:>12.3f} {t_ix:>10.3f} {build:>10.1f} {t_diff / t_ix:>7.0f}x {hits:>5}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк нечёткого поиска терминов")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--cutoff", type=float, default=0.88)
+    args = ap.parse_args()
+    run(args.sizes, args.queries, args.cutoff)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# app/scripts/bench_indexes.py
+# Бенчмарк индексов operations: планы и тайминги сырых запросов к operations до/после миграции.
+#
+# Запуск (из dev/):
+#   python -m app.scripts.bench_indexes                       # SQLite во временном файле
+#   python -m app.scripts.bench_indexes --url postgresql+asyncpg://... --users 200 --ops 500
+#
+# Сценарий: сидим данные без новых индексов -> EXPLAIN + тайминги -> migrate() -> снова.
+# На Postgres используйте отдельную пустую БД: скрипт создаёт и удаляет таблицы.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.migrations import migrate, schema_migrations
+from app.models.operation import Operation
+from app.models.user import Base, User
+from app.repo.balances import rebuild_balances
+from app.repo.rollups import rebuild_rollups
+
+_CATS = ["Еда", "Транспорт", "Подписки", "Развлечения", "Здоровье", "Одежда", "Прочее"]
+_NEW_INDEXES = ("ix_operations_user_created", "ix_operations_user_cat_created")
+
+# (название, SQL для EXPLAIN)
+_PLAN_QUERIES = [
+    ("range", "SELECT * FROM operations WHERE user_id = :uid "
+              "AND created_at >= :d1 AND created_at <= :d2 ORDER BY created_at"),
+    ("category", "SELECT sum(amount) FROM operations WHERE user_id = :uid AND category = :cat "
+                 "AND created_at >= :d1 AND created_at <= :d2"),
+    ("balance", "SELECT * FROM operations WHERE user_id = :uid"),
+]
+
+
+async def _seed(engine: AsyncEngine, users: int, ops_per_user: int, days: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(schema_migrations.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for name in _NEW_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        await conn.execute(insert(User), [{"telegram_id": 10_000 + i} for i in range(users)])
+        rnd = random.Random(42)
+        now = datetime.utcnow()
+        batch: list[dict] = []
+        for uid in range(1, users + 1):
+            for _ in range(ops_per_user):
+                batch.append({
+                    "user_id": uid,
+                    "amount": round(rnd.uniform(1, 100), 2),
+                    "category": rnd.choice(_CATS),
+                    "description": "bench",
+                    "type": "income" if rnd.random() < 0.1 else "expense",
+                    "created_at": now - timedelta(minutes=rnd.randrange(days * 24 * 60)),
+                })
+                if len(batch) >= 5000:
+                    await conn.execute(insert(Operation), batch)
+                    batch.clear()
+        if batch:
+            await conn.execute(insert(Operation), batch)
+        await rebuild_rollups(conn)
+        await rebuild_balances(conn)
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("ANALYZE operations"))
+
+
+def _params(uid: int, d1: date, d2: date) -> dict:
+    return {
+        "uid": uid,
+        "cat": "Еда",
+        "d1": datetime.combine(d1, datetime.min.time()),
+        "d2": datetime.combine(d2, datetime.max.time()),
+    }
+
+
+async def _plans(engine: AsyncEngine, uid: int, d1: date, d2: date) -> None:
+    pg = engine.dialect.name == "postgresql"
+    params = _params(uid, d1, d2)
+    async with engine.connect() as conn:
+        for name, sql in _PLAN_QUERIES:
+            prefix = "EXPLAIN ANALYZE " if pg else "EXPLAIN QUERY PLAN "
+            res = await conn.execute(text(prefix + sql), params)
+            print(f"  [{name}]")
+            for row in res:
+                print("    " + str(row[-1]))
+
+
+async def _timings(engine: AsyncEngine, users: int, d1: date, d2: date, rounds: int) -> None:
+    # меряем те же сырые запросы к operations, что и в планах: отчёты и баланс бота
+    # читают daily_rollups/user_balances и индексов operations не касаются
+    rnd = random.Random(7)
+    async with engine.connect() as conn:
+        for name, sql in _PLAN_QUERIES:
+            stmt = text(sql)
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                res = await conn.execute(stmt, _params(rnd.randint(1, users), d1, d2))
+                res.all()
+            dt = (time.perf_counter() - t0) / rounds * 1000
+            print(f"  {name:<22} {dt:8.2f} ms/query")
+
+
+async def run(url: str, users: int, ops_per_user: int, days: int, rounds: int) -> None:
+    engine = create_async_engine(url)
+    d2 = date.today()
+    d1 = d2 - timedelta(days=30)
+    try:
+        print(f"seed: users={users} ops/user={ops_per_user} days={days} ({engine.dialect.name})")
+        await _seed(engine, users, ops_per_user, days)
+
+        print("\n== before ==")
+        await _plans(engine, users // 2 or 1, d1, d2)
+        await _timings(engine, users, d1, d2, rounds)
+
+        t0 = time.perf_counter()
+        applied = await migrate(engine)
+        print(f"\nmigrate: {applied} in {time.perf_counter() - t0:.2f}s")
+
+        print("\n== after ==")
+        await _plans(engine, users // 2 or 1, d1, d2)
+        await _timings(engine, users, d1, d2, rounds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк индексов operations")
+    ap.add_argument("--url", default=None, help="DATABASE_URL (по умолчанию — временный SQLite)")
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--ops", type=int, default=1000, help="операций на пользователя")
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    url = args.url
+    if not url:
+        path = os.path.join(tempfile.gettempdir(), "fin_bench_indexes.db")
+        if os.path.exists(path):
+            os.remove(path)
+        url = f"sqlite+aiosqlite:///{path}"
+    asyncio.run(run(url, args.users, args.ops, args.days, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
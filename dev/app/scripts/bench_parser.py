@@ -0,0 +1,59 @@
+# app/scripts/bench_parser.py
+# Бенчмарк разбора строки: прежний набор регэкспов (по проходу на сумму, тип, продукт, категорию
+# и термин) против однопроходного лексера. Эталон и корпус — в app/tests/test_parser.py.
+#
+# Запуск (из dev/):
+#   python -m app.scripts.bench_parser
+#   python -m app.scripts.bench_parser --lines 100000 --fuzz 200000
+#
+# Сначала сверяет ответы на золотом корпусе (живые примеры + сгенерированные строки + мусор
+# из «неудобных» символов) — та же сверка, что в тестах, только на корпусе побольше.
+# Замеры на разных машинах заметно плавают: гоняйте несколько раз; ожидаемо ~1.2–1.3x на parse.
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.services.parser.normalizer import normalize
+from app.services.parser.resolver import _parse_normalized
+from app.tests.test_parser import _GOLDEN, golden_corpus, reference_parse
+
+
+def run(lines: int, fuzz: int, rounds: int) -> None:
+    realistic, junk = golden_corpus(lines, fuzz)
+    corpus = realistic + junk
+
+    new_parse = _parse_normalized.__wrapped__   # без lru_cache — меряем сам разбор
+    bad = []
+    for raw in corpus:
+        t = normalize(raw)
+        if reference_parse(t) != new_parse(t):
+            bad.append((raw, reference_parse(t), new_parse(t)))
+    if bad:
+        raise SystemExit(f"mismatch on {len(bad)} of {len(corpus)} lines, e.g. {bad[:3]}")
+    print(f"golden corpus: {len(corpus)} lines identical ({len(_GOLDEN)} live, {lines} generated, {fuzz} fuzz)")
+
+    print(f"{'step':<22} {'regexes, lines/s':>17} {'lexer, lines/s':>15} {'speedup':>8}")
+    normalized = [normalize(t) for t in realistic]
+    res = []
+    for fn in (reference_parse, new_parse):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for t in normalized:
+                fn(t)
+        res.append(len(normalized) * rounds / (time.perf_counter() - t0))
+    print(f"{'parse (normalized)':<22} {res[0]:>17,.0f} {res[1]:>15,.0f} {res[1] / res[0]:>7.1f}x")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк разбора строки: регэкспы против лексера")
+    ap.add_argument("--lines", type=int, default=50_000)
+    ap.add_argument("--fuzz", type=int, default=50_000)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+    run(args.lines, args.fuzz, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# app/scripts/reindex.py
+# Пересборка производных данных из operations.
+#
+# Запуск (из dev/, с тем же .env, что и бот):
+#   python -m app.scripts.reindex rollups              # daily_rollups для всех пользователей
+#   python -m app.scripts.reindex rollups --user 123   # только для telegram_id=123
+#   python -m app.scripts.reindex recategorize --dry-run            # что поменяется, без записи
+#   python -m app.scripts.reindex recategorize --checkpoint reindex.ckpt
+#   python -m app.scripts.reindex recategorize --all --user 123     # не только «Прочее»
+#
+# recategorize идёт по пользователям, внутри — пачками по id (WHERE id > last ORDER BY id LIMIT n),
+# каждая пачка — своя транзакция. Память постоянна, после каждой пачки пишется checkpoint,
+# повторный запуск с тем же --checkpoint продолжает с места остановки.
+#
+# Скрипт пишет в БД в обход бота: отчёты, уже отрисованные ботом (view_cache), остаются старыми
+# до истечения VIEW_CACHE_TTL (600 с, handlers/reports.py) или до перезапуска бота.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import init_db, session_scope
+from app.core.logging import setup_logging
+from app.models.operation import Operation
+from app.models.record import OpRecord
+from app.models.user import User
+from app.repo.records import RECORD_COLUMNS, recategorize_operations
+from app.repo.rollups import rebuild_rollups
+from app.services.learning import learned_categories
+from app.services.parser.resolver import OTHER_CATEGORIES, parse_line
+
+log = logging.getLogger(__name__)
+
+
+async def _user_ids(tg_id: int | None) -> list[int]:
+    async with session_scope() as s:
+        q = select(User.id).order_by(User.id)
+        if tg_id is not None:
+            q = q.where(User.telegram_id == tg_id)
+        return list((await s.execute(q)).scalars().all())
+
+
+async def reindex_rollups(tg_id: int | None = None) -> None:
+    """Пересобирает daily_rollups по одному пользователю за транзакцию."""
+    await init_db()
+    ids = await _user_ids(tg_id)
+    for i, uid in enumerate(ids, 1):
+        async with session_scope() as s:
+            rows = await rebuild_rollups(s, uid)
+        log.info('rollups_rebuilt user_id=%s rows=%s progress="%s/%s"', uid, rows, i, len(ids))
+
+
+# ===== Перекатегоризация =====
+
+CHUNK = 1000
+_OTHER = OTHER_CATEGORIES
+
+
+async def _users(tg_id: int | None) -> list[tuple[int, int]]:
+    async with session_scope() as s:
+        q = select(User.id, User.telegram_id).order_by(User.id)
+        if tg_id is not None:
+            q = q.where(User.telegram_id == tg_id)
+        return [tuple(r) for r in (await s.execute(q)).all()]
+
+
+async def _categorize(s, tg_id: int, rows: list[OpRecord]) -> list[str | None]:
+    # та же логика, что у free_text (parse_many): парсер, а для «Прочее» — выученный термин
+    parsed = [parse_line(r.description or "") for r in rows]
+    learned = await learned_categories(s, tg_id, {p.term for p in parsed if p and not p.known})
+    out: list[str | None] = []
+    for p in parsed:
+        if p is None:
+            out.append(None)
+        elif not p.known:
+            out.append(learned.get(p.term) or p.category or None)
+        else:
+            out.append(p.category)
+    return out
+
+
+def _load_checkpoint(path: Path | None, params: dict) -> dict:
+    state = {"params": params, "user_id": 0, "last_id": 0, "scanned": 0, "changed": 0}
+    if path is None or not path.exists():
+        return state
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    if saved.get("params") != params:
+        raise SystemExit(f"checkpoint {path} записан с другими параметрами: {saved.get('params')}")
+    log.info('recategorize_resume user_id=%s last_id=%s', saved["user_id"], saved["last_id"])
+    return saved
+
+
+def _save_checkpoint(path: Path | None, state: dict) -> None:
+    if path is None:
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def recategorize(
+    tg_id: int | None = None,
+    *,
+    all_ops: bool = False,
+    dry_run: bool = False,
+    checkpoint: Path | None = None,
+    chunk: int = CHUNK,
+) -> Counter:
+    """
+    Прогоняет описания операций через parse_message + выученные термины и переносит
+    операции в новые категории (operations + daily_rollups). По умолчанию — только «Прочее».
+    Возвращает счётчик переходов (старая, новая категория).
+    """
+    await init_db()
+    state = _load_checkpoint(None if dry_run else checkpoint, {"user": tg_id, "all": all_ops})
+    moves: Counter = Counter()
+
+    for uid, tg in await _users(tg_id):
+        if uid < state["user_id"]:
+            continue
+        last_id = state["last_id"] if uid == state["user_id"] else 0
+        while True:
+            async with session_scope() as s:
+                q = (
+                    select(*RECORD_COLUMNS)
+                    .where(Operation.user_id == uid, Operation.id > last_id)
+                    .order_by(Operation.id)
+                    .limit(chunk)
+                )
+                if not all_ops:
+                    q = q.where(Operation.category.in_(_OTHER))
+                rows = [OpRecord._make(r) for r in (await s.execute(q)).all()]
+                if not rows:
+                    break
+
+                changes: list[tuple[OpRecord, str]] = []
+                for r, cat in zip(rows, await _categorize(s, tg, rows)):
+                    # в «Прочее» не понижаем: там только то, что ещё не распознано
+                    if cat and cat not in _OTHER and cat != r.category:
+                        changes.append((r, cat))
+                        moves[(r.category, cat)] += 1
+                if not dry_run:
+                    await recategorize_operations(s, uid, changes)
+
+            last_id = rows[-1].id
+            state.update(user_id=uid, last_id=last_id)
+            state["scanned"] += len(rows)
+            state["changed"] += len(changes)
+            if not dry_run:
+                _save_checkpoint(checkpoint, state)
+        log.info('recategorize_user user_id=%s scanned=%s changed=%s dry_run=%s',
+                 uid, state["scanned"], state["changed"], dry_run)
+
+    if checkpoint is not None and not dry_run and checkpoint.exists():
+        checkpoint.unlink()
+    return moves
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Пересборка производных данных",
+        epilog="Запущенный бот увидит изменения в уже отрисованных отчётах через 600 с (VIEW_CACHE_TTL) "
+               "или после перезапуска.",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_roll = sub.add_parser("rollups", help="пересобрать daily_rollups")
+    p_roll.add_argument("--user", type=int, default=None, help="telegram_id пользователя")
+    p_cat = sub.add_parser("recategorize", help="переразобрать категории операций")
+    p_cat.add_argument("--user", type=int, default=None, help="telegram_id пользователя")
+    p_cat.add_argument("--all", action="store_true", help="все операции, а не только «Прочее»")
+    p_cat.add_argument("--dry-run", action="store_true", help="только показать, что изменится")
+    p_cat.add_argument("--checkpoint", type=Path, default=None, help="файл прогресса для продолжения")
+    p_cat.add_argument("--chunk", type=int, default=CHUNK, help="операций в пачке")
+    args = ap.parse_args()
+
+    setup_logging(settings.log_level)
+    if args.cmd == "rollups":
+        asyncio.run(reindex_rollups(args.user))
+    elif args.cmd == "recategorize":
+        moves = asyncio.run(recategorize(
+            args.user, all_ops=args.all, dry_run=args.dry_run,
+            checkpoint=args.checkpoint, chunk=args.chunk,
+        ))
+        for (old, new), n in moves.most_common():
+            print(f"{n:>8}  {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# app/services/analytics.py
+# Разбивка длинных периодов по дням/неделям/месяцам для отчёта и экспорта.
+# Группирует сама БД (rollup_buckets по daily_rollups): в Python приходит по строке на период × тип,
+# а не по строке на день — выборка дневных строк дороже, чем любая их обработка (app/scripts/bench_analytics.py).
+# Итоги по категориям сюда не входят: их одним GROUP BY считает category_totals.
+from __future__ import annotations
+
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repo.rollups import rollup_buckets
+
+LONG_RANGE_MIN_DAYS = 92   # длиннее квартала — отчёт и экспорт добавляют помесячную разбивку
+
+
+class Bucket(NamedTuple):
+    start: date      # первый день дня/недели (понедельник)/месяца
+    expense: float
+    income: float
+
+
+def is_long_range(start: date, end: date) -> bool:
+    return (end - start).days + 1 > LONG_RANGE_MIN_DAYS
+
+
+async def range_buckets(
+    session: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    unit: str = "month",
+) -> list[Bucket]:
+    """Расходы и доходы по периодам unit ("day" | "week" | "month"), по возрастанию — из одного запроса."""
+    acc: dict[date, list[float]] = {}
+    for d, typ, total in await rollup_buckets(session, user_id, start, end, unit):
+        acc.setdefault(d, [0.0, 0.0])[typ == "income"] += total
+    return [Bucket(d, e, i) for d, (e, i) in acc.items()]
@@ -1,63 +1,22 @@
 # app/services/date_period.py
-# Разбор периода: сегодня/вчера/неделя/месяц/за N дней/имена месяцев (рус).
+# Разбор периода для поиска и экспорта: та же грамматика, что в services.periods,
+# но понимает и голые формы («такси июль», «еда 3 дня»), а без периода — сегодня.
 
 from __future__ import annotations
-from datetime import date, timedelta
+from datetime import date
 from typing import Tuple
-import re
 
-RU_MONTHS = {
-    1: "январ", 2: "феврал", 3: "март", 4: "апрел",
-    5: "май", 6: "июн", 7: "июл", 8: "август",
-    9: "сентябр", 10: "октябр", 11: "ноябр", 12: "декабр",
-}
+from app.services.periods import Period, parse_period, today
 
-MONTH_KEYS = {v: k for k, v in RU_MONTHS.items()}  # по префиксу
+_DAY_LABELS = ("сегодня", "вчера", "позавчера")
 
-def _month_from_text(t: str) -> int | None:
-    for stem, mnum in MONTH_KEYS.items():
-        if stem in t:
-            return mnum
-    return None
+def period_label(p: Period) -> str:
+    # «Поиск за август», «Экспорт вчера»
+    return p.label if p.label in _DAY_LABELS else f"за {p.label}"
 
 def period_from_text(text: str) -> Tuple[date, date, str]:
-    t = (text or "").lower()
-    t = re.sub(r"\s+", " ", t).strip()
-    today = date.today()
-
-    if "вчера" in t:
-        d = today - timedelta(days=1)
-        return d, d, "вчера"
-
-    if "недел" in t or "7 д" in t:
-        start = today - timedelta(days=6)
-        return start, today, "за неделю"
-
-    if "месяц" in t:
-        start = today.replace(day=1)
-        if start.month == 12:
-            end = date(start.year, 12, 31)
-        else:
-            end = (start.replace(month=start.month + 1, day=1) - timedelta(days=1))
-        return start, end, "за месяц"
-
-    # за N дней / за N д / 3 дня / 3д
-    m = re.search(r"(за\s*)?(\d+)\s*(дн|д|дня|дней)", t)
-    if m:
-        n = max(1, int(m.group(2)))
-        start = today - timedelta(days=n - 1)
-        return start, today, f"за {n} дней"
-
-    # конкретный месяц по названию (текущий год)
-    mnum = _month_from_text(t)
-    if mnum:
-        start = date(today.year, mnum, 1)
-        if mnum == 12:
-            end = date(today.year, 12, 31)
-        else:
-            end = date(today.year, mnum + 1, 1) - timedelta(days=1)
-        # человек мог написать «август отчёт» или «отчёт за август»
-        return start, end, f"за {RU_MONTHS[mnum]}"
-
-    # по умолчанию — сегодня
-    return today, today, "сегодня"
+    p = parse_period(text)
+    if p is None:
+        d = today()
+        return d, d, "сегодня"
+    return p.start, p.end, period_label(p)
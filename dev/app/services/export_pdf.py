@@ -5,7 +5,9 @@ from typing import Iterable
 import os
 import tempfile
 
-from app.models.operation import Operation
+from app.models.record import OpRecord
+from app.repo.records import CategoryTotal
+from app.services.analytics import Bucket
 
 _HTML_TMPL = """<!DOCTYPE html>
 <html lang="ru">
@@ -44,6 +46,7 @@ _HTML_TMPL = """<!DOCTYPE html>
       {total_inc_row}
     </tbody>
   </table>
+{months_section}
 
   <h2>Операции</h2>
   <table>
@@ -70,14 +73,14 @@ _HTML_TMPL = """<!DOCTYPE html>
 def _fmt_money(val: float) -> str:
     return f"{val:.2f}"
 
-def _build_summary(ops: Iterable[Operation]) -> tuple[str, float, float]:
+def _build_summary(totals: Iterable[CategoryTotal]) -> tuple[str, float, float]:
     agg: dict[str, float] = {}
     total_exp = 0.0
     total_inc = 0.0
-    for o in ops:
-        sign = 1.0 if o.type == "income" else -1.0
-        val = sign * float(abs(o.amount))
-        cat = o.category or "Прочее"
+    for t in totals:
+        sign = 1.0 if t.type == "income" else -1.0
+        val = sign * t.total
+        cat = t.category or "Прочее"
         agg[cat] = agg.get(cat, 0.0) + val
         if val < 0:
             total_exp += abs(val)
@@ -93,7 +96,21 @@ def _build_summary(ops: Iterable[Operation]) -> tuple[str, float, float]:
         )
     return "\n".join(rows), round(total_exp, 2), round(total_inc, 2)
 
-def _build_ops_rows(ops: Iterable[Operation]) -> str:
+def _build_months(months: Iterable[Bucket]) -> str:
+    rows = [
+        f"<tr><td>{b.start:%Y-%m}</td><td class='right exp'>-{_fmt_money(b.expense)}</td>"
+        f"<td class='right inc'>+{_fmt_money(b.income)}</td></tr>"
+        for b in months
+    ]
+    if not rows:
+        return ""
+    return (
+        "\n  <h2>По месяцам</h2>\n  <table>\n    <thead>\n"
+        "      <tr><th>Месяц</th><th class=\"right\">Расходы, BYN</th><th class=\"right\">Доходы, BYN</th></tr>\n"
+        "    </thead>\n    <tbody>\n      " + "\n      ".join(rows) + "\n    </tbody>\n  </table>"
+    )
+
+def _build_ops_rows(ops: Iterable[OpRecord]) -> str:
     out = []
     for i, o in enumerate(ops, 1):
         sign = "-" if o.type == "expense" else "+"
@@ -112,14 +129,15 @@ def _build_ops_rows(ops: Iterable[Operation]) -> str:
         )
     return "\n".join(out)
 
-def build_pdf(ops: list[Operation], start: date, end: date, user_label: str = "") -> str:
+def build_pdf(ops: list[OpRecord], start: date, end: date, user_label: str = "", *,
+              totals: Iterable[CategoryTotal], months: Iterable[Bucket] = ()) -> str:
     """Создаёт PDF и возвращает путь к временному файлу. Импортируем weasyprint лениво."""
     try:
         from weasyprint import HTML  # ленивый импорт, чтобы отсутствие pango не валило загрузку модулей
     except Exception as e:
         raise RuntimeError("PDF-экспорт недоступен: не установлены системные библиотеки weasyprint/pango.") from e
 
-    summary_rows, total_exp, total_inc = _build_summary(ops)
+    summary_rows, total_exp, total_inc = _build_summary(totals)
     ops_rows = _build_ops_rows(ops)
     total_inc_row = (
         f"<tr><td class='right'><b>Итого доходов</b></td><td class='right inc'>+{total_inc:.2f}</td></tr>"
@@ -134,6 +152,7 @@ def build_pdf(ops: list[Operation], start: date, end: date, user_label: str = ""
         total_exp=total_exp,
         total_inc=total_inc,
         total_inc_row=total_inc_row,
+        months_section=_build_months(months),
     )
 
     fd, path = tempfile.mkstemp(prefix="fin_report_", suffix=".pdf")
@@ -9,8 +9,9 @@ import openpyxl
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Alignment, Font, numbers
 
-from app.models.operation import Operation
-from app.repo.records import aggregate_by_category
+from app.models.record import OpRecord
+from app.repo.records import CategoryTotal, signed_by_category
+from app.services.analytics import Bucket
 
 def _auto_width(ws) -> None:
     widths = {}
@@ -31,10 +32,13 @@ def _title(ws, text: str) -> None:
     c.alignment = Alignment(horizontal="center")
 
 def build_xlsx(
-    ops: Iterable[Operation],
+    ops: Iterable[OpRecord],
     start: date,
     end: date,
     user_label: str = "",
+    *,
+    totals: Iterable[CategoryTotal],
+    months: Iterable[Bucket] = (),
 ) -> str:
     wb = openpyxl.Workbook()
     ws1 = wb.active
@@ -69,11 +73,8 @@ def build_xlsx(
     for i, h in enumerate(headers2, 1):
         ws2.cell(row=2, column=i).font = Font(bold=True)
 
-    agg = {}
-    # нужен знак: доход +, расход -
-    for o in ops:
-        sign = 1.0 if o.type == "income" else -1.0
-        agg[o.category or "Прочее"] = agg.get(o.category or "Прочее", 0.0) + sign * float(abs(o.amount))
+    # нужен знак: доход +, расход -; суммы уже посчитаны в БД (GROUP BY)
+    agg = signed_by_category(totals)
 
     row_idx = 3
     for cat, val in sorted(agg.items()):
@@ -84,6 +85,21 @@ def build_xlsx(
 
     _auto_width(ws2)
 
+    # Помесячные итоги — только для длинных периодов (services.analytics)
+    months = list(months)
+    if months:
+        ws3 = wb.create_sheet(title="По месяцам")
+        _title(ws3, "Итоги по месяцам")
+        headers3 = ["Месяц", "Расходы BYN", "Доходы BYN"]
+        ws3.append(headers3)
+        for i, h in enumerate(headers3, 1):
+            ws3.cell(row=2, column=i).font = Font(bold=True)
+        for row_idx, b in enumerate(months, 3):
+            ws3.cell(row=row_idx, column=1, value=b.start.strftime("%Y-%m"))
+            _format_money(ws3.cell(row=row_idx, column=2, value=round(b.expense, 2)))
+            _format_money(ws3.cell(row=row_idx, column=3, value=round(b.income, 2)))
+        _auto_width(ws3)
+
     # Сохраняем во временный файл
     fd, path = tempfile.mkstemp(prefix="fin_export_", suffix=".xlsx")
     os.close(fd)
@@ -1,75 +1,167 @@
 # -*- coding: utf-8 -*-
 # app/services/learning.py
 """
-Персональное обучение терминов (слово -> категория) в JSON, как в старом боте.
+Персональное обучение терминов (слово -> категория) в таблице user_terms.
+Общие термины лежат там же с user_tg_id = GLOBAL_TG_ID.
 
-Структура app/data/categories.json:
-{
-  "global": { "капучино": "Еда и напитки" },
-  "users":  { "123456789": { "кириешки": "Еда и напитки" } }
-}
+Словарь владельца грузится одним запросом при первом обращении и живёт в LRU-кэше.
+Раз в REVALIDATE_EVERY секунд дочитываем только строки с version новее кэша —
+так видим термины, выученные другими процессами бота.
 """
 from __future__ import annotations
-import json
-import difflib
-from pathlib import Path
-from typing import Optional, Dict
-
-# Файл лежит в app/data/categories.json
-ROOT = Path(__file__).resolve().parents[1]  # -> app/
-DATA_PATH = ROOT / "data" / "categories.json"
-
-def _ensure_store() -> Dict:
-    DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not DATA_PATH.exists():
-        DATA_PATH.write_text(json.dumps({"global": {}, "users": {}}, ensure_ascii=False, indent=2), encoding="utf-8")
-    try:
-        return json.loads(DATA_PATH.read_text(encoding="utf-8") or "{}")
-    except Exception:
-        DATA_PATH.write_text(json.dumps({"global": {}, "users": {}}, ensure_ascii=False, indent=2), encoding="utf-8")
-        return {"global": {}, "users": {}}
-
-def _save_store(store: Dict) -> None:
-    DATA_PATH.write_text(json.dumps(store, ensure_ascii=False, indent=2), encoding="utf-8")
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import after_commit
+from app.models.term import GLOBAL_TG_ID
+from app.repo.terms import load_terms, save_user_term_db
+from app.utils.cache import TTLCache
+from app.utils.fuzzy import FuzzyIndex
+
+USER_CUTOFF = 0.88
+GLOBAL_CUTOFF = 0.9
+
+REVALIDATE_EVERY = 30.0          # сек между дочитываниями из БД
+CLOCK_SKEW_US = 5_000_000        # запас на расхождение часов между процессами
+TERM_CACHE_SIZE = 2_000          # владельцев в кэше
+TERM_CACHE_TTL = 3600            # после — полная перезагрузка словаря
+RESOLVED_CACHE_SIZE = 20_000     # готовых ответов get_learned_category
+
+# общий счётчик поколений: перезагруженный словарь не повторит номер выгруженного
+_generations = itertools.count(1)
+
+
+@dataclass
+class _TermMap:
+    terms: Dict[str, str] = field(default_factory=dict)
+    version: int = -1
+    checked: float = 0.0
+    index: Optional[FuzzyIndex] = None   # строится при первом нечётком поиске
+    generation: int = 0                  # растёт при любом изменении terms — часть ключа _resolved
+
+    def apply(self, term: str, category: str, version: int) -> None:
+        self.version = max(self.version, version)
+        if self.terms.get(term) == category:
+            return
+        self.terms[term] = category
+        self.generation = next(_generations)
+        if self.index is not None:
+            self.index.add(term)
+
+    def fuzzy(self) -> FuzzyIndex:
+        if self.index is None:
+            self.index = FuzzyIndex(self.terms.keys())
+        return self.index
+
+
+# user_tg_id -> словарь владельца
+_maps: TTLCache[int, _TermMap] = TTLCache(TERM_CACHE_SIZE, TERM_CACHE_TTL)
+# (user_tg_id, term, поколение словаря пользователя, поколение глобального) -> (категория | None,)
+_resolved: TTLCache[tuple, tuple[Optional[str]]] = TTLCache(RESOLVED_CACHE_SIZE, TERM_CACHE_TTL)
+
+
+def _new_version() -> int:
+    return time.time_ns() // 1000
 
 def normalize_term(term: str) -> str:
     return (term or "").strip().lower()
 
-def get_learned_category(user_id: int, term: str) -> Optional[str]:
-    """Вернёт категорию по слову с учётом пользователя. Поддерживает нечёткие совпадения."""
-    store = _ensure_store()
+async def _term_maps(session: AsyncSession, *owners: int) -> list[_TermMap]:
+    """Словари владельцев: отсутствующие грузим, устаревшие дочитываем — всё одним запросом."""
+    now = time.monotonic()
+    maps: list[_TermMap] = []
+    since: dict[int, int] = {}
+    for uid in owners:
+        tm = _maps.get(uid)
+        if tm is None:
+            tm = _TermMap()
+            since[uid] = -1
+        elif now - tm.checked >= REVALIDATE_EVERY:
+            since[uid] = tm.version - CLOCK_SKEW_US
+        maps.append(tm)
+
+    if since:
+        by_owner = dict(zip(owners, maps))
+        for row in await load_terms(session, since):
+            by_owner[row.user_tg_id].apply(row.term, row.category, row.version)
+        for uid in since:
+            by_owner[uid].checked = now
+            _maps.set(uid, by_owner[uid])
+    return maps
+
+async def get_learned_category(session: AsyncSession, user_id: int, term: str) -> Optional[str]:
+    """Вернёт категорию по слову с учётом пользователя (telegram_id). Поддерживает нечёткие совпадения."""
     t = normalize_term(term)
-    users = store.get("users", {})
-    user_map: Dict[str, str] = users.get(str(user_id), {})
-    global_map: Dict[str, str] = store.get("global", {})
+    if not t:
+        return None
+    user_map, global_map = await _term_maps(session, user_id, GLOBAL_TG_ID)
+    key = (user_id, t, user_map.generation, global_map.generation)
+    hit = _resolved.get(key)
+    if hit is not None:
+        return hit[0]
+    found = _resolve(user_map, global_map, t)
+    _resolved.set(key, (found,))
+    return found
 
-    if t in user_map:
-        return user_map[t]
-    if t in global_map:
-        return global_map[t]
+async def learned_categories(session: AsyncSession, user_id: int, terms: Iterable[str]) -> Dict[str, Optional[str]]:
+    """get_learned_category для пачки терминов: словари берутся/дочитываются один раз на всю пачку."""
+    wanted = {term: normalize_term(term) for term in terms}
+    if not any(wanted.values()):
+        return {term: None for term in wanted}
+    user_map, global_map = await _term_maps(session, user_id, GLOBAL_TG_ID)
+    out: Dict[str, Optional[str]] = {}
+    for term, t in wanted.items():
+        if not t:
+            out[term] = None
+            continue
+        key = (user_id, t, user_map.generation, global_map.generation)
+        hit = _resolved.get(key)
+        if hit is None:
+            hit = (_resolve(user_map, global_map, t),)
+            _resolved.set(key, hit)
+        out[term] = hit[0]
+    return out
 
-    if user_map:
-        cand = difflib.get_close_matches(t, user_map.keys(), n=1, cutoff=0.88)
+def _resolve(user_map: _TermMap, global_map: _TermMap, t: str) -> Optional[str]:
+    if t in user_map.terms:
+        return user_map.terms[t]
+    if t in global_map.terms:
+        return global_map.terms[t]
+
+    # те же результаты, что difflib.get_close_matches(n=1), но без перебора всех терминов
+    if user_map.terms:
+        cand = user_map.fuzzy().best_match(t, USER_CUTOFF)
         if cand:
-            return user_map[cand[0]]
-    if global_map:
-        cand = difflib.get_close_matches(t, global_map.keys(), n=1, cutoff=0.9)
+            return user_map.terms[cand]
+    if global_map.terms:
+        cand = global_map.fuzzy().best_match(t, GLOBAL_CUTOFF)
         if cand:
-            return global_map[cand[0]]
+            return global_map.terms[cand]
     return None
 
-def save_user_term(user_id: int, term: str, category: str, *, global_scope: bool = False) -> None:
+async def save_user_term(
+    session: AsyncSession, user_id: int, term: str, category: str, *, global_scope: bool = False
+) -> None:
     """Сохранить термин -> категория. По умолчанию только для пользователя."""
-    store = _ensure_store()
-    t = normalize_term(term)
-    cat = (category or "").strip()
+    t = normalize_term(term)[:255]
+    cat = (category or "").strip()[:100]
     if not t or not cat:
         return
 
-    if global_scope:
-        store.setdefault("global", {})[t] = cat
-    else:
-        users = store.setdefault("users", {})
-        users.setdefault(str(user_id), {})[t] = cat
+    owner = GLOBAL_TG_ID if global_scope else user_id
+    version = _new_version()
+    await save_user_term_db(session, owner, t, cat, version)
+
+    def _cache() -> None:
+        tm = _maps.get(owner)
+        if tm is not None:
+            tm.apply(t, cat, version)
+
+    after_commit(session, _cache)
 
-    _save_store(store)
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {"term_maps": _maps.stats(), "learned": _resolved.stats()}
@@ -2,12 +2,46 @@
 # Извлечение суммы и определение типа операции.
 
 from __future__ import annotations
-import re
-from typing import Tuple, Optional
+from typing import NamedTuple, Tuple, Optional
 
-# Ищем первое число с необязательным знаком.
-# Допускаем разделитель запятая/точка, пробелы как разделители тысяч убираем заранее в normalizer.
-_RX_NUM = re.compile(r"(?P<sign>[+-])?\s*(?P<num>\d+(?:\.\d{1,2})?)")
+from .lexer import NUM, SIGN, SPACE, Token, tokenize
+
+
+class AmountMatch(NamedTuple):
+    value: float           # абсолютное значение
+    sign: Optional[str]    # "+" | "-" | None
+    start: int             # начало суммы в строке (вместе со знаком)
+    end: int
+
+def find_amount(tokens: list[Token]) -> Optional[AmountMatch]:
+    """
+    ПЕРВОЕ число потока с необязательным знаком перед ним ("-5", "+ 200").
+    Дробная часть — через точку, не больше двух знаков: "12.345" -> 12.34.
+    Разделители тысяч убраны заранее в normalizer.
+    """
+    pos = 0
+    for i, (kind, text) in enumerate(tokens):
+        if kind == NUM:
+            break
+        pos += len(text)
+    else:
+        return None
+
+    num, start, end = text, pos, pos + len(text)
+    if i + 2 < len(tokens) and tokens[i + 1][1] == "." and tokens[i + 2][0] == NUM:
+        frac = tokens[i + 2][1][:2]
+        num, end = f"{num}.{frac}", end + 1 + len(frac)
+
+    # знак может отделяться от числа пробелами; без знака начало — с пробелов перед числом
+    sign = None
+    j = i - 1
+    if j >= 0 and tokens[j][0] == SPACE:
+        start -= len(tokens[j][1])
+        j -= 1
+    if j >= 0 and tokens[j][0] == SIGN:
+        start -= 1
+        sign = tokens[j][1]
+    return AmountMatch(abs(float(num)), sign, start, end)
 
 def extract_amount(text: str) -> Optional[Tuple[float, str]]:
     """
@@ -18,27 +52,26 @@ def extract_amount(text: str) -> Optional[Tuple[float, str]]:
       "-5 такси"      -> (5.0, "BYN")
       "+200 партнерка"-> (200.0, "BYN")
     """
-    if not text:
-        return None
-    m = _RX_NUM.search(text)
+    m = find_amount(tokenize(text)) if text else None
     if not m:
         return None
-    num = float(m.group("num"))
     # Возвращаем абсолютное значение — знак учитывается в detect_type
-    return (abs(num), "BYN")
+    return (m.value, "BYN")
 
-def detect_type(text: str) -> str:
+def detect_type(text: str, amount: Optional[AmountMatch] = None) -> str:
     """
     Определяет тип операции.
       - Если есть явный '+' перед числом — income
       - Если есть явный '-' перед числом — expense
       - Иначе по эвристике: слова про доход → income, иначе expense
+    amount — уже найденное find_amount, чтобы не разбирать строку второй раз.
     """
     if not text:
         return "expense"
-    m = _RX_NUM.search(text)
-    if m and m.group("sign"):
-        return "income" if m.group("sign") == "+" else "expense"
+    if amount is None:
+        amount = find_amount(tokenize(text))
+    if amount and amount.sign:
+        return "income" if amount.sign == "+" else "expense"
 
     t = text.lower()
     income_markers = ("зарплат", "доход", "прибыль", "прем", "партнер", "партнёр", "кешбек", "кэшбек", "cashback", "вернули")
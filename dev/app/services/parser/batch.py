@@ -0,0 +1,29 @@
+# app/services/parser/batch.py
+# Разбор многострочного ввода пачкой: строки -> ParsedLine с учётом выученных терминов.
+# Отдельно от resolver: здесь нужна сессия БД, сам парсер от неё не зависит.
+from __future__ import annotations
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.learning import learned_categories
+from app.services.periods import record_time
+from .resolver import ParsedLine, parse_line
+
+
+async def parse_many(session: AsyncSession, lines: Iterable[str], user_tg_id: int) -> list[ParsedLine]:
+    """
+    Строки без суммы пропускаются. Для строк с «Прочее» категория берётся из выученных
+    терминов пользователя/глобальных — одно обращение к хранилищу на всю пачку.
+    «вчера такси 12» получает created_at — запишется вчерашним днём.
+    Результат: known -> сразу в add_operations_bulk (as_row()), остальные — в обучение.
+    """
+    parsed = [p._replace(created_at=record_time(p.raw)) for p in map(parse_line, lines) if p is not None]
+    unknown = {p.term for p in parsed if not p.known}
+    if not unknown:
+        return parsed
+    learned = await learned_categories(session, user_tg_id, unknown)
+    return [
+        p._replace(category=learned[p.term]) if not p.known and learned.get(p.term) else p
+        for p in parsed
+    ]
@@ -3,6 +3,8 @@
 from __future__ import annotations
 import re
 
+from .lexer import Token, phrase
+
 # Базовые ключи (минимум, чтобы работало из коробки).
 # Всё неизвестное уйдёт в "Прочее" и будет обучено через UX.
 KEYWORDS: dict[str, list[str]] = {
@@ -36,30 +38,91 @@ KEYWORDS: dict[str, list[str]] = {
     ],
 }
 
-def _tokenize(s: str) -> list[str]:
-    s = s.lower()
-    s = re.sub(r"[^\w\s\-]+", " ", s, flags=re.U)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s.split()
+# Кто побеждает, если в строке нашлись ключи нескольких категорий ("вода" есть и в Еде, и в ЖКХ;
+# "яндекс такси" — и Транспорт, и Подписки): раньше в списке — приоритетнее.
+CATEGORY_PRIORITY: tuple[str, ...] = (
+    "Еда",
+    "Транспорт",
+    "Связь и интернет",
+    "Подписки",
+    "Коммунальные платежи",
+    "Развлечения",
+    "Здоровье",
+    "Одежда",
+    "Доход",
+)
+
+# пунктуация и пробелы -> один пробел (то же, что прежние «пунктуация -> пробел, \s+ -> пробел»)
+_RX_SEP = re.compile(r"[^\w\-]+", re.U)
+
+
+def _trie_pattern(words: list[str]) -> str:
+    # "кофе|кофейня|каша" -> "к(?:аша|офе(?:йня)?)": альтернатива на префиксном дереве,
+    # жадный ? даёт самый длинный ключ, начинающийся в этой позиции
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def walk(node: dict) -> str:
+        end = "" in node
+        alts = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if end:
+            return f"(?:{body})?" if len(alts) == 1 else body + "?"
+        return body
+
+    return walk(trie)
+
+
+def _compile(keywords: dict[str, list[str]], priority: tuple[str, ...]):
+    # категории вне priority — после всех, в порядке словаря
+    order = tuple(priority) + tuple(c for c in keywords if c not in priority)
+    rank = {cat: i for i, cat in enumerate(order)}
+    stem_rank: dict[str, int] = {}
+    for cat, stems in keywords.items():
+        r = rank[cat]
+        for st in stems:
+            stem_rank[st] = min(stem_rank.get(st, r), r)
+    # найденный самый длинный ключ «содержит» все свои префиксы-ключи: берём лучший ранг по ним
+    best = {st: min(r for p, r in stem_rank.items() if st.startswith(p)) for st in stem_rank}
+    rx = re.compile("(?=(" + _trie_pattern(list(stem_rank)) + "))")
+    return rx, best, order
+
+
+# компилируем один раз при импорте: один проход регэкспа по строке вместо цикла по всем ключам
+_RX_KEYS, _STEM_RANK, _CATS = _compile(KEYWORDS, CATEGORY_PRIORITY)
+
+
+def _phrase(s: str) -> str:
+    return _RX_SEP.sub(" ", s.lower())
+
+def _by_phrase(phrase: str) -> str:
+    found = _RX_KEYS.findall(phrase)
+    if not found:
+        return "Прочее"
+    return _CATS[min(_STEM_RANK[st] for st in found)]
 
 def detect_category(text: str, op_type: str | None = None) -> str:
     """
     Возвращает одну из известных категорий или "Прочее".
     Если явно доход (op_type == 'income'), вернёт "Доход".
+    При нескольких совпадениях побеждает категория выше в CATEGORY_PRIORITY.
     """
     if not text:
         return "Прочее"
     if op_type == "income":
         return "Доход"
+    return _by_phrase(_phrase(text))
 
-    tokens = _tokenize(text)
-    phrase = " ".join(tokens)
-
-    # прямые попадания по подстроке
-    for cat, stems in KEYWORDS.items():
-        for stem in stems:
-            if stem in phrase:
-                return cat
-
-    # fallback
-    return "Прочее"
+def category_from_tokens(tokens: list[Token], op_type: str | None = None) -> str:
+    """detect_category для уже разобранной лексером строки (в нижнем регистре)."""
+    if not tokens:
+        return "Прочее"
+    if op_type == "income":
+        return "Доход"
+    return _by_phrase(phrase(tokens))
@@ -0,0 +1,79 @@
+# app/services/parser/intent.py
+# Что хочет пользователь: текст сообщения -> намерение + то, что уже разобрали по дороге.
+# Считается один раз на апдейт (handlers/intent.IntentMiddleware), роутеры фильтруют по готовому.
+# Как и batch, не экспортируется из пакета: тянет за собой services.periods (а с ним конфиг).
+from __future__ import annotations
+import re
+from typing import NamedTuple, Optional
+
+from app.services.periods import Period, parse_period, strip_period
+from .resolver import parse_line
+from .terms import extract_term
+
+COMMAND = "command"   # /команда — её разбирают Command-фильтры
+TEACH = "teach"       # «обучи: термин = Категория»
+BULK = "bulk"         # строки в режиме /bulk_start
+EXPORT = "export"     # «экспорт pdf за неделю»
+REPORT = "report"     # «отчёт за 3 дня», «сколько на еду сегодня», «за август»
+COMPARE = "compare"   # «сравни с прошлым месяцем», «сравни август»
+SEARCH = "search"     # «такси июль», «сигареты вчера» — период + что искать
+RECORD = "record"     # всё остальное — траты/доходы (и ответ мастеру обучения)
+
+RX_EXPORT = re.compile(r"\bэкспорт\b", re.IGNORECASE)
+RX_PDF = re.compile(r"\b(pdf|пдф)\b", re.IGNORECASE)
+RX_XLSX = re.compile(r"\b(xlsx|excel|эксель|иксэл|иксель)\b", re.IGNORECASE)
+RX_COMPARE = re.compile(r"\bсравн\w*", re.IGNORECASE)
+# «с прошлым месяцем» — это база сравнения, а не сравниваемый период
+_RX_COMPARE_BASE = re.compile(r"\b(?:с|со)\s+(?:прошл|предыдущ)\w*\s+\w+", re.IGNORECASE)
+# слова-просьбы об отчёте: с ними период + слова — отчёт, без них — поиск
+_RX_REPORT = re.compile(r"\b(?:отч[её]т|статист|сводк|сколько|покажи|дай|потрат)\w*")
+
+
+class Intent(NamedTuple):
+    kind: str
+    text: str
+    period: Optional[Period] = None    # report/search; у compare None — текущий месяц
+    export_kind: Optional[str] = None  # "pdf" | "xlsx"
+    lines: tuple[str, ...] = ()        # непустые строки для record/bulk
+
+
+def _lines(text: str) -> tuple[str, ...]:
+    return tuple(s for s in (t.strip() for t in text.splitlines()) if s)
+
+def classify(text: str, *, bulk_mode: bool = False, awaiting_category: bool = False) -> Optional[Intent]:
+    """
+    Порядок важен: команда, обучение, ответ мастеру и bulk-режим сильнее содержимого текста.
+    Период без суммы вне него — отчёт или поиск; «вчера такси 12» — запись (вчерашним днём).
+    «Сравни …» — сравнение, только если в нём нет суммы.
+    """
+    t = (text or "").strip()
+    if not t:
+        return None
+    if t.startswith("/"):
+        return Intent(COMMAND, t)
+    low = t.lower()
+    if low.startswith("обучи:"):
+        return Intent(TEACH, t)
+    if awaiting_category:
+        return Intent(RECORD, t, lines=(t,))
+    if bulk_mode:
+        return Intent(BULK, t, lines=_lines(t))
+    if RX_EXPORT.search(t):
+        kind = "xlsx" if RX_XLSX.search(t) and not RX_PDF.search(t) else "pdf"
+        return Intent(EXPORT, t, export_kind=kind)  # период разберёт сам экспорт, как у /export
+    if RX_COMPARE.search(t):
+        base = _RX_COMPARE_BASE.sub(" ", t)
+        p = parse_period(base)
+        # «сравни август» — сравнение; «сравнение цен 5» — всё-таки запись
+        if parse_line(strip_period(base, p) if p else base) is None:
+            return Intent(COMPARE, t, period=p)
+
+    lines = _lines(t)
+    p = parse_period(t) if len(lines) == 1 else None
+    if p is not None:
+        rest = strip_period(t, p)
+        if parse_line(rest) is None:
+            if _RX_REPORT.search(low) or not extract_term(rest):
+                return Intent(REPORT, t, period=p)
+            return Intent(SEARCH, t, period=p)
+    return Intent(RECORD, t, lines=lines)
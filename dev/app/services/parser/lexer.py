@@ -0,0 +1,82 @@
+# app/services/parser/lexer.py
+# Однопроходный лексер: строка -> поток типизированных токенов (вид, текст).
+# Сумма, знак, продукт, категория и термин берутся из одного потока, а не каждый своим регэкспом.
+from __future__ import annotations
+import re
+
+# виды токенов
+NUM = "num"        # подряд идущие цифры: "12", "50" ("12.50" = num "." num)
+SIGN = "sign"      # "+" / "-"
+CUR = "cur"        # валюта: "руб", "byn", "р", "₽", ...
+DATE = "date"      # "вчера", "сегодня"
+WORD = "word"      # буквы a-z / а-я / ё
+WCHAR = "wchar"    # прочие \w: "_", "і", "ў", заглавные в ненормализованном тексте
+SPACE = "space"
+PUNCT = "punct"    # любой другой одиночный символ
+
+# (вид, текст); токены покрывают строку целиком и без пересечений
+Token = tuple[str, str]
+
+# NUM | WORD | WCHAR в сумме дают ровно \w — на этом держится сборка фразы для категорий
+_KINDS = (
+    (NUM, r"\d+"),
+    (WORD, r"[a-zа-яё]+"),
+    (SPACE, r"\s+"),
+    (SIGN, r"[+-]"),
+    (WCHAR, r"[^\W\da-zа-яё]+"),
+    (PUNCT, r"."),
+)
+_RX_TOKEN = re.compile("|".join(rx for _, rx in _KINDS), re.S)
+# вид токена однозначно задаётся первым символом — классифицируем символ один раз и запоминаем
+_RX_KIND = re.compile("|".join(f"(?P<{kind}>{rx})" for kind, rx in _KINDS), re.S)
+_char_kinds: dict[str, str] = {}
+
+CURRENCY_WORDS = frozenset({"byn", "бр", "р", "руб", "usd", "eur"})
+CURRENCY_SIGNS = frozenset({"₽", "$", "€"})
+DATE_WORDS = frozenset({"вчера", "сегодня"})
+
+# токены, у которых вид определяется текстом целиком
+_SPECIAL = {
+    **{w: CUR for w in CURRENCY_WORDS | CURRENCY_SIGNS},
+    **{w: DATE for w in DATE_WORDS},
+}
+
+_WORDCHAR_KINDS = frozenset({NUM, WORD, DATE, WCHAR})
+
+
+def _char_kind(ch: str) -> str:
+    kind = _char_kinds.get(ch)
+    if kind is None:
+        kind = _char_kinds[ch] = _RX_KIND.match(ch).lastgroup
+    return kind
+
+
+def tokenize(text: str) -> list[Token]:
+    """
+    >>> tokenize("вчера такси -12.5")
+    [('date', 'вчера'), ('space', ' '), ('word', 'такси'), ('space', ' '), ('sign', '-'), ('num', '12'), ('punct', '.'), ('num', '5')]
+    """
+    return [
+        (_SPECIAL.get(s) or _char_kinds.get(s[0]) or _char_kind(s[0]), s)
+        for s in _RX_TOKEN.findall(text)
+    ]
+
+
+def phrase(tokens: list[Token]) -> str:
+    """
+    Текст, где каждая серия символов вне [\\w-] заменена одним пробелом —
+    то же, что re.sub(r"[^\\w\\-]+", " ", text). По ней ищутся ключи категорий.
+    """
+    parts: list[str] = []
+    sep = False
+    for kind, text in tokens:
+        if kind in _WORDCHAR_KINDS or text == "-" or (kind == CUR and text in CURRENCY_WORDS):
+            if sep:
+                parts.append(" ")
+                sep = False
+            parts.append(text)
+        else:
+            sep = True
+    if sep:
+        parts.append(" ")
+    return "".join(parts)
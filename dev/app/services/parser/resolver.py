@@ -2,16 +2,45 @@
 # Единая точка входа парсера: parse_message(...)
 from __future__ import annotations
 import re
-from typing import Optional
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
 from .normalizer import normalize
-from .amount import extract_amount, detect_type
-from .category import detect_category
+from .lexer import tokenize
+from .amount import AmountMatch, find_amount, detect_type
+from .category import category_from_tokens
+from .terms import term_from_tokens
 
-# Число со знаком/без знака (первое в строке)
-_RX_NUM_POS = re.compile(r"(?P<sign>[+-])?\s*(?P<num>\d+(?:\.\d{1,2})?)")
+# категории, которые считаем «не распознано» — их уточняют выученные термины
+OTHER_CATEGORIES = ("Прочее", "Прочие платежи")
 
-def _extract_product_phrase(text: str) -> str:
+_RX_WS = re.compile(r"\s+")
+
+
+class ParsedLine(NamedTuple):
+    raw: str
+    amount: float
+    currency: str
+    type: str          # "income" | "expense"
+    category: str      # неизвестное -> "Прочее"
+    product: str
+    term: str          # ключ обучения: extract_term, иначе продукт, иначе "Позиция"
+    created_at: Optional[datetime] = None   # «вчера такси 12» (ставит parse_many); None — сейчас
+
+    @property
+    def known(self) -> bool:
+        return bool(self.category) and self.category not in OTHER_CATEGORIES
+
+    def as_row(self) -> dict:
+        """Строка для add_operations_bulk (description — исходная строка)."""
+        row = {"amount": self.amount, "category": self.category, "description": self.raw, "type": self.type}
+        if self.created_at is not None:
+            row["created_at"] = self.created_at
+        return row
+
+
+def _extract_product_phrase(text: str, m: Optional[AmountMatch] = None) -> str:
     """
     Берём «продукт» как фразу ДО первой суммы.
     Примеры:
@@ -21,43 +50,64 @@ def _extract_product_phrase(text: str) -> str:
       "вчера такси 10" -> "вчера такси" (дальше категория разрулит)
     Если суммы нет — вернёт пусто (но мы в parse_message проверяем, что сумма есть).
     """
-    m = _RX_NUM_POS.search(text)
+    if m is None:
+        m = find_amount(tokenize(text))
     if not m:
         return ""
-    before = text[:m.start()].strip()
+    before = text[:m.start].strip()
     if before:
         # убираем лишние пробелы
-        before = re.sub(r"\s+", " ", before)
+        before = _RX_WS.sub(" ", before)
     else:
         # если сумма стоит первой — берём всё после числа как продукт
-        after = text[m.end():].strip()
-        before = re.sub(r"\s+", " ", after)
+        after = text[m.end:].strip()
+        before = _RX_WS.sub(" ", after)
     return before
 
+# одни и те же строки («кофе 5», «такси 10») приходят постоянно: разбор зависит только от
+# нормализованного текста, его и кэшируем
+PARSE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(text: str) -> Optional[tuple[float, str, str, str, str, str]]:
+    # строка сканируется один раз: сумма, тип, продукт, категория и термин — из одного потока токенов
+    tokens = tokenize(text)
+    m = find_amount(tokens)
+    if not m:
+        return None
+    op_type = detect_type(text, m)
+    product = _extract_product_phrase(text, m) or ""
+    category = category_from_tokens(tokens, op_type=op_type)
+    term = term_from_tokens(tokens) or product.capitalize() or "Позиция"
+    return m.value, "BYN", op_type, category, product, term
+
+def parse_cache_info():
+    """hits/misses/maxsize/currsize кэша разбора."""
+    return _parse_normalized.cache_info()
+
+def parse_line(raw: str) -> Optional[ParsedLine]:
+    """Разбор одной строки в ParsedLine; без суммы — None."""
+    if not raw or not raw.strip():
+        return None
+    parsed = _parse_normalized(normalize(raw))
+    if parsed is None:
+        return None
+    return ParsedLine(raw.strip(), *parsed)
+
 def parse_message(raw: str, user_tg_id: int | None = None) -> Optional[dict]:
     """
     На вход свободный текст, на выход:
       { amount, currency, type, category, product, raw }
-    Если суммы нет — None.
+    Если суммы нет — None. Каждый вызов отдаёт новый dict — его можно менять.
     """
-    if not raw or not raw.strip():
-        return None
-
-    text = normalize(raw)
-    amt_cur = extract_amount(text)
-    if not amt_cur:
+    p = parse_line(raw)
+    if p is None:
         return None
-    amount, currency = amt_cur
-
-    op_type = detect_type(text)
-    product = _extract_product_phrase(text) or ""
-    category = detect_category(text, op_type=op_type)
-
     return {
-        "amount": float(abs(amount)),
-        "currency": (currency or "BYN"),
-        "type": op_type,           # "income" | "expense"
-        "category": category,      # неизвестное -> "Прочее" (далее обучим)
-        "product": product,        # ФРАЗА (может быть из 2+ слов)
-        "raw": raw.strip(),
+        "amount": p.amount,
+        "currency": p.currency,
+        "type": p.type,            # "income" | "expense"
+        "category": p.category,    # неизвестное -> "Прочее" (далее обучим)
+        "product": p.product,      # ФРАЗА (может быть из 2+ слов)
+        "raw": p.raw,
     }
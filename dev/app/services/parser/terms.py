@@ -0,0 +1,46 @@
+# app/services/parser/terms.py
+# Термин строки (1–3 слова) — ключ для обучения категорий.
+from __future__ import annotations
+import re
+
+from .lexer import CUR, CURRENCY_WORDS, DATE, NUM, WORD, Token, tokenize
+
+_STOP_WORDS = {
+    "потратил","потратила","купил","купила","оплатил","оплатила","заплатил","заплатила",
+    "вчера","сегодня","на","по","за","—","-","+",
+    "руб","руб.","byn","р","р.","бр","usd","eur","₽","$","€"
+}
+
+_RX_ASCII_DIGITS = re.compile(r"[0-9]*")
+
+def term_from_tokens(tokens: list[Token]) -> str:
+    """
+    Слова — [a-zа-яё][a-zа-яё0-9]*: буквы и приклеенные к ним цифры ("кофе2" — одно слово),
+    числа/валюты/знаки/служебные слова пропускаются; в терм идут первые три.
+    """
+    words: list[str] = []
+    open_word = False
+    for kind, text in tokens:
+        if kind == WORD or kind == DATE or (kind == CUR and text in CURRENCY_WORDS):
+            if open_word:
+                words[-1] += text
+            else:
+                words.append(text)
+                open_word = True
+        elif kind == NUM and open_word:
+            if text.isascii():
+                words[-1] += text
+            else:
+                # в слово идут только 0-9: "a1٣" -> "a1"
+                words[-1] += _RX_ASCII_DIGITS.match(text).group()
+                open_word = False
+        else:
+            open_word = False
+    picked = [w for w in words if w not in _STOP_WORDS][:3]
+    return " ".join(w.capitalize() for w in picked)
+
+def extract_term(text: str) -> str:
+    """Вернёт терм 1–3 слова с буквами (игнорируя суммы/валюты/служебные)."""
+    if not text:
+        return ""
+    return term_from_tokens(tokenize(text.lower()))
@@ -1,27 +1,79 @@
 # -*- coding: utf-8 -*-
 # app/services/periods.py
+# Единая грамматика периодов: «вчера», «за 3 дня», «прошлую неделю», «за август 2024»,
+# «с 5 по 7 августа», «с 01.08 по 15.08», «за 2024 год», «за 05.08.2024» ...
+# Один скомпилированный регэксп; разбор кэшируется по (текст, сегодня).
 from __future__ import annotations
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 import re
-from typing import Optional, Tuple
-
-RU_MONTHS = {
-    "янв": 1, "январ": 1,
-    "фев": 2, "феврал": 2,
-    "мар": 3, "март": 3,
-    "апр": 4, "апрел": 4,
-    "мая": 5, "май": 5,
-    "июн": 6, "июнь": 6,
-    "июл": 7, "июль": 7,
-    "авг": 8, "август": 8,
-    "сен": 9, "сентяб": 9,
-    "окт": 10,"октябр": 10,
-    "ноя": 11,"ноябр": 11,
-    "дек": 12,"декабр": 12,
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+
+MONTH_NAMES = (
+    "январь", "февраль", "март", "апрель", "май", "июнь",
+    "июль", "август", "сентябрь", "октябрь", "ноябрь", "декабрь",
+)
+# месяц по первым трём буквам любой формы: «августа», «авг», «мае»
+_MONTH_BY_PREFIX = {
+    "янв": 1, "фев": 2, "мар": 3, "апр": 4, "май": 5, "мая": 5, "мае": 5, "июн": 6,
+    "июл": 7, "авг": 8, "сен": 9, "окт": 10, "ноя": 11, "дек": 12,
 }
 
+MAX_DAYS = 3660           # «за 100000 дней» не должно ронять timedelta
+PERIOD_CACHE_SIZE = 1024
+
+# ---------- грамматика ----------
+
+# только целые слова: «мартини» и «декор» — не месяцы
+_MONTH = (r"(?:январ[ьяе]|феврал[ьяе]|март[ае]?|апрел[ьяе]|ма[йяе]|июн[ьяе]|июл[ьяе]|август[ае]?"
+          r"|сентябр[ьяе]|октябр[ьяе]|ноябр[ьяе]|декабр[ьяе]|янв|фев|мар|апр|авг|сент?|окт|нояб?|дек)\b")
+_DAYS = r"д(?:н(?:я|ей)?|ень)?\b"
+_FULL_DATE = r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}\.\d{1,2}\.\d{4}"
+# конец диапазона: полная дата, «01.08» или просто число месяца
+_END = rf"(?:{_FULL_DATE}|\d{{1,2}}\.\d{{1,2}}|\d{{1,2}})(?!\d)"
+
+# Порядок = приоритет: если в тексте нашлось несколько периодов, берём правило выше.
+# Первые — «явные»: фраза точно про период. Голые «август», «3 дня», «8 марта» в строке
+# «квартплата июль 120» могут быть и частью траты — они ниже и explicit=False.
+_RULES = (
+    ("today", r"\bсегодня\b", True),
+    ("day_before", r"\bпозавчера\b", True),
+    ("yesterday", r"\bвчера\b", True),
+    ("range", rf"\bс\s*(?P<r1>{_END})\s*(?:по|до|[-–—])\s*(?P<r2>{_END})"
+              rf"(?:\s*(?P<rmon>{_MONTH}))?(?:\s*(?P<ryear>\d{{4}})\b)?", True),
+    ("date", rf"\b(?:за|на)\s+(?:(?P<dfull>{_FULL_DATE})(?!\d)"
+             rf"|(?P<dday>\d{{1,2}})\s+(?P<dmon>{_MONTH})(?:\s*(?P<dyear>\d{{4}})\b)?)", True),
+    ("ndays", rf"(?:\bза\s+)?\bпоследни[ех]\s+(?P<n1>\d+)\s*{_DAYS}|\bза\s*(?P<n2>\d+)\s*{_DAYS}", True),
+    ("week", r"\b(?P<wprev>прошл\w*\s+)?недел\w*", True),
+    ("month", r"\b(?P<mprev>прошл\w*\s+)?месяц\w*", True),
+    ("year", r"\b(?:за|в)\s+(?:(?P<yprev>прошл\w*)|эт\w*|текущ\w*)\s+год\w*|\bза\s+год\b"
+             r"|\b(?:за|в)?\s*(?P<yn>\d{4})\s*(?:год\w*|г)\b", True),
+    ("month_name", rf"\b(?:за|в)\s+(?P<mn>{_MONTH})(?:\s*(?P<mny>\d{{4}})\b)?", True),
+    ("report", r"\b(?:отч[её]т|статист|сводк)", True),
+    # дальше — голые формы, только для поиска/экспорта (period_from_text)
+    ("ndays_bare", r"\b(?P<nb>\d+)\s*(?:дня|дней)\b", False),
+    ("date_bare", rf"\b(?:(?P<dbfull>{_FULL_DATE})(?!\d)"
+                  rf"|(?P<dbday>\d{{1,2}})\s+(?P<dbmon>{_MONTH})(?:\s*(?P<dbyear>\d{{4}})\b)?)", False),
+    ("month_bare", rf"\b(?P<mb>{_MONTH})(?:\s*(?P<mby>\d{{4}})\b)?", False),
+)
+_RX_PERIOD = re.compile("|".join(f"(?P<{name}>{rx})" for name, rx, _ in _RULES))
+_PRIORITY = {name: (i, explicit) for i, (name, _, explicit) in enumerate(_RULES)}
+_RX_WS = re.compile(r"\s+")
+
+
+class Period(NamedTuple):
+    start: date           # включительно; «сегодня» — по settings.tz, а сравниваются даты
+    end: date             # с naive UTC created_at (и днями daily_rollups) как есть
+    label: str            # «вчера», «последние 3 дн.», «август 2024» — после «за»
+    explicit: bool        # фраза однозначно про период (см. _RULES)
+    phrase: str           # найденная фраза в нормализованном тексте: «за 3 дня»
+
+
 def today() -> date:
-    return datetime.now().date()
+    return datetime.now(ZoneInfo(settings.tz)).date()
 
 def fmt_date(d: date) -> str:
     return d.strftime("%Y-%m-%d")
@@ -37,6 +89,19 @@ def period_preset(kind: str) -> tuple[date, date]:
         return (first, t)
     raise ValueError("unknown preset")
 
+def previous_period(start: date, end: date) -> tuple[date, date]:
+    """
+    С чем сравнивать: внутри одного месяца от 1-го числа — те же числа месяцем раньше
+    (1–18 окт -> 1–18 сен, весь октябрь -> весь сентябрь), иначе — столько же дней перед start.
+    """
+    if start.day == 1 and (start.year, start.month) == (end.year, end.month):
+        prev_end = start - timedelta(days=1)
+        if end != _month_end(end.year, end.month):
+            prev_end = prev_end.replace(day=min(end.day, prev_end.day))
+        return prev_end.replace(day=1), prev_end
+    n = (end - start).days + 1
+    return start - timedelta(days=n), start - timedelta(days=1)
+
 def label_for_period(d1: date, d2: date, label_override: Optional[str]) -> str:
     if label_override:
         return label_override
@@ -44,83 +109,143 @@ def label_for_period(d1: date, d2: date, label_override: Optional[str]) -> str:
         return d1.isoformat()
     return f"{d1.isoformat()} — {d2.isoformat()}"
 
-def _parse_month_token(tok: str) -> Optional[int]:
-    s = tok.lower()
-    for k, m in RU_MONTHS.items():
-        if s.startswith(k):
-            return m
-    return None
+# ---------- разбор ----------
+
+def _month_end(y: int, mon: int) -> date:
+    return date(y + mon // 12, mon % 12 + 1, 1) - timedelta(days=1)
+
+def _month(word: str) -> int:
+    return _MONTH_BY_PREFIX[word[:3]]
+
+def _last_month_year(mon: int, t: date) -> int:
+    # «за декабрь» в январе — прошлый декабрь, а не будущий
+    return t.year if mon <= t.month else t.year - 1
 
-def parse_free_period(text: str) -> Optional[Tuple[date, date, str]]:
+def _month_period(mon: int, year: Optional[str], t: date) -> tuple[date, date, str]:
+    y = int(year) if year else _last_month_year(mon, t)
+    label = MONTH_NAMES[mon - 1] if y == t.year else f"{MONTH_NAMES[mon - 1]} {y}"
+    return date(y, mon, 1), _month_end(y, mon), label
+
+def _full_date(s: str) -> date:
+    if "-" in s:
+        y, mon, d = s.split("-")
+    else:
+        d, mon, y = s.split(".")
+    return date(int(y), int(mon), int(d))
+
+def _range_end(s: str, mon: Optional[int], year: Optional[int], t: date) -> date:
+    if "-" in s or s.count(".") == 2:
+        return _full_date(s)
+    if "." in s:
+        d, m_ = s.split(".")
+        mon = int(m_)
+    else:
+        d = s
+    if mon is None:
+        return date(year or t.year, t.month, int(d))
+    return date(year or _last_month_year(mon, t), mon, int(d))
+
+def _rule(name: str, m: re.Match, t: date) -> tuple[date, date, str]:
+    g = m.group
+    if name in ("today", "report"):
+        return t, t, "сегодня"
+    if name == "yesterday":
+        d = t - timedelta(days=1)
+        return d, d, "вчера"
+    if name == "day_before":
+        d = t - timedelta(days=2)
+        return d, d, "позавчера"
+    if name == "range":
+        mon = _month(g("rmon")) if g("rmon") else None
+        year = int(g("ryear")) if g("ryear") else None
+        d1, d2 = _range_end(g("r1"), mon, year, t), _range_end(g("r2"), mon, year, t)
+        if d1 > d2:
+            d1, d2 = d2, d1
+        return d1, d2, f"{d1.isoformat()}–{d2.isoformat()}"
+    if name in ("date", "date_bare"):
+        full, day, mon, year = (g("dfull"), g("dday"), g("dmon"), g("dyear")) if name == "date" \
+            else (g("dbfull"), g("dbday"), g("dbmon"), g("dbyear"))
+        if full:
+            d = _full_date(full)
+        else:
+            mnum = _month(mon)
+            d = date(int(year) if year else _last_month_year(mnum, t), mnum, int(day))
+        return d, d, d.isoformat()
+    if name in ("ndays", "ndays_bare"):
+        n = min(MAX_DAYS, max(1, int(g("n1") or g("n2") or g("nb"))))
+        return t - timedelta(days=n - 1), t, f"последние {n} дн."
+    if name == "week":
+        if g("wprev"):
+            monday = t - timedelta(days=t.weekday() + 7)
+            return monday, monday + timedelta(days=6), "прошлую неделю"
+        return t - timedelta(days=6), t, "последнюю неделю"
+    if name == "month":
+        if g("mprev"):
+            last = t.replace(day=1) - timedelta(days=1)
+            return _month_period(last.month, str(last.year), t)
+        return t.replace(day=1), t, "месяц"
+    if name == "year":
+        y = int(g("yn")) if g("yn") else t.year - (1 if g("yprev") else 0)
+        return date(y, 1, 1), date(y, 12, 31), f"{y} год"
+    if name == "month_name":
+        return _month_period(_month(g("mn")), g("mny"), t)
+    if name == "month_bare":
+        return _month_period(_month(g("mb")), g("mby"), t)
+    raise AssertionError(name)
+
+@lru_cache(maxsize=PERIOD_CACHE_SIZE)
+def _parse(text: str, t: date) -> Optional[Period]:
+    best = None
+    for m in _RX_PERIOD.finditer(text):
+        rank = _PRIORITY[m.lastgroup]
+        if best is not None and rank >= best[0]:
+            continue
+        try:
+            d1, d2, label = _rule(m.lastgroup, m, t)
+        except ValueError:        # «с 30 по 31 февраля», «за 2024-13-01»
+            continue
+        best = rank, d1, d2, label, m.group()
+    if best is None:
+        return None
+    (_, explicit), d1, d2, label, phrase = best
+    return Period(d1, d2, label, explicit, phrase)
+
+def _norm(text: str) -> str:
+    return _RX_WS.sub(" ", text.lower()).strip()
+
+def parse_period(text: str, *, on: Optional[date] = None, tz: Optional[str] = None) -> Optional[Period]:
     """
-    Понимает:
-      - "отчет/отчёт за 3 дня"
-      - "за неделю" / "неделя"
-      - "за месяц" / "месяц" (текущий)
-      - "за август" (текущий год)
-      - "с 5 по 7 августа"
-      - "сегодня" / "вчера"
-    Возвращает (d1, d2, label).
+    Период из свободного текста или None. on — «сегодня» (по умолчанию — сегодня в tz).
+    Одна и та же фраза в тот же день разбирается один раз: сообщение проходит через
+    фильтры нескольких роутеров, и все они спрашивают одно и то же.
     """
     if not text:
         return None
-    s = text.lower().strip()
-
-    # сегодня/вчера
-    if "сегодня" in s:
-        d = today(); return (d, d, "сегодня")
-    if "вчера" in s:
-        d = today() - timedelta(days=1); return (d, d, "вчера")
-
-    # за N дней
-    m = re.search(r"за\s+(\d+)\s*д", s)
-    if m:
-        n = max(1, int(m.group(1)))
-        d2 = today()
-        d1 = d2 - timedelta(days=n - 1)
-        return (d1, d2, f"последние {n} дн.")
-
-    # неделя / за неделю
-    if "недел" in s:
-        d2 = today()
-        d1 = d2 - timedelta(days=6)
-        return (d1, d2, "последнюю неделю")
-
-    # месяц / за месяц
-    if "месяц" in s:
-        d2 = today()
-        d1 = d2.replace(day=1)
-        return (d1, d2, "месяц")
-
-    # за <месяц>
-    m = re.search(r"за\s+([A-Za-zА-Яа-яЁё]+)", s)
-    if m:
-        mon = _parse_month_token(m.group(1))
-        if mon:
-            t = today()
-            y = t.year
-            d1 = date(y, mon, 1)
-            if mon == 12:
-                d2 = date(y, 12, 31)
-            else:
-                d2 = date(y, mon + 1, 1) - timedelta(days=1)
-            return (d1, d2, m.group(1).capitalize())
-
-    # с D по D <месяц>
-    m = re.search(r"с\s*(\d{1,2})\s*по\s*(\d{1,2})\s*([A-Za-zА-Яа-яЁё]+)", s)
-    if m:
-        d1d, d2d, mon_tok = int(m.group(1)), int(m.group(2)), m.group(3)
-        mon = _parse_month_token(mon_tok)
-        if mon:
-            y = today().year
-            d1 = date(y, mon, d1d)
-            d2 = date(y, mon, d2d)
-            if d1 > d2:
-                d1, d2 = d2, d1
-            return (d1, d2, f"{d1.isoformat()}–{d2.isoformat()}")
-
-    # просто "отчет/отчёт" — сегодня
-    if "отчет" in s or "отчёт" in s or "статист" in s or "сводк" in s:
-        d = today(); return (d, d, "сегодня")
-
-    return None
+    if on is None:
+        on = datetime.now(ZoneInfo(tz or settings.tz)).date()
+    return _parse(_norm(text), on)
+
+# относительные дни, которыми датируется трата; «8 марта», «1 октября» в строке — часть описания
+_RECORD_DAYS = ("вчера", "позавчера")
+
+def record_time(text: str, *, on: Optional[date] = None, tz: Optional[str] = None) -> Optional[datetime]:
+    """
+    Время для записи траты с «вчера»/«позавчера» в строке: «вчера такси 12» -> вчера.
+    Местный полдень того дня в naive UTC, как created_at: дата та же при любом поясе до ±12 ч,
+    и от времени отправки не зависит. None — писать текущим временем.
+    """
+    zone = ZoneInfo(tz or settings.tz)
+    on = on or datetime.now(zone).date()
+    p = parse_period(text, on=on, tz=tz)
+    if p is None or p.label not in _RECORD_DAYS:
+        return None
+    noon = datetime.combine(p.start, time(12), tzinfo=zone)
+    return noon.astimezone(timezone.utc).replace(tzinfo=None)
+
+def strip_period(text: str, p: Period) -> str:
+    """Текст без фразы периода (в нижнем регистре): «Вчера такси 12» -> « такси 12»."""
+    return _norm(text).replace(p.phrase, " ", 1)
+
+def period_cache_info():
+    """hits/misses/maxsize/currsize кэша разбора периодов."""
+    return _parse.cache_info()
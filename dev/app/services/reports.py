@@ -1,9 +1,19 @@
 # app/services/reports.py
 from __future__ import annotations
 from datetime import date
+from typing import Callable, NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.repo.records import get_operations_range
+from app.repo.records import category_totals, signed_by_category
+from app.repo.rollups import rollup_compare
+
+class CategoryDelta(NamedTuple):
+    category: str
+    type: str            # "income" | "expense"
+    current: float
+    previous: float
+    delta: float         # current - previous
+    pct: Optional[float] # изменение в %, None — в прошлом периоде не было
 
 async def report_summary(
     session: AsyncSession,
@@ -15,14 +25,8 @@ async def report_summary(
     Возвращает словарь: {категория: сумма со знаком} за период.
     Доходы > 0, расходы < 0.
     """
-    ops = await get_operations_range(session, user_db_id, start, end)
-    agg: dict[str, float] = {}
-    for o in ops:
-        sign = 1.0 if o.type == "income" else -1.0
-        val = sign * float(abs(o.amount))
-        cat = o.category or "Прочее"
-        agg[cat] = agg.get(cat, 0.0) + val
-    return {k: round(v, 2) for k, v in agg.items()}
+    totals = await category_totals(session, user_db_id, start, end)
+    return signed_by_category(totals)
 
 async def spent_on_category(
     session: AsyncSession,
@@ -34,10 +38,32 @@ async def spent_on_category(
     """
     Сумма РАСХОДОВ по категории за период (положительное число).
     """
-    ops = await get_operations_range(session, user_db_id, start, end)
+    totals = await category_totals(session, user_db_id, start, end, op_type="expense")
     want = (category_name or "").lower()
-    total = 0.0
-    for o in ops:
-        if o.type == "expense" and (o.category or "").lower() == want:
-            total += abs(float(o.amount))
+    # сравниваем в питоне по десятку групп: lower() в SQLite не знает кириллицу
+    total = sum(t.total for t in totals if (t.category or "").lower() == want)
     return round(total, 2)
+
+async def compare_periods(
+    session: AsyncSession,
+    user_db_id: int,
+    cur: tuple[date, date],
+    prev: tuple[date, date],
+    normalize: Callable[[str], str] = lambda c: c,
+) -> list[CategoryDelta]:
+    """
+    Суммы по категориям за cur и prev (один запрос к daily_rollups) с разницей и процентом.
+    normalize склеивает синонимы категорий (как в сводке). Сортировка — по убыванию текущей суммы.
+    """
+    acc: dict[tuple[str, str], list[float]] = {}
+    for cat, typ, a, b in await rollup_compare(session, user_db_id, cur, prev):
+        pair = acc.setdefault((normalize(cat or "Прочее"), typ), [0.0, 0.0])
+        pair[0] += a
+        pair[1] += b
+    out = [
+        CategoryDelta(cat, typ, a, b, a - b, (a - b) / b * 100 if b else None)
+        for (cat, typ), (a, b) in acc.items()
+        if round(a, 2) or round(b, 2)
+    ]
+    out.sort(key=lambda d: (-d.current, -d.previous))
+    return out
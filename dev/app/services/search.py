@@ -1,14 +1,60 @@
-# app/services/search.py
 # Поиск по операциям: по подстроке в описании/категории + период.
+# Ищет БД: Postgres — pg_trgm (ILIKE + similarity), SQLite — FTS5 с триграммами (bm25).
 
 from __future__ import annotations
 from datetime import date, datetime
-from typing import List
+import re
+from typing import NamedTuple
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, or_, func, text, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.operation import Operation
+from app.models.record import OpRecord
+from app.repo.records import RECORD_COLUMNS
+from app.repo.upsert import dialect_name
+
+SEARCH_LIMIT = 50
+
+_RX_WORD = re.compile(r"[^\W\d_]{3,}", re.U)   # слова из букв; триграммам нужно >= 3 символов
+
+
+def _terms(query: str) -> list[str]:
+    seen: list[str] = []
+    for w in _RX_WORD.findall((query or "").lower()):
+        if w not in seen:
+            seen.append(w)
+    return seen
+
+
+class SearchResult(NamedTuple):
+    rows: list[OpRecord]   # не больше limit, самые релевантные сверху
+    found: int             # всего совпадений за период
+    total_exp: float       # итоги — по всем совпадениям, а не только по rows
+    total_inc: float
+
+
+def _pg_scope(terms: list[str]):
+    # выражения — ровно как в индексах миграции 0005 (lower(description), lower(category)),
+    # иначе GIN по триграммам не используется; NULL-описание просто не совпадает
+    desc = func.lower(Operation.description)
+    cat = func.lower(Operation.category)
+    phrase = " ".join(terms)
+    rank = func.greatest(func.similarity(desc, phrase), func.similarity(cat, phrase))
+    match = or_(*[c.like(f"%{t}%") for t in terms for c in (desc, cat)])
+    return (lambda stmt: stmt.where(match)), (rank.desc(), Operation.created_at.desc()), {}
+
+
+def _sqlite_scope(terms: list[str]):
+    # каждое слово — отдельная фраза FTS5, совпадение по любому; ранжирует bm25
+    match = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    fts_ids = (
+        select(literal_column("rowid").label("id"), literal_column("bm25(operations_fts)").label("rank"))
+        .select_from(text("operations_fts"))
+        .where(text("operations_fts MATCH :match"))
+        .subquery("fts")
+    )
+    return (lambda stmt: stmt.join(fts_ids, fts_ids.c.id == Operation.id)), (fts_ids.c.rank, Operation.created_at.desc()), {"match": match}
 
 
 async def search_operations(
@@ -17,33 +63,46 @@ async def search_operations(
     query: str,
     start: date,
     end: date,
-) -> list[Operation]:
-    q = (query or "").strip().lower()
-    if not q:
-        return []
+    limit: int = SEARCH_LIMIT,
+) -> SearchResult:
+    """
+    Операции за период, где описание или категория содержат любое слово запроса.
+    Самые релевантные сверху, не больше limit строк; итоги и число — по всем совпадениям
+    (если строк упёрлось в limit — отдельным SUM с тем же условием).
+    """
+    terms = _terms(query)
+    if not terms:
+        return SearchResult([], 0, 0.0, 0.0)
 
     start_dt = datetime.combine(start, datetime.min.time())
     end_dt = datetime.combine(end, datetime.max.time())
+    in_range = and_(
+        Operation.user_id == user_db_id,
+        Operation.created_at >= start_dt,
+        Operation.created_at <= end_dt,
+    )
+    if dialect_name(session) == "postgresql":
+        scope, order, params = _pg_scope(terms)
+    else:
+        scope, order, params = _sqlite_scope(terms)
+
+    res = await session.execute(
+        scope(select(*RECORD_COLUMNS)).where(in_range).order_by(*order).limit(limit), params
+    )
+    rows = [OpRecord._make(r) for r in res.all()]
+    if len(rows) < limit:
+        exp = sum(abs(float(o.amount)) for o in rows if o.type == "expense")
+        inc = sum(abs(float(o.amount)) for o in rows if o.type != "expense")
+        return SearchResult(rows, len(rows), exp, inc)
 
-    stmt = (
-        select(Operation)
-        .where(
-            and_(
-                Operation.user_id == user_db_id,
-                Operation.created_at >= start_dt,
-                Operation.created_at <= end_dt,
-            )
-        )
-        .order_by(Operation.created_at.asc())
+    agg = await session.execute(
+        scope(select(Operation.type, func.sum(func.abs(Operation.amount)), func.count(Operation.id))
+              .select_from(Operation))
+        .where(in_range)
+        .group_by(Operation.type),
+        params,
     )
-    res = await session.execute(stmt)
-    ops = list(res.scalars().all())
-
-    # Фильтруем в питоне — чтобы не заморачиваться с ILIKE/indices на старте
-    out: list[Operation] = []
-    for o in ops:
-        cat = (o.category or "").lower()
-        desc = (o.description or "").lower()
-        if q in cat or q in desc:
-            out.append(o)
-    return out
+    by_type = {typ: (float(total or 0.0), int(n)) for typ, total, n in agg.all()}
+    exp, n_exp = by_type.pop("expense", (0.0, 0))
+    inc = sum(v for v, _ in by_type.values())
+    return SearchResult(rows, n_exp + sum(n for _, n in by_type.values()), exp, inc)
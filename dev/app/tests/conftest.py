@@ -0,0 +1,10 @@
+# app/tests/conftest.py
+# app.core.config читается при импорте и требует BOT_TOKEN/DATABASE_URL — для тестов хватает заглушек:
+# в сеть и в «боевую» БД тесты не ходят, свои SQLite-файлы создают во временных каталогах.
+import os
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "123:test")
+# не setdefault: хендлеры ходят в глобальный engine, и он не должен смотреть в настоящую БД из окружения
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='finansist_test_')}/bot.db"
+os.environ.setdefault("TZ", "Europe/Minsk")
@@ -0,0 +1,105 @@
+# app/tests/test_handlers.py
+# Списки операций: заголовок вида и callback_data кнопок (лимит Telegram — 64 байта),
+# удаление со страницы из кэша. Хендлеры работают с глобальным engine — в conftest это временная SQLite.
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.db import engine, init_db, session_scope
+from app.handlers import reports
+from app.handlers.reports import DetailsPage, _render_details, cb_delete, details_view
+from app.models.record import OpRecord
+from app.repo.records import add_operation
+from app.repo.users import resolve_user
+from app.services.periods import today
+from app.ui.ui import pack_cursor
+
+DAY = date(2025, 3, 10)
+
+
+def _page(n: int = 3) -> DetailsPage:
+    base = datetime(2025, 3, 10, 9)
+    rows = tuple(
+        OpRecord._make((9_999_990 + i, base + timedelta(minutes=i), "expense", -(i + 1.5), "Еда", f"кофе {i}"))
+        for i in range(n)
+    )
+    return DetailsPage(rows, True, True, 100.0, 0.0)
+
+
+@pytest.mark.parametrize("view, title", [("", "Детальный отчёт"), ("r", "Записи за сегодня")])
+def test_details_keep_their_title_in_buttons(view, title):
+    text, kb = _render_details(_page(), DAY, DAY, view)
+    assert title in text.splitlines()[0]
+    data = [b.callback_data for row in kb.inline_keyboard for b in row]
+    assert all(len(d.encode()) <= 64 for d in data)
+    carried = [d for d in data if d.startswith(("del:", "details:"))]
+    assert carried
+    if view:
+        assert all(d.endswith(f":{view}") for d in carried)
+    else:
+        assert all(d.split(":")[-1] != "r" for d in carried)
+
+
+class _Callback(SimpleNamespace):
+    """Минимум CallbackQuery, который трогает cb_delete."""
+
+    def __init__(self, tg_id: int, data: str) -> None:
+        async def edit_text(text, **kw):
+            self.edited = text
+
+        async def answer(text=None, **kw):
+            self.answered = text
+
+        super().__init__(data=data, from_user=SimpleNamespace(id=tg_id, username=None),
+                         message=SimpleNamespace(edit_text=edit_text), answer=answer, edited=None, answered=None)
+
+
+def test_delete_twice_from_cached_page_while_others_write(monkeypatch):
+    fetches = []
+    real_page = reports.get_records_page
+
+    async def counting_page(*a, **kw):
+        fetches.append(kw.get("direction"))
+        return await real_page(*a, **kw)
+
+    monkeypatch.setattr(reports, "get_records_page", counting_page)
+    day = today()
+
+    async def other_user_writes():
+        async with session_scope() as s:
+            other = await resolve_user(s, 70_002)
+            await add_operation(s, other.id, -1, "Еда", "чужая", "expense")
+
+    async def main():
+        await init_db()
+        try:
+            async with session_scope() as s:
+                user = await resolve_user(s, 70_001)
+                for i in range(4):
+                    await add_operation(s, user.id, -(i + 1), "Еда", f"кофе {i}", "expense")
+            async with session_scope() as s:
+                await details_view(s, user.id, day, day, "r")
+                page = await reports._details_page(s, user.id, day, day, None, "next")
+            assert fetches == ["next"]
+            first = pack_cursor(page.rows[0].created_at, page.rows[0].id)
+            df = dt = day.isoformat()
+
+            for victim in (page.rows[1], page.rows[2]):
+                await other_user_writes()
+                cb = _Callback(70_001, f"del:{victim.id}:{df}:{dt}:{first}:r")
+                await cb_delete(cb)
+                assert cb.answered == "Удалено"
+                assert victim.description not in cb.edited
+                assert "Записи за сегодня" in cb.edited
+            return page
+        finally:
+            await engine.dispose()
+
+    page = asyncio.run(main())
+    # обе перерисовки — из правленой страницы в кэше, без запросов страницы к БД
+    assert fetches == ["next"]
+    assert len(page.rows) == 4
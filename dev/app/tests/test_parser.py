@@ -0,0 +1,215 @@
+# app/tests/test_parser.py
+# Парсер строки: однопроходный лексер обязан отвечать так же, как прежний набор регэкспов
+# (эталон ниже, им же меряет app/scripts/bench_parser.py), плюс FuzzyIndex против difflib.
+from __future__ import annotations
+
+import asyncio
+import difflib
+import random
+import re
+
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.parser import batch, intent as it
+from app.services.parser.category import KEYWORDS, detect_category
+from app.services.parser.normalizer import normalize
+from app.services.parser.resolver import _parse_normalized, parse_line
+from app.services.periods import record_time
+from app.utils.fuzzy import FuzzyIndex
+
+# ---------- прежняя реализация (эталон) ----------
+# Вход — уже нормализованная строка (normalize), как у _parse_normalized.
+
+_RX_NUM = re.compile(r"(?P<sign>[+-])?\s*(?P<num>\d+(?:\.\d{1,2})?)")
+_STOP_WORDS = {
+    "потратил", "потратила", "купил", "купила", "оплатил", "оплатила", "заплатил", "заплатила",
+    "вчера", "сегодня", "на", "по", "за", "—", "-", "+",
+    "руб", "руб.", "byn", "р", "р.", "бр", "usd", "eur", "₽", "$", "€",
+}
+_INCOME = ("зарплат", "доход", "прибыль", "прем", "партнер", "партнёр", "кешбек", "кэшбек", "cashback", "вернули")
+
+
+def _ref_term(text: str) -> str:
+    s = text.lower()
+    s = re.sub(r"\b\d+[.,]?\d*\b", " ", s)
+    s = re.sub(r"\b(byn|бр|р\.?|руб\.?|руб|₽|usd|\$|eur|€)\b", " ", s)
+    s = re.sub(r"[+–—-]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    words = [w for w in re.findall(r"[a-zа-яё][a-zа-яё0-9\-]*", s) if w not in _STOP_WORDS]
+    return " ".join(w.capitalize() for w in words[:3])
+
+
+def reference_parse(text: str):
+    m = _RX_NUM.search(text)
+    if not m:
+        return None
+    amount = abs(float(m.group("num")))
+    if m.group("sign"):
+        op_type = "income" if m.group("sign") == "+" else "expense"
+    else:
+        op_type = "income" if any(k in text.lower() for k in _INCOME) else "expense"
+    before = text[:m.start()].strip()
+    product = re.sub(r"\s+", " ", before) if before else re.sub(r"\s+", " ", text[m.end():].strip())
+    category = detect_category(text, op_type=op_type)
+    term = _ref_term(text) or product.capitalize() or "Позиция"
+    return amount, "BYN", op_type, category, product, term
+
+
+# ---------- корпус ----------
+
+_GOLDEN = [
+    "кофе 5", "Вчера такси 12,5", "+ 200 Партнёрка", "-5 такси", "+200 фриланс", "квас лидский 5",
+    "вчера такси 10", "еда 10", "зарплата 1 500", "Такси −7", "кофе1 000", "кофе5", "такси10р",
+    "12.345 кофе", "5.кофе", "12.5a", "р.5 хлеб", "10byn продукты", "usd 20 spotify", "яндекс такси 9.90",
+    "яндекс!!такси 3", "wi-fi 15", "піва 4", "ўзвар 2,3", "кофе_5", "кофе ١٢", "a1٣b 7", "купил хлеб 2 р.",
+    "потратила на кино 25 руб", "кешбек 3.20", "вернули 15", "зп +1200", "-  7 метро", "5", "кофе",
+    "сегодня 2 пиццы по 15", "​кофе 5", "кроссовки 120 $", "€ 50 отель", "аптека 7-8",
+    "2-3 шоколадки 4", "бургер — 12", "подписка netflix 10.99 usd", "интернет тариф 30 byn",
+]
+_ALPHA = list("абвгдеёжзийкпрстуфхцчшщыэюяabcxyzІіЎў019٣_ .,+-—–−$€₽!?()/ ​‎\t") + [
+    "кофе", "такси", "руб", "р.", "byn", "вчера", "яндекс", "вода", "1 000", "12,50", "  ",
+]
+_FILLER = ["лидский", "большой", "вчера", "сегодня", "с друзьями", "маме", "шт", "купил", "на", "р.", "руб", "byn"]
+
+
+def _generated(n: int, rnd: random.Random) -> list[str]:
+    stems = [st for v in KEYWORDS.values() for st in v]
+    out = []
+    for _ in range(n):
+        words = rnd.sample(_FILLER, rnd.randint(0, 3))
+        if rnd.random() < 0.8:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(stems) + rnd.choice(["", "а", "ы", "ов"]))
+        amount = rnd.choice([f"{rnd.randint(1, 99)}", f"{rnd.uniform(1, 100):.2f}", f"{rnd.uniform(1, 100):.2f}".replace(".", ","),
+                             f"{rnd.randint(1, 9)} {rnd.randint(0, 999):03d}", f"+{rnd.randint(1, 999)}", f"- {rnd.randint(1, 99)}"])
+        words.insert(rnd.randint(0, len(words)), amount)
+        out.append(" ".join(words).capitalize() + rnd.choice(["", "!", ",", " р.", "₽"]))
+    return out
+
+
+def _fuzz(n: int, rnd: random.Random) -> list[str]:
+    return ["".join(rnd.choice(_ALPHA) for _ in range(rnd.randint(1, 12))) for _ in range(n)]
+
+
+def golden_corpus(lines: int, fuzz: int, seed: int = 42) -> tuple[list[str], list[str]]:
+    """(живые + сгенерированные строки, мусор) — детерминированно от seed."""
+    rnd = random.Random(seed)
+    realistic = _GOLDEN + _generated(lines, rnd)
+    return realistic, _fuzz(fuzz, rnd)
+
+
+# ---------- тесты ----------
+
+def test_lexer_matches_reference_on_golden_corpus():
+    realistic, junk = golden_corpus(5_000, 5_000)
+    new_parse = _parse_normalized.__wrapped__
+    bad = [
+        (raw, reference_parse(t), new_parse(t))
+        for raw in realistic + junk
+        for t in (normalize(raw),)
+        if reference_parse(t) != new_parse(t)
+    ]
+    assert not bad, f"{len(bad)} mismatches, e.g. {bad[:3]}"
+
+
+@pytest.mark.parametrize("raw, amount, op_type, product", [
+    ("кофе 5", 5.0, "expense", "кофе"),
+    ("Вчера такси 12,5", 12.5, "expense", "вчера такси"),
+    ("+200 фриланс", 200.0, "income", "фриланс"),
+    ("зарплата 1 500", 1500.0, "income", "зарплата"),
+    ("-  7 метро", 7.0, "expense", "метро"),
+    ("квас лидский 5", 5.0, "expense", "квас лидский"),
+])
+def test_parse_line(raw, amount, op_type, product):
+    p = parse_line(raw)
+    assert p is not None
+    assert (p.amount, p.type, p.product) == (amount, op_type, product)
+    assert p.raw == raw.strip()
+
+
+@pytest.mark.parametrize("raw", ["", "   ", "кофе", "такси вчера"])
+def test_parse_line_without_amount(raw):
+    assert parse_line(raw) is None
+
+
+def _words(n: int, rnd: random.Random) -> list[str]:
+    alpha = "абвгдеклмнопрстуя"
+    return ["".join(rnd.choice(alpha) for _ in range(rnd.randint(2, 10))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("cutoff", [0.6, 0.75, 0.8, 0.9])
+def test_fuzzy_index_matches_difflib(cutoff):
+    rnd = random.Random(7)
+    terms = sorted(set(_words(400, rnd)))
+    ix = FuzzyIndex(terms)
+    queries = _words(300, rnd) + [t[:-1] for t in terms[:50]] + [t + "а" for t in terms[50:100]]
+    for q in queries:
+        expected = difflib.get_close_matches(q, terms, n=1, cutoff=cutoff)
+        assert ix.best_match(q, cutoff) == (expected[0] if expected else None), q
+
+
+def test_fuzzy_index_add_discard():
+    ix = FuzzyIndex(["капучино", "такси"])
+    assert ix.best_match("капучина", 0.8) == "капучино"
+    ix.discard("капучино")
+    assert "капучино" not in ix and len(ix) == 1
+    assert ix.best_match("капучина", 0.8) is None
+    ix.add("капучино")
+    assert ix.best_match("капучина", 0.8) == "капучино"
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("/report", it.COMMAND),
+    ("обучи: кофе = Еда", it.TEACH),
+    ("экспорт xlsx за неделю", it.EXPORT),
+    ("отчёт за 3 дня", it.REPORT),
+    ("за август", it.REPORT),
+    ("такси вчера", it.SEARCH),
+    ("вчера такси 12", it.RECORD),
+    ("кофе 5\nтакси 10", it.RECORD),
+    ("сравни с прошлым месяцем", it.COMPARE),
+    ("сравни август", it.COMPARE),
+    ("сравнение цен 5", it.RECORD),
+])
+def test_classify(text, kind):
+    assert it.classify(text).kind == kind
+
+
+def test_classify_dialog_state_wins():
+    assert it.classify("отчёт за 3 дня", bulk_mode=True).kind == it.BULK
+    assert it.classify("сравни август", awaiting_category=True).kind == it.RECORD
+
+
+@pytest.mark.parametrize("text, day", [
+    ("вчера такси 12", date(2026, 10, 17)),
+    ("позавчера кино 20", date(2026, 10, 16)),
+    ("такси 12", None),
+    ("сегодня такси 12", None),
+    ("за неделю такси 12", None),
+    # даты внутри описания — не повод переносить запись
+    ("подарок на 8 марта 30", None),
+    ("зп за 1 октября 900", None),
+    ("цветы к 14 февраля 25", None),
+    ("билеты на 31 декабря 40", None),
+])
+def test_record_time_only_for_relative_days(text, day):
+    ts = record_time(text, on=date(2026, 10, 18), tz="Europe/Minsk")
+    if day is None:
+        assert ts is None
+    else:
+        assert ts.replace(tzinfo=timezone.utc).astimezone(ZoneInfo("Europe/Minsk")).date() == day
+
+
+def test_record_time_just_after_local_midnight():
+    # 01:30 по Минску 18-го — в UTC ещё 17-е, 22:30; «вчера» — это 17-е по местному времени
+    ts = record_time("вчера такси 12", on=date(2026, 10, 18), tz="Europe/Minsk")
+    assert ts == datetime(2026, 10, 17, 9, 0)
+    assert ts.date() == date(2026, 10, 17)    # и день daily_rollups тот же
+
+
+def test_parse_many_dates_yesterday_rows(monkeypatch):
+    monkeypatch.setattr(batch, "record_time", lambda raw: record_time(raw, on=date(2026, 10, 18), tz="Europe/Minsk"))
+    parsed = asyncio.run(batch.parse_many(None, ["вчера такси 12", "такси 5"], 1))
+    assert [p.as_row().get("created_at") for p in parsed] == [datetime(2026, 10, 17, 9, 0), None]
@@ -0,0 +1,143 @@
+# app/tests/test_records.py
+# Записи в operations и то, что ведётся рядом с ними: user_balances, daily_rollups, счётчик
+# «потрачено сегодня». После каждой записи всё это обязано совпадать с простым SUM по operations.
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate
+from app.models.operation import Operation
+from app.models.record import OpRecord
+from app.models.rollup import DailyRollup
+from app.repo import spend
+from app.repo.balances import get_totals
+from app.repo.records import (
+    RECORD_COLUMNS,
+    add_operation,
+    add_operations_bulk,
+    delete_operation,
+    recategorize_operations,
+)
+from app.utils.cache import TTLCache
+
+USER_ID = 1
+
+
+@pytest.fixture
+def run_db(tmp_path, monkeypatch):
+    """run_db(fn) — выполнить async fn(Session) на свежей пустой БД."""
+    # счётчики расходов живут в памяти процесса: у каждого теста свои
+    monkeypatch.setattr(spend, "_spent", TTLCache(spend.SPENT_CACHE_SIZE, spend.SPENT_CACHE_TTL))
+
+    def run(fn):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'records.db'}")
+            try:
+                await migrate(engine)
+                return await fn(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+async def _ops(s) -> list[OpRecord]:
+    q = await s.execute(select(*RECORD_COLUMNS).where(Operation.user_id == USER_ID).order_by(Operation.id))
+    return [OpRecord._make(r) for r in q.all()]
+
+
+def _row(amount: float, category: str = "Еда", op_type: str = "expense", created_at: datetime | None = None) -> dict:
+    return {"amount": amount, "category": category, "description": "t", "type": op_type, "created_at": created_at}
+
+
+async def _write_each_kind(Session, check) -> None:
+    """Все виды записи по очереди; check(s) — после каждого commit."""
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    async with Session() as s:
+        await add_operation(s, USER_ID, -12.5, "Еда", "кофе", "expense")
+        await s.commit()
+        await check(s)
+    async with Session() as s:
+        await add_operations_bulk(s, USER_ID, [
+            _row(-7), _row(-3.2, "Транспорт"), _row(500, "Доход", "income"), _row(-40, created_at=yesterday),
+        ])
+        await s.commit()
+        await check(s)
+    async with Session() as s:
+        ops = await _ops(s)
+        await delete_operation(s, USER_ID, ops[0].id)
+        await delete_operation(s, USER_ID, ops[-1].id)   # вчерашняя
+        await s.commit()
+        await check(s)
+    async with Session() as s:
+        ops = await _ops(s)
+        await recategorize_operations(s, USER_ID, [(r, "Транспорт") for r in ops if r.category == "Еда"])
+        await s.commit()
+        await check(s)
+    async with Session() as s:
+        await add_operation(s, USER_ID, -1, "Прочее", "откат", "expense")
+        await s.rollback()                                # откат не оставляет следов
+        await check(s)
+
+
+def test_balances_follow_operations(run_db):
+    async def check(s):
+        ops = await _ops(s)
+        income = sum(abs(r.amount) for r in ops if r.type == "income")
+        expense = sum(abs(r.amount) for r in ops if r.type != "income")
+        assert await get_totals(s, USER_ID) == pytest.approx((income, expense))
+
+    async def main(Session):
+        await _write_each_kind(Session, check)
+
+    run_db(main)
+
+
+def test_rollups_follow_operations(run_db):
+    async def check(s):
+        expected: dict[tuple, list] = {}
+        for r in await _ops(s):
+            acc = expected.setdefault((r.created_at.date(), r.category, r.type), [0.0, 0])
+            acc[0] += abs(r.amount)
+            acc[1] += 1
+        q = await s.execute(select(DailyRollup.day, DailyRollup.category, DailyRollup.type, DailyRollup.total,
+                                   DailyRollup.cnt).where(DailyRollup.user_id == USER_ID, DailyRollup.cnt > 0))
+        got = {(d, cat, typ): [total, cnt] for d, cat, typ, total, cnt in q.all()}
+        assert got.keys() == expected.keys()
+        for key, (total, cnt) in expected.items():
+            assert got[key] == [pytest.approx(total), cnt]
+        # опустевшие строки не держат остатков суммы
+        q = await s.execute(select(DailyRollup.total).where(DailyRollup.user_id == USER_ID, DailyRollup.cnt == 0))
+        assert all(abs(t) < 1e-9 for t in q.scalars())
+
+    async def main(Session):
+        await _write_each_kind(Session, check)
+
+    run_db(main)
+
+
+def test_spent_today_counter_follows_operations(run_db):
+    async def db_sum(s) -> float:
+        start, end = spend._utc_bounds(spend.local_today())
+        q = await s.execute(select(func.coalesce(func.sum(func.abs(Operation.amount)), 0.0)).where(
+            Operation.user_id == USER_ID, Operation.type == "expense",
+            Operation.created_at >= start, Operation.created_at < end,
+        ))
+        return float(q.scalar_one())
+
+    async def check(s):
+        # счётчик уже загружен — spent_today отвечает из памяти, правленой after_commit
+        assert spend._spent.get(USER_ID) is not None
+        assert await spend.spent_today(s, USER_ID) == pytest.approx(await db_sum(s))
+
+    async def main(Session):
+        async with Session() as s:
+            assert await spend.spent_today(s, USER_ID) == 0.0
+        await _write_each_kind(Session, check)
+
+    run_db(main)
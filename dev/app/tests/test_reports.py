@@ -0,0 +1,163 @@
+# app/tests/test_reports.py
+# Постраничный просмотр операций (get_records_page): keyset по (created_at, id) на временной SQLite.
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.migrations import migrate
+from app.models.operation import Operation
+from app.repo import records
+from app.repo.records import data_version, get_records_page
+from app.services.analytics import range_buckets
+
+USER_ID = 1
+DAY = date(2025, 3, 10)
+
+
+def _seed() -> list[Operation]:
+    # по три операции на одну и ту же секунду: порядок внутри неё решает id
+    base = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9)
+    ops = [
+        Operation(user_id=USER_ID, amount=-(i + 1), category="Еда", description=f"op {i}", type="expense",
+                  created_at=base + timedelta(minutes=i // 3))
+        for i in range(23)
+    ]
+    # чужая операция и операция вне периода в выдачу не попадают
+    ops.append(Operation(user_id=2, amount=-1, category="Еда", description="чужая", type="expense", created_at=base))
+    ops.append(Operation(user_id=USER_ID, amount=-1, category="Еда", description="вчера", type="expense",
+                         created_at=base - timedelta(days=1)))
+    return ops
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """run_db(fn) — выполнить async fn(session) на свежей БД с засеянными операциями."""
+    def run(fn):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pages.db'}")
+            try:
+                await migrate(engine)
+                Session = async_sessionmaker(engine, expire_on_commit=False)
+                async with Session() as s:
+                    if not (await s.get(Operation, 1)):
+                        s.add_all(_seed())
+                        await s.commit()
+                async with Session() as s:
+                    return await fn(s)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+def _ids(page) -> list[int]:
+    return [r.id for r in page.rows]
+
+
+def test_walk_forward_and_back(run_db):
+    async def walk(s):
+        pages = [await get_records_page(s, USER_ID, DAY, DAY, limit=5)]
+        while pages[-1].has_next:
+            last = pages[-1].rows[-1]
+            pages.append(await get_records_page(s, USER_ID, DAY, DAY, cursor=(last.created_at, last.id), limit=5))
+        back = [pages[-1]]
+        while back[-1].has_prev:
+            first = back[-1].rows[0]
+            back.append(await get_records_page(s, USER_ID, DAY, DAY, cursor=(first.created_at, first.id),
+                                               direction="prev", limit=5))
+        return pages, back
+
+    pages, back = run_db(walk)
+    ids = [i for p in pages for i in _ids(p)]
+    assert ids == list(range(1, 24))
+    assert [len(p.rows) for p in pages] == [5, 5, 5, 5, 3]
+    assert not pages[0].has_prev and all(p.has_prev for p in pages[1:])
+    assert [_ids(p) for p in back] == [_ids(p) for p in reversed(pages)]
+    assert all(p.has_next for p in back[1:])
+
+
+def test_from_redraws_same_page(run_db):
+    async def redraw(s):
+        first = await get_records_page(s, USER_ID, DAY, DAY, limit=5)
+        second = await get_records_page(s, USER_ID, DAY, DAY, cursor=(first.rows[-1].created_at, first.rows[-1].id),
+                                        limit=5)
+        head = second.rows[0]
+        again = await get_records_page(s, USER_ID, DAY, DAY, cursor=(head.created_at, head.id), direction="from",
+                                       limit=5)
+        return second, again
+
+    second, again = run_db(redraw)
+    assert _ids(again) == _ids(second)
+    assert (again.has_prev, again.has_next) == (second.has_prev, second.has_next)
+
+
+def test_empty_period(run_db):
+    page = run_db(lambda s: get_records_page(s, USER_ID, DAY + timedelta(days=1), DAY + timedelta(days=2)))
+    assert page.rows == [] and not page.has_prev and not page.has_next
+
+
+def test_data_version_survives_eviction(monkeypatch):
+    # своё состояние версий: monkeypatch вернёт глобальные после теста
+    monkeypatch.setattr(records, "DATA_VERSIONS_SIZE", 3)
+    monkeypatch.setattr(records, "_data_versions", OrderedDict())
+    monkeypatch.setattr(records, "_version_floor", records._version_floor)
+    seen = {}
+    for uid in (101, 102, 101, 103, 104, 105):
+        records._bump_version(uid)
+        seen[uid] = data_version(uid)
+    assert len(records._data_versions) == 3
+    # 101 и 102 вытеснены: их версия не вернулась к закэшированной раньше
+    assert data_version(101) >= seen[101] and data_version(102) >= seen[102]
+    assert data_version(999) == data_version(101)
+    records._bump_version(101)
+    assert data_version(101) > seen[101]
+
+
+@pytest.mark.parametrize("unit", ["day", "week", "month"])
+def test_range_buckets_match_python_grouping(tmp_path, unit):
+    start, end = date(2024, 11, 20), date(2025, 3, 5)
+    # операции каждые 17 часов: попадают на все дни недели и через границы месяцев и года
+    ops = [
+        Operation(user_id=USER_ID, amount=(5.0 if k % 4 == 0 else -(k % 9 + 1)), category="Еда", description="op",
+                  type="income" if k % 4 == 0 else "expense",
+                  created_at=datetime(2024, 11, 20, 1) + timedelta(hours=17 * k))
+        for k in range(150)
+    ]
+    ops = [op for op in ops if op.created_at.date() <= end]
+
+    def bucket(d: date) -> date:
+        if unit == "week":
+            return d - timedelta(days=d.weekday())
+        return d.replace(day=1) if unit == "month" else d
+
+    expected: dict[date, list[float]] = {}
+    for op in ops:
+        expected.setdefault(bucket(op.created_at.date()), [0.0, 0.0])[op.type == "income"] += abs(op.amount)
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'buckets.db'}")
+        try:
+            await migrate(engine)
+            Session = async_sessionmaker(engine, expire_on_commit=False)
+            async with Session() as s:
+                await records.add_operations_bulk(s, USER_ID, [
+                    {"amount": op.amount, "category": op.category, "description": op.description,
+                     "type": op.type, "created_at": op.created_at}
+                    for op in ops
+                ])
+                await s.commit()
+            async with Session() as s:
+                return await range_buckets(s, USER_ID, start, end, unit)
+        finally:
+            await engine.dispose()
+
+    got = asyncio.run(main())
+    assert [b.start for b in got] == sorted(expected)
+    for b in got:
+        assert b.expense == pytest.approx(expected[b.start][0])
+        assert b.income == pytest.approx(expected[b.start][1])
@@ -2,8 +2,11 @@
 # app/ui/ui.py
 from __future__ import annotations
 import re
+from datetime import datetime, timedelta
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from app.services.parser.terms import extract_term  # noqa: F401  (живёт в парсере, тут — для старых импортов)
+
 # ===== Клавиатуры =====
 
 def kb_summary(df: str, dt: str, has_any: bool) -> InlineKeyboardMarkup | None:
@@ -13,16 +16,50 @@ def kb_summary(df: str, dt: str, has_any: bool) -> InlineKeyboardMarkup | None:
         inline_keyboard=[[InlineKeyboardButton(text="📋 Детали", callback_data=f"details:{df}:{dt}")]]
     )
 
-def kb_details(ops_labels, df: str, dt: str) -> InlineKeyboardMarkup:
+def kb_details(ops_labels, df: str, dt: str, *, page_key: str | None = None,
+               prev_key: str | None = None, next_key: str | None = None, view: str = "") -> InlineKeyboardMarkup:
+    """
+    page_key — курсор первой строки текущей страницы (чтобы после удаления остаться на ней),
+    prev_key/next_key — курсоры для навигации; None — кнопки нет.
+    view — код заголовка списка («r» — /records); пусто — «Детальный отчёт».
+    """
+    vtail = f":{view}" if view else ""
+    tail = (f":{page_key}" if page_key else "") + vtail
     rows, row = [], []
     for label, op_id in ops_labels:
-        row.append(InlineKeyboardButton(text=f"🗑 {label}", callback_data=f"del:{op_id}:{df}:{dt}"))
+        row.append(InlineKeyboardButton(text=f"🗑 {label}", callback_data=f"del:{op_id}:{df}:{dt}{tail}"))
         if len(row) == 2:
             rows.append(row); row = []
     if row: rows.append(row)
+    nav = []
+    if prev_key:
+        nav.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"details:{df}:{dt}:p:{prev_key}{vtail}"))
+    if next_key:
+        nav.append(InlineKeyboardButton(text="Дальше ➡️", callback_data=f"details:{df}:{dt}:n:{next_key}{vtail}"))
+    if nav: rows.append(nav)
     rows.append([InlineKeyboardButton(text="Закрыть", callback_data=f"close:{df}:{dt}")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
+# ===== Курсоры страниц в callback_data (лимит Telegram — 64 байта) =====
+
+_EPOCH = datetime(1970, 1, 1)
+_B36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def _to36(n: int) -> str:
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = _B36[r] + out
+        if not n:
+            return out
+
+def pack_cursor(ts: datetime, op_id: int) -> str:
+    """(created_at, id) -> 'ts36:id36' — микросекунды от эпохи и id в base36."""
+    return f"{_to36((ts - _EPOCH) // timedelta(microseconds=1))}:{_to36(op_id)}"
+
+def unpack_cursor(ts36: str, id36: str) -> tuple[datetime, int]:
+    return _EPOCH + timedelta(microseconds=int(ts36, 36)), int(id36, 36)
+
 def kb_pick_category() -> InlineKeyboardMarkup:
     cats = [
         "Еда и напитки","Алкоголь","Транспорт","Связь и интернет",
@@ -41,26 +78,6 @@ def kb_pick_category() -> InlineKeyboardMarkup:
 
 # ===== Утилиты имен/терминов =====
 
-_STOP_WORDS = {
-    "потратил","потратила","купил","купила","оплатил","оплатила","заплатил","заплатила",
-    "вчера","сегодня","на","по","за","—","-","+",
-    "руб","руб.","byn","р","р.","бр","usd","eur","₽","$","€"
-}
-
-def extract_term(text: str) -> str:
-    """Вернёт терм 1–3 слова с буквами (игнорируя суммы/валюты/служебные)."""
-    if not text:
-        return ""
-    s = text.lower()
-    s = re.sub(r"\b\d+[.,]?\d*\b", " ", s)
-    s = re.sub(r"\b(byn|бр|р\.?|руб\.?|руб|₽|usd|\$|eur|€)\b", " ", s)
-    s = re.sub(r"[+–—-]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    words = [w for w in re.findall(r"[a-zа-яё][a-zа-яё0-9\-]*", s) if w not in _STOP_WORDS]
-    if not words:
-        return ""
-    return " ".join(w.capitalize() for w in words[:3])
-
 def clean_name(desc: str, fallback: str) -> str:
     """Имя позиции для деталей: первое осмысленное слово с буквами."""
     if not desc:
@@ -0,0 +1,119 @@
+# app/utils/fuzzy.py
+# Индекс для нечёткого поиска термина: то же, что difflib.get_close_matches(word, terms, n=1, cutoff),
+# но SequenceMatcher считается только для кандидатов из инвертированного индекса, а не для всех терминов.
+#
+# Почему результат совпадает с difflib: ratio() = 2*M/(la+lb) <= quick_ratio() = 2*I/(la+lb), где I —
+# размер пересечения мультимножеств символов. Токен — пара (символ или биграмма, номер вхождения),
+# так что I = число общих символьных токенов. Кандидат с ratio >= cutoff обязан:
+#   - иметь длину в пределах [la*c/(2-c), la*(2-c)/c];
+#   - делить с запросом >= t символьных токенов;
+#   - при высоком cutoff — делить >= tb биграмм: расстояние Левенштейна k <= la+lb-2M <= (1-c)(la+lb),
+#     а строки на расстоянии k делят >= max(la,lb) - 1 - 2k биграмм (q-gram lemma).
+# Из "делить >= t" следует: хотя бы один из (|Q| - t + 1) самых редких токенов запроса общий (prefix filter).
+# Границы берём с запасом вниз, окончательно решает тот же ratio(), что и в difflib.
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable
+
+Token = tuple[str, int]
+
+
+def _numbered(grams: Iterable[str]) -> list[Token]:
+    seen: dict[str, int] = defaultdict(int)
+    out: list[Token] = []
+    for g in grams:
+        seen[g] += 1
+        out.append((g, seen[g]))
+    return out
+
+
+def _tokens(s: str) -> list[Token]:
+    return _numbered(s)
+
+
+def _bigrams(s: str) -> list[Token]:
+    return _numbered(s[i:i + 2] for i in range(len(s) - 1))
+
+
+class FuzzyIndex:
+    """
+    >>> ix = FuzzyIndex(["капучино", "такси"])
+    >>> ix.best_match("капучина", 0.8)
+    'капучино'
+    """
+
+    def __init__(self, terms: Iterable[str] = ()) -> None:
+        self._postings: dict[Token, set[str]] = defaultdict(set)
+        self._terms: set[str] = set()
+        for t in terms:
+            self.add(t)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def add(self, term: str) -> None:
+        if not term or term in self._terms:
+            return
+        self._terms.add(term)
+        for tok in _tokens(term) + _bigrams(term):
+            self._postings[tok].add(term)
+
+    def discard(self, term: str) -> None:
+        if term not in self._terms:
+            return
+        self._terms.discard(term)
+        for tok in _tokens(term) + _bigrams(term):
+            bucket = self._postings.get(tok)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self._postings[tok]
+
+    def best_match(self, word: str, cutoff: float = 0.6) -> str | None:
+        """Как get_close_matches(word, terms, n=1, cutoff)[0]: максимум по (ratio, term) или None."""
+        if not word or not self._terms:
+            return None
+        lq = len(word)
+        lo = math.floor(lq * cutoff / (2 - cutoff))
+        hi = math.ceil(lq * (2 - cutoff) / cutoff) if cutoff > 0 else math.inf
+        if cutoff <= 0:
+            cands: set[str] = self._terms   # подходит любой термин, фильтровать нечего
+        else:
+            # минимум общих токенов при любой допустимой длине кандидата
+            need_b = min(
+                max(lq, n) - 1 - 2 * math.floor((1 - cutoff) * (lq + n) + 1e-9)
+                for n in range(lo, min(hi, 2 * lq + 2) + 1)
+            )
+            if need_b >= 1:
+                toks, need = _bigrams(word), need_b
+            else:
+                toks, need = _tokens(word), max(1, math.floor(cutoff * (lq + lo) / 2))
+            cands = self._probe(toks, len(toks) - need + 1)
+
+        # ровно как в difflib: seq2 — запрос, seq1 — кандидат (ratio несимметричен)
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        best: tuple[float, str] | None = None
+        for x in cands:
+            if not lo <= len(x) <= hi:
+                continue
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff:
+                r = s.ratio()
+                if r >= cutoff and (best is None or (r, x) > best):
+                    best = (r, x)
+        return best[1] if best else None
+
+    def _probe(self, toks: list[Token], prefix: int) -> set[str]:
+        toks.sort(key=lambda tok: len(self._postings.get(tok, ())))
+        out: set[str] = set()
+        for tok in toks[:prefix]:
+            out.update(self._postings.get(tok, ()))
+        return out